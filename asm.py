@@ -1,9 +1,84 @@
+from __future__ import annotations
+
+import argparse
+import contextlib
+import hashlib
+import importlib
+import itertools
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import time
+import tracemalloc
+import unicodedata
+from multiprocessing.shared_memory import SharedMemory
+
 import numpy as np
-import pandas as pd
+
+
+class LazyModule:
+    def __init__(self, name: str) -> None:
+        """
+        Stands in for a module that is only imported when one of its
+        attributes is used for the first time. Importing pandas takes longer
+        than mapping a few hundred strings, so it is only imported for pandas
+        inputs and outputs.
+
+        Args:
+            name (str): name of the module
+
+        """
+        self.name = name
+
+    def __getattr__(self, attribute: str) -> any:
+        """
+        Imports the module (only the first time) and returns its attribute.
+
+        Args:
+            attribute (str): name of the attribute
+
+        Returns:
+            any: attribute of the module
+
+        """
+        return getattr(importlib.import_module(self.name), attribute)
+
+
+pd = LazyModule("pandas")
+
+# arrays shared with the processes of AutoStringMapper.compute_tiles, set per process
+shared_arrays = {}
+
+logger = logging.getLogger(__name__)
 
 
 class AutoStringMapper:
-    def __init__(self, from_column: any, to_column: any, ignore_case: bool = True) -> None:
+    def __init__(
+        self,
+        from_column: any,
+        to_column: any,
+        ignore_case: bool = True,
+        engine: str = "dp",
+        chunk_size: int = None,
+        max_memory_bytes: int = None,
+        storage: str = "dense",
+        top_k: int = 1,
+        similarity_threshold: float = None,
+        histogram_pruning: bool = False,
+        blocking: str = None,
+        q: int = 2,
+        min_shared_qgrams: int = 1,
+        max_candidates: int = None,
+        n_jobs: int = 1,
+        cache: "DistanceCache" = None,
+        metric: any = "levenshtein",
+        stats: "StageStats" = None,
+        similarity_dtype: str = "float64",
+        normalization: list = None,
+    ) -> None:
         """
         Initiates an AutoStringMapper object with two string lists, series or
         np.arrays and creating a similarity matrix based on their string
@@ -15,376 +90,3873 @@ class AutoStringMapper:
                 map from
             to_column (list, pandas.Series, np.ndarray): list of entries to map
                 to
+            ignore_case (bool): whether the strings are compared in lower case
+            engine (str): determines whether the levenshtein distances are
+                computed with the "dp" (dynamic programming) or the
+                "bitparallel" (Myers' bit-vector algorithm) engine, both
+                return the same distances
+            chunk_size (int): maximum number of from-to-string-combinations
+                that are computed at the same time, by default all of them
+            max_memory_bytes (int): approximate number of bytes the distance
+                computation may use at the same time (not including the
+                similarity matrix itself), which limits the chunk_size
+            storage (str): determines whether the "dense" similarity matrix of
+                all combinations is kept or only the "top_k" most similar to
+                strings of every from string, which needs memory for
+                len(from_column) * top_k instead of len(from_column) *
+                len(to_column) similarities, or only the "sparse" from ids, to
+                ids and similarities of the computed combinations that reach
+                the similarity_threshold
+            top_k (int): number of most similar to strings kept per from
+                string if storage is "top_k"
+            similarity_threshold (float): minimum similarity that will be used
+                in get_mapping, if given the levenshtein distance is not
+                computed for combinations whose string lengths already rule out
+                reaching it, their similarity stays np.nan and their distance -1
+            histogram_pruning (bool): whether combinations are additionally
+                ruled out by comparing how often every character occurs in
+                both strings, only used with a similarity_threshold
+            blocking (str): if "qgram", every from str is only compared with
+                the to strings that share enough q-grams with it (found with an
+                inverted index), all other combinations are treated like pruned
+                ones, by default every combination is compared
+            q (int): number of characters per q-gram used for the blocking
+            min_shared_qgrams (int): minimum number of distinct q-grams a to
+                str needs to share with a from str to be compared, higher
+                values are faster but may miss the best match
+            max_candidates (int): if given, only this many to strings sharing
+                the most q-grams are compared with every from str
+            n_jobs (int): number of processes the tiles are computed in, -1 for
+                one per cpu, the result does not depend on it
+            cache (DistanceCache): if given, the levenshtein distances found in
+                it are not computed again and the computed ones are added to it,
+                only for the metric "levenshtein" or "damerau"
+            metric (str, dict): similarity metric, "levenshtein", "damerau"
+                (adjacent transpositions cost one), "jaro_winkler", "token_set"
+                (shared words), "qgram_cosine" (q-gram counts) or one registered
+                with register_metric, or a dict of metrics and their weights to
+                use their weighted mean. The length based pruning, the banding
+                and the distance_matrix are only used with "levenshtein" or
+                "damerau" alone, the distances are -1 otherwise
+            stats (StageStats): records the time, the memory and the number of
+                combinations of every stage, by default a new one that only
+                records the time and the combinations, see the stats attribute
+            similarity_dtype (str): "float64" or "float32", the dtype of the
+                similarity_matrix and of the stored most similar to strings or
+                sparse combinations, "float32" halves their memory, the
+                similarities are then compared with the thresholds in float32
+                as well, when the mapper is built and in get_mapping
+            normalization (list): steps applied in this order to the strings
+                before they are deduplicated and compared, "nfkc" (unicode
+                compatibility normalization), "accents" (removes accents),
+                "casefold", "whitespace" (strips and collapses whitespace) and
+                "punctuation" (removes punctuation and symbols). The distances
+                are computed once per normalized from str (key) and copied to
+                all from strings with that key, to strings with the same key
+                are merged into the first one, see normalize_column
+
+        Raises:
+            ValueError: if engine is not "dp" or "bitparallel", if chunk_size,
+                max_memory_bytes or top_k are not positive, if storage is not
+                "dense", "top_k" or "sparse", if similarity_threshold is not between 0
+                and 1, if blocking is not None or "qgram" or if q,
+                min_shared_qgrams or max_candidates are not positive or if n_jobs
+                is neither positive nor -1, if metric names no registered metric
+                or a weight is not positive or if a cache is given for another
+                metric than "levenshtein" or "damerau" or if similarity_dtype is
+                not "float64" or "float32" or if normalization contains an
+                unknown step or differs from the one of a given ToColumnIndex
 
         """
-        from_column = self.clean_column(from_column, "from_column")
-        to_column = self.clean_column(to_column, "to_column")
+        if n_jobs == -1:
+            n_jobs = os.cpu_count() or 1
+
+        if stats is None:
+            stats = StageStats()
+
+        self.storage = storage
+        self.similarity_threshold = similarity_threshold
+        self.blocking = blocking
+        self.stats = stats
+
+        # the strings added later are computed with the same parameters
+        self.parameters = {
+            "ignore_case": ignore_case,
+            "engine": engine,
+            "chunk_size": chunk_size,
+            "max_memory_bytes": max_memory_bytes,
+            "storage": storage,
+            "top_k": top_k,
+            "similarity_threshold": similarity_threshold,
+            "histogram_pruning": histogram_pruning,
+            "blocking": blocking,
+            "q": q,
+            "min_shared_qgrams": min_shared_qgrams,
+            "max_candidates": max_candidates,
+            "n_jobs": n_jobs,
+            "cache": cache,
+            "metric": metric,
+            "stats": stats,
+            "similarity_dtype": similarity_dtype,
+            "normalization": normalization,
+        }
+
+        metric_weights = self._check_parameters()
+        to_index = self._get_to_index(to_column)
+
+        # from here on only the distinct keys are compared, the results are copied to their values at the end
+        from_key_ids, unique_from_column = self._create_from_keys(from_column)
+
+        arrays, cache_keys = self._create_arrays(unique_from_column, to_index, metric_weights)
+        tiles = self._create_candidate_tiles(arrays, to_index, *self._get_tile_sizes(arrays, metric_weights))
+
+        self.to_values = to_index.to_values
+        self.to_index = to_index
+
+        self._store_results(arrays, tiles, metric_weights, cache_keys)
+        self._finish_results(from_key_ids)
+
+    def _check_parameters(self) -> dict:
+        """
+        Checks the parameters of the constructor, see __init__.
 
-        unique_from_column = from_column.drop_duplicates().reset_index(drop=True)
-        unique_to_column = to_column.drop_duplicates().reset_index(drop=True)
+        Returns:
+            dict: weights of the similarity metrics by their names
 
-        len_from_column = unique_from_column.shape[0]
-        len_to_column = unique_to_column.shape[0]
+        Raises:
+            ValueError: see __init__
 
-        maxlen_from_column = unique_from_column.str.len().max()
-        maxlen_to_column = unique_to_column.str.len().max()
+        """
+        parameters = self.parameters
 
-        (
-            from_column_combinations,
-            to_column_combinations,
-        ) = self.create_combinations(unique_from_column, unique_to_column)
+        if parameters["engine"] not in ["dp", "bitparallel"]:
 
-        if ignore_case:
-            from_column_combinations = from_column_combinations.str.lower()
-            to_column_combinations = to_column_combinations.str.lower()
-
-        levenshtein_array = self.create_levenshtein_array(
-            from_column_combinations,
-            to_column_combinations,
-            len_from_column,
-            len_to_column,
-            maxlen_from_column,
-            maxlen_to_column,
-        )
+            raise ValueError('Parameter engine must be "dp" or "bitparallel"')
 
-        self.distance_matrix = pd.DataFrame(
-            levenshtein_array[:, maxlen_from_column - 1, maxlen_to_column - 1].reshape([len_to_column, len_from_column])
-        )
+        if (parameters["chunk_size"] is not None and parameters["chunk_size"] < 1) or (
+            parameters["max_memory_bytes"] is not None and parameters["max_memory_bytes"] < 1
+        ):
 
-        maxlen_matrix = self.create_maxlen_matrix(unique_from_column, unique_to_column)
+            raise ValueError("Parameters chunk_size and max_memory_bytes must be positive")
 
-        self.similarity_matrix = 1 - (self.distance_matrix / maxlen_matrix)
+        if parameters["storage"] not in ["dense", "top_k", "sparse"]:
 
-        self.similarity_matrix.index = unique_to_column.to_list()
-        self.similarity_matrix.columns = unique_from_column.to_list()
+            raise ValueError('Parameter storage must be "dense", "top_k" or "sparse"')
 
-    @staticmethod
-    def determine_unused_row_name(index: pd.Index) -> str:
+        if parameters["top_k"] < 1:
+
+            raise ValueError("Parameter top_k must be positive")
+
+        if parameters["similarity_threshold"] is not None and (
+            parameters["similarity_threshold"] < 0.0 or parameters["similarity_threshold"] > 1.0
+        ):
+
+            raise ValueError("Parameter similarity_threshold must be between 0 and 1")
+
+        if parameters["blocking"] not in [None, "qgram"]:
+
+            raise ValueError('Parameter blocking must be None or "qgram"')
+
+        if (
+            parameters["q"] < 1
+            or parameters["min_shared_qgrams"] < 1
+            or (parameters["max_candidates"] is not None and parameters["max_candidates"] < 1)
+        ):
+
+            raise ValueError("Parameters q, min_shared_qgrams and max_candidates must be positive")
+
+        if parameters["n_jobs"] < 1:
+
+            raise ValueError("Parameter n_jobs must be positive or -1")
+
+        metric = parameters["metric"]
+        metric_weights = {metric: 1.0} if isinstance(metric, str) else dict(metric)
+
+        if len(metric_weights) == 0 or any(name not in similarity_metrics or not weight > 0 for name, weight in metric_weights.items()):
+
+            raise ValueError("Parameter metric must be a registered metric or a dict of them with positive weights")
+
+        if parameters["cache"] is not None and not (len(metric_weights) == 1 and list(metric_weights)[0] in ["levenshtein", "damerau"]):
+
+            raise ValueError('Parameter cache needs the metric "levenshtein" or "damerau"')
+
+        if parameters["similarity_dtype"] not in ["float64", "float32"]:
+
+            raise ValueError('Parameter similarity_dtype must be "float64" or "float32"')
+
+        if any(step not in normalization_steps for step in parameters["normalization"] or []):
+
+            raise ValueError(f"Parameter normalization must be a list of the steps {', '.join(normalization_steps)}")
+
+        return metric_weights
+
+    def _get_to_index(self, to_column: any) -> ToColumnIndex:
         """
-        Searches and index for a suitable row name for the max column and
-        creates one that is not in the index by appending.
+        Prepares the to_column, unless it is a ToColumnIndex already.
 
         Args:
-            index (pd.Index): index to be checked for the row name
+            to_column (list, pandas.Series, np.ndarray, ToColumnIndex): list of
+                entries to map to
 
         Returns:
-            str: a row name that is not in the index
+            ToColumnIndex: index of the to strings
+
+        Raises:
+            ValueError: if ignore_case or normalization differ from the ones of
+                a given ToColumnIndex
 
         """
-        row_name = "max"
-        while row_name in index:
-            row_name += "max"
-        return row_name
+        ignore_case, normalization = self.parameters["ignore_case"], self.parameters["normalization"]
 
-    @staticmethod
-    def create_mapping(similarity_matrix: pd.DataFrame, max_row_name: str, similarity_threshold: float) -> tuple:
+        if not isinstance(to_column, ToColumnIndex):
+            with self.stats.stage("to_column_index"):
+                return ToColumnIndex(to_column, ignore_case, normalization)
+
+        if to_column.ignore_case != ignore_case:
+
+            raise ValueError("Parameter ignore_case must be the same as the one of the ToColumnIndex")
+
+        if to_column.normalization != list(normalization or []):
+
+            raise ValueError("Parameter normalization must be the same as the one of the ToColumnIndex")
+
+        return to_column
+
+    def _create_from_keys(self, from_column: any) -> tuple:
         """
-        creats a mapping for a similarity matrix using a threshold and an unused row name
+        Deduplicates the from_column into the from_values and their counts and,
+        with a normalization, the from values into their normalized keys.
 
         Args:
-            similarity_matrix (pd.DataFrame): similarity matrix to build the
-                                              mapping on
-            max_row_name (str): row name not used as a column
-            similarity_threshold (float): minimum similarity in order to map
+            from_column (list, pandas.Series, np.ndarray): list of entries to
+                map from
 
         Returns:
-            tuple: tuple of the updated similarity_matrix (pd.DataFrame) and the
-                   created mapping (pd.Series)
+            tuple: key id of every from value (None without a normalization) and
+                the unique keys which are compared
 
         """
-        similarity_matrix.loc[max_row_name] = similarity_matrix.max(axis=0)
-
-        similarity_matrix.sort_values(by=max_row_name, ascending=False, axis=1, inplace=True)
+        with self.stats.stage("clean_column"):
+            from_column = self.clean_values(from_column, "from_column")
 
-        similarity_matrix.drop([max_row_name], inplace=True)
+        with self.stats.stage("drop_duplicates"):
+            value_ids, unique_from_column = self.factorize_values(from_column)
 
-        mapping = similarity_matrix.idxmax(axis=0)
+        self.from_values = unique_from_column
+        self.from_counts = np.bincount(value_ids, minlength=self.from_values.shape[0])
 
-        duplication_mask = mapping.duplicated(keep="first")
+        if not self.parameters["normalization"]:
+            return None, unique_from_column
 
-        similarity_threshold_mask = similarity_matrix.max(axis=0) < similarity_threshold
+        with self.stats.stage("normalize_column"):
+            return self.factorize_values(self.normalize_column(unique_from_column, self.parameters["normalization"]))
 
-        net_mask = duplication_mask | similarity_threshold_mask
+    def _create_arrays(self, unique_from_column: np.ndarray, to_index: ToColumnIndex, metric_weights: dict) -> tuple:
+        """
+        Encodes the from keys and collects the arrays compute_tile needs, the
+        histograms for the pruning, the token and q-gram profiles of the
+        metrics and the distances found in the cache.
 
-        mapping.mask(net_mask, np.nan, inplace=True)
+        Args:
+            unique_from_column (np.ndarray): unique from keys
+            to_index (ToColumnIndex): index of the to strings
+            metric_weights (dict): weights of the similarity metrics
 
-        return mapping, similarity_matrix
+        Returns:
+            tuple: np.ndarrays by name as expected by compute_tile and the cache
+                keys of the from and the to strings (None without a cache)
 
-    def clean_matrix(self, sub_similarity_matrix, sub_mapping, similarity_threshold=0):
         """
-        Function clean the similarity matrix of columns and indices that are
-        already in the mapping or that will never be in there as there best
-        similarity is below the threshold
+        parameters, stats = self.parameters, self.stats
+        from_string_lengths = self.get_string_lengths(unique_from_column)
+
+        with stats.stage("encode_column"):
+            if parameters["ignore_case"]:
+                from_codes, from_lengths = self.encode_column(
+                    [value.lower() for value in unique_from_column], from_string_lengths.max(initial=0)
+                )
+            else:
+                from_codes, from_lengths = self.encode_column(unique_from_column, from_string_lengths.max(initial=0))
+
+        to_codes, to_lengths = to_index.codes, to_index.lengths
+
+        arrays = {
+            "from_codes": from_codes,
+            "to_codes": to_codes,
+            "from_lengths": from_lengths,
+            "to_lengths": to_lengths,
+            "from_string_lengths": from_string_lengths,
+            "to_string_lengths": to_index.string_lengths,
+        }
+
+        if parameters["similarity_threshold"] is not None and parameters["histogram_pruning"]:
+            with stats.stage("create_histograms"):
+                arrays["from_histograms"], arrays["to_histograms"] = self.create_histograms(from_codes, to_codes, from_lengths, to_lengths)
+
+        if "token_set" in metric_weights:
+            with stats.stage("create_profiles"):
+                arrays.update(
+                    self.create_profiles(
+                        *self.create_tokens(from_codes, from_lengths),
+                        *self.create_tokens(to_codes, to_lengths),
+                        from_codes.shape[0],
+                        to_codes.shape[0],
+                        "token",
+                        distinct=True,
+                    )
+                )
+
+        if "qgram_cosine" in metric_weights:
+            with stats.stage("create_profiles"):
+                arrays.update(
+                    self.create_profiles(
+                        *self.create_qgrams(from_codes, from_lengths, parameters["q"]),
+                        *self.create_qgrams(to_codes, to_lengths, parameters["q"]),
+                        from_codes.shape[0],
+                        to_codes.shape[0],
+                        "qgram_profile",
+                    )
+                )
+
+        cache = parameters["cache"]
+
+        if cache is None:
+            return arrays, None
+
+        with stats.stage("cache_lookup"):
+            from_keys = cache.create_keys(from_codes, from_lengths, parameters["ignore_case"], list(metric_weights)[0])
+            to_keys = cache.create_keys(to_codes, to_lengths, parameters["ignore_case"], list(metric_weights)[0])
+
+            unique_from_keys, arrays["from_cache_ids"] = np.unique(from_keys, return_inverse=True)
+            unique_to_keys, arrays["to_cache_ids"] = np.unique(to_keys, return_inverse=True)
+
+            cached_from_keys, cached_to_keys, cached_distances = cache.lookup(unique_from_keys, unique_to_keys)
+
+            # the same keys as in find_cached_combinations
+            cached_keys = np.searchsorted(unique_from_keys, cached_from_keys) * unique_to_keys.shape[0] + np.searchsorted(
+                unique_to_keys, cached_to_keys
+            )
+            order = np.argsort(cached_keys)
+            arrays["cached_keys"] = cached_keys[order]
+            arrays["cached_distances"] = cached_distances[order]
+
+        return arrays, (from_keys, to_keys)
+
+    def _get_tile_sizes(self, arrays: dict, metric_weights: dict) -> tuple:
+        """
+        Determines the maximum number of combinations and of from strings per
+        tile from the parameters chunk_size, max_memory_bytes and n_jobs. The
+        bit-parallel engine needs memory per from str of a tile as well, so it
+        gets half of max_memory_bytes for the combinations and half for the
+        from strings.
 
         Args:
-            sub_similarity_matrix (pd.DataFrame): similarity matrix that needs
-                to be cleaned
-            sub_mapping (pd.Series): current version of the mapping with the
-                values that are to be cleaned
-            similarity_threshold (float): threshold which decides how
-                similar two strings need to be in order to be included
-                into the mapping and not as np.nan
-
+            arrays (dict): np.ndarrays by name as expected by compute_tile
+            metric_weights (dict): weights of the similarity metrics
 
         Returns:
-            pd.DataFrame: updated similarity_matrix
+            tuple: maximum number of combinations per tile and maximum number
+                of from strings per tile (None if unlimited)
 
         """
-        for index, column in sub_mapping.iteritems():
-            if not pd.isnull(column):
+        parameters = self.parameters
+        chunk_size = parameters["chunk_size"]
 
-                sub_similarity_matrix.drop(columns=index, inplace=True)
-                sub_similarity_matrix.drop(index=column, inplace=True)
+        if chunk_size is None:
+            chunk_size = max(arrays["from_codes"].shape[0] * arrays["to_codes"].shape[0], 1)
 
-        for column in sub_similarity_matrix.index[sub_similarity_matrix.max(axis=0) < similarity_threshold]:
-            sub_similarity_matrix.drop(index=column, inplace=True)
+            if parameters["n_jobs"] > 1:
+                # a few tiles per process, so that the processes finish at about the same time
+                chunk_size = max(-(-chunk_size // (4 * parameters["n_jobs"])), 1)
 
-        return sub_similarity_matrix
+        if parameters["max_memory_bytes"] is None:
+            return chunk_size, None
 
-    def get_mapping(
-        self,
-        similarity_threshold: float = 0.0,
-        relationship_type: str = "1:n",
-        data_type: str = "dict",
-    ) -> dict:
+        from_codes, from_lengths = arrays["from_codes"], arrays["from_lengths"]
+        max_memory_bytes = parameters["max_memory_bytes"]
+        max_from_tile_size = None
+
+        if parameters["engine"] == "bitparallel" and list(metric_weights) == ["levenshtein"]:
+            # the pattern alphabet of the bit-parallel engine, the from strings without their first character
+            alphabet_size = np.unique(from_codes[:, 1:][np.arange(from_codes.shape[1] - 1) < from_lengths[:, None] - 1]).shape[0]
+
+            max_memory_bytes = max(max_memory_bytes // 2, 1)
+            max_from_tile_size = max(max_memory_bytes // self.estimate_from_str_bytes(from_codes.shape[1], alphabet_size), 1)
+
+        combination_bytes = self.estimate_combination_bytes(
+            parameters["engine"], from_codes.shape[1], arrays["to_codes"].shape[1], metric_weights
+        )
+
+        return max(min(chunk_size, max_memory_bytes // combination_bytes), 1), max_from_tile_size
+
+    def _create_candidate_tiles(self, arrays: dict, to_index: ToColumnIndex, chunk_size: int, max_from_tile_size: int = None) -> list:
         """
-        Function to retrieve a mapping using the similarity matrix
+        Creates the tiles of from-to-combinations that are compared. With the
+        blocking "qgram" the q-grams of the from strings are looked up in the
+        inverted index of the to strings first and added to the arrays, so that
+        compute_tile only compares the candidates sharing enough of them.
 
         Args:
-            similarity_threshold (float): threshold which decides how
-                similar two strings need to be in order to be included
-                into the mapping and not as np.nan
-            relationship_type (str): determines whether the mapping is a "1:n"
-                / "one_to_many" or a "1:1" / "one_to_one" relationship
-            data_type (str): determines whether the returned data type is a
-                dict, a series or a data frame
-
+            arrays (dict): np.ndarrays by name as expected by compute_tile, the
+                q-gram arrays are added to it
+            to_index (ToColumnIndex): index of the to strings
+            chunk_size (int): maximum number of combinations per tile
+            max_from_tile_size (int): maximum number of from strings per tile,
+                by default unlimited
 
         Returns:
-            dict: dictionary with the mapping from the "from" to the "to" column
+            list: tuples of the from_column ids and the to_column ids of the tiles
 
-        Raises:
-            ValueError: if similarity_threshold is not between 0 and 1 or if
-                relationship_type is not "1:1" or "1:n" or if data_type is not
-                "dict", "series" or "frame"
+        """
+        len_from_column, len_to_column = arrays["from_lengths"].shape[0], arrays["to_lengths"].shape[0]
+
+        if self.blocking != "qgram":
+            with self.stats.stage("create_tiles"):
+                return list(self.create_tiles(len_from_column, len_to_column, chunk_size, max_from_tile_size))
+
+        q = self.parameters["q"]
+
+        with self.stats.stage("create_qgram_index"):
+            vocabulary, arrays["qgram_indptr"], arrays["qgram_postings"] = to_index.get_qgram_index(q)
+            arrays["from_qgram_string_ids"], arrays["from_qgram_ids"] = self.lookup_qgrams(
+                *self.create_qgrams(arrays["from_codes"], arrays["from_lengths"], q), vocabulary
+            )
+
+        with self.stats.stage("create_tiles"):
+            return list(
+                self.create_qgram_tiles(
+                    arrays["from_qgram_string_ids"],
+                    arrays["from_qgram_ids"],
+                    arrays["qgram_indptr"],
+                    len_from_column,
+                    len_to_column,
+                    chunk_size,
+                    max_from_tile_size,
+                )
+            )
+
+    def _store_results(self, arrays: dict, tiles: list, metric_weights: dict, cache_keys: tuple) -> None:
+        """
+        Computes the tiles and stores their results in the arrays of the
+        storage, the sparse results are stored as lists of arrays per tile.
+
+        Args:
+            arrays (dict): np.ndarrays by name as expected by compute_tile
+            tiles (list): tuples of the from_column ids and the to_column ids
+                of the tiles
+            metric_weights (dict): weights of the similarity metrics
+            cache_keys (tuple): cache keys of the from and the to strings
 
         """
-        if similarity_threshold < 0.0 or similarity_threshold > 1.0:
+        parameters = self.parameters
+        len_from_column, len_to_column = arrays["from_codes"].shape[0], arrays["to_codes"].shape[0]
+
+        self.distance_array = None
+        self.similarity_array = None
+
+        if self.storage == "dense":
+            self.distance_array = np.full(
+                [len_to_column, len_from_column],
+                -1,
+                self.choose_distance_dtype(max(arrays["from_codes"].shape[1], arrays["to_codes"].shape[1]), signed=True),
+            )
+            self.similarity_array = np.full([len_to_column, len_from_column], np.nan, parameters["similarity_dtype"])
+        elif self.storage == "top_k":
+            self.top_k_to_ids = np.full([len_from_column, parameters["top_k"]], -1, "int64")
+            self.top_k_similarities = np.full([len_from_column, parameters["top_k"]], np.nan, parameters["similarity_dtype"])
+        else:
+            self.sparse_from_ids, self.sparse_to_ids, self.sparse_similarities = [], [], []
 
-            raise ValueError("Parameter similarity_threshold must be between 0 and 1")
+        tile_parameters = {
+            "engine": parameters["engine"],
+            "similarity_threshold": self.similarity_threshold,
+            "blocking": self.blocking,
+            "min_shared_qgrams": parameters["min_shared_qgrams"],
+            "max_candidates": parameters["max_candidates"],
+            "metric": metric_weights,
+        }
+
+        # the results arrive in the order of the tiles whatever the number of processes
+        with contextlib.closing(self.compute_tiles(arrays, tiles, tile_parameters, parameters["n_jobs"])) as tile_results:
+            for from_tile_ids, to_tile_ids in tiles:
 
-        if relationship_type == "1:1" or relationship_type == "one_to_one":
+                with self.stats.stage("compute_tiles") as counts:
+                    from_ids, to_ids, distances, similarities = next(tile_results)
 
-            max_row_name = self.determine_unused_row_name(index=self.similarity_matrix.index)
+                    # pruned, blocked and abandoned combinations stay np.nan
+                    counts["pairs"] = int(np.count_nonzero(~np.isnan(similarities)))
+                    counts["pruned_pairs"] = from_tile_ids.shape[0] * to_tile_ids.shape[0] - counts["pairs"]
 
-            mapping, self.similarity_matrix = self.create_mapping(self.similarity_matrix, max_row_name, similarity_threshold)
+                with self.stats.stage("store_results"):
+                    self._store_tile(arrays, cache_keys, from_tile_ids, from_ids, to_ids, distances, similarities)
+
+    def _store_tile(
+        self,
+        arrays: dict,
+        cache_keys: tuple,
+        from_tile_ids: np.ndarray,
+        from_ids: np.ndarray,
+        to_ids: np.ndarray,
+        distances: np.ndarray,
+        similarities: np.ndarray,
+    ) -> None:
+        """
+        Stores the results of a tile in the storage and adds its computed
+        distances to the cache.
 
-            sub_similarity_matrix = self.similarity_matrix.copy()
-            sub_mapping = mapping.copy()
+        Args:
+            arrays (dict): np.ndarrays by name as expected by compute_tile
+            cache_keys (tuple): cache keys of the from and the to strings
+            from_tile_ids (np.ndarray): from_column ids of the tile
+            from_ids (np.ndarray): from_column ids of the combinations
+            to_ids (np.ndarray): to_column ids of the combinations
+            distances (np.ndarray): distance of every combination
+            similarities (np.ndarray): similarity of every combination
 
-            sub_similarity_matrix = self.clean_matrix(sub_similarity_matrix, sub_mapping, similarity_threshold)
+        """
+        cache = self.parameters["cache"]
 
-            while sub_similarity_matrix.shape[0] != 0 and sub_similarity_matrix.shape[1] != 0:
+        if cache is not None:
 
-                sub_mapping, sub_similarity_matrix = self.create_mapping(sub_similarity_matrix, max_row_name, similarity_threshold)
+            cached, _ = self.find_cached_combinations(arrays, from_ids, to_ids)
+            added = ~cached & (distances != -1)
 
-                mapping.fillna(sub_mapping, inplace=True)
+            cache.hits += int((cached & (distances != -1)).sum())
+            cache.misses += int(added.sum())
+            cache.store(cache_keys[0][from_ids[added]], cache_keys[1][to_ids[added]], distances[added])
 
-                sub_similarity_matrix = self.clean_matrix(sub_similarity_matrix, sub_mapping)
+        if self.storage == "dense":
 
-        elif relationship_type == "1:n" or relationship_type == "one_to_many":
+            self.distance_array[to_ids, from_ids] = distances
+            self.similarity_array[to_ids, from_ids] = similarities
 
-            mapping = self.similarity_matrix.idxmax(axis=0)
+        elif self.storage == "sparse":
 
-            similarity_threshold_mask = self.similarity_matrix.max(axis=0) < similarity_threshold
+            # compared in the stored dtype like in get_mapping, np.nan (not computed) never reaches the threshold
+            similarities = similarities.astype(self.parameters["similarity_dtype"])
+            kept = (
+                similarities >= similarities.dtype.type(self.similarity_threshold)
+                if self.similarity_threshold is not None
+                else ~np.isnan(similarities)
+            )
 
-            mapping.mask(similarity_threshold_mask, np.nan, inplace=True)
+            self.sparse_from_ids.append(from_ids[kept])
+            self.sparse_to_ids.append(to_ids[kept])
+            self.sparse_similarities.append(similarities[kept])
 
         else:
 
-            raise ValueError("Parameter relationship_type must be " "1:1" " or " "1:n" "")
+            candidate_to_ids, candidate_similarities = self.group_candidates(
+                from_ids - from_tile_ids[0], to_ids, similarities, from_tile_ids.shape[0]
+            )
 
-        if data_type == "dict":
+            self.top_k_to_ids[from_tile_ids], self.top_k_similarities[from_tile_ids] = self.merge_top_k(
+                self.top_k_to_ids[from_tile_ids],
+                self.top_k_similarities[from_tile_ids],
+                candidate_to_ids,
+                candidate_similarities.astype(self.parameters["similarity_dtype"]),
+            )
 
-            return mapping.to_dict()
+    def _finish_results(self, from_key_ids: np.ndarray) -> None:
+        """
+        Copies the results of the from keys to all from values with that key
+        and sorts the sparse results by their from and to ids.
 
-        elif data_type == "series":
+        Args:
+            from_key_ids (np.ndarray): key id of every from value, None without
+                a normalization
 
-            return mapping
+        """
+        if self.storage == "sparse":
+
+            self.sparse_from_ids = np.concatenate(self.sparse_from_ids + [np.zeros(0, "int64")])
+            self.sparse_to_ids = np.concatenate(self.sparse_to_ids + [np.zeros(0, "int64")])
+            self.sparse_similarities = np.concatenate(self.sparse_similarities + [np.zeros(0, self.parameters["similarity_dtype"])])
+
+        if from_key_ids is not None:
+            with self.stats.stage("expand_keys"):
+                if self.storage == "dense":
+                    self.distance_array = self.distance_array[:, from_key_ids]
+                    self.similarity_array = self.similarity_array[:, from_key_ids]
+                elif self.storage == "top_k":
+                    self.top_k_to_ids = self.top_k_to_ids[from_key_ids]
+                    self.top_k_similarities = self.top_k_similarities[from_key_ids]
+                else:
+                    self.sparse_from_ids, positions = self.expand_key_ids(self.sparse_from_ids, from_key_ids)
+                    self.sparse_to_ids = self.sparse_to_ids[positions]
+                    self.sparse_similarities = self.sparse_similarities[positions]
 
-        elif data_type == "frame":
+        if self.storage == "sparse":
 
-            mapping = pd.DataFrame(mapping).reset_index()
-            mapping.columns = ["from", "to"]
-            return mapping
+            order = np.lexsort((self.sparse_to_ids, self.sparse_from_ids))
 
-        else:
-            raise ValueError("Parameter data_type must be " "dict" " or " "series" " or " "frame" "")
+            self.sparse_from_ids = self.sparse_from_ids[order]
+            self.sparse_to_ids = self.sparse_to_ids[order]
+            self.sparse_similarities = self.sparse_similarities[order]
 
-    @staticmethod
-    def clean_column(column: any, column_name: str) -> pd.Series:
+    @property
+    def similarity_matrix(self) -> pd.DataFrame:
         """
-        Cleans either of the from / to columns to be a pandas Series of type str.
-
-        Args:
-            column (list, pandas.Series, np.ndarray): column to be cleaned
-            column_name (str): specifying whether this is the from or the to column
+        Similarity matrix of the storage "dense" with the to strings as rows
+        and the from strings as columns, np.nan if not computed. It is created
+        from the similarity_array on every access, None for the other storages.
 
         Returns:
-            pandas.Series: converted to type str
+            pandas.DataFrame: similarity matrix
 
-        Raises:
-            ValueError: if not of any of the expected types
+        """
+        if self.similarity_array is None:
+            return None
 
+        return pd.DataFrame(self.similarity_array, index=self.to_values.tolist(), columns=self.from_values.tolist())
+
+    @property
+    def distance_matrix(self) -> pd.DataFrame:
         """
-        if type(column) == np.ndarray:
-            column = pd.Series(column)
-        elif type(column) == list:
-            column = pd.Series(column)
-        elif type(column) == pd.Series:
-            pass
-        else:
-            raise ValueError(f"{column_name} not of type numpy.ndarray, pandas.Series or list")
-        return column.astype(str)
+        Distance matrix of the storage "dense" with the to ids as rows and the
+        from ids as columns, -1 if not computed. It is created from the
+        distance_array on every access, None for the other storages.
 
-    @staticmethod
-    def create_combinations(from_column: pd.Series, to_column: pd.Series):
+        Returns:
+            pandas.DataFrame: distance matrix
+
+        """
+        if self.distance_array is None:
+            return None
+
+        return pd.DataFrame(self.distance_array)
+
+    def add_to_values(self, to_column: any) -> None:
         """
-        Creates all combinations of strings in the from column with all strings
-        in the to column returning it as two pandas.Series to be interpreted
-        together.
+        Adds strings to the to_column of the mapper. Only the similarities of
+        the from strings to the added strings are computed, the similarity
+        matrix and the stored most similar to strings are updated in place.
+        Strings that are already part of the to_column (or whose normalized
+        key is) are ignored.
 
         Args:
-            from_column (pandas.Series): column that is mapped from
-            to_column (pandas.Series): column that is mapped to
+            to_column (list, pandas.Series, np.ndarray): list of entries to add
+                to the to_column
 
-        Returns:
-            tuple: tuple including all the combinations with the from_column strings
-                as the first entry and the to_column strings as the second
         """
+        to_column = self.select_new_values(self.clean_values(to_column, "to_column"), self.to_values)
 
-        len_to_column = to_column.shape[0]
-        len_from_column = from_column.shape[0]
+        normalization = self.parameters.get("normalization")
+        if normalization:
+            # strings with the key of an existing to str are merged into it
+            existing_keys = set(self.normalize_column(self.to_values, normalization).tolist())
+            to_column = to_column[
+                np.array([key not in existing_keys for key in self.normalize_column(to_column, normalization)], dtype=bool)
+            ]
 
-        from_column_combinations = pd.Series(from_column.tolist() * len_to_column)
+        if to_column.shape[0] == 0:
+            return
 
-        to_column_combinations = []
-        for element in to_column.tolist():
-            list_element = [element] * len_from_column
-            to_column_combinations = to_column_combinations + list_element
+        # the added strings get the ids after the existing ones
+        mapper = AutoStringMapper(self.from_values, to_column, **self.parameters)
+        offset = self.to_values.shape[0]
 
-        to_column_combinations = pd.Series(to_column_combinations)
+        if self.storage == "dense":
 
-        return from_column_combinations, to_column_combinations
+            self.distance_array = np.concatenate([self.distance_array, mapper.distance_array])
+            self.similarity_array = np.concatenate([self.similarity_array, mapper.similarity_array])
 
-    @staticmethod
-    def create_levenshtein_array(
-        from_column: pd.Series,
-        to_column: pd.Series,
-        len_from_column: int,
-        len_to_column: int,
-        maxlen_from_column: int,
-        maxlen_to_column: int,
-    ) -> np.ndarray:
+        elif self.storage == "top_k":
+
+            self.top_k_to_ids, self.top_k_similarities = self.merge_top_k(
+                self.top_k_to_ids,
+                self.top_k_similarities,
+                np.where(mapper.top_k_to_ids == -1, -1, mapper.top_k_to_ids + offset),
+                mapper.top_k_similarities,
+            )
+
+        else:
+
+            sparse_from_ids = np.concatenate([self.sparse_from_ids, mapper.sparse_from_ids])
+            sparse_to_ids = np.concatenate([self.sparse_to_ids, mapper.sparse_to_ids + offset])
+            sparse_similarities = np.concatenate([self.sparse_similarities, mapper.sparse_similarities])
+
+            order = np.lexsort((sparse_to_ids, sparse_from_ids))
+
+            self.sparse_from_ids = sparse_from_ids[order]
+            self.sparse_to_ids = sparse_to_ids[order]
+            self.sparse_similarities = sparse_similarities[order]
+
+        self.to_values = np.concatenate([self.to_values, mapper.to_values])
+        self.to_index = None
+
+    def remove_to_values(self, to_column: any) -> None:
         """
-        Creates a levenshtein matrix for alle from-to-string-combinations at the
-        same time in a vectorized fashion.
+        Removes strings from the to_column of the mapper, the similarity matrix
+        and the stored most similar to strings are updated in place. With the
+        storage "top_k" the from strings that lose one of their most similar to
+        strings are computed again, all others are kept. Strings that are not
+        part of the to_column are ignored.
 
         Args:
-            from_column (pandas.Series): combinations of the from_column (needs
-                to be read together with the to_column)
-            to_column (pandas.Series): combinations of the to_column (needs to
-                be read together with the from_column)
-            len_from_column (int): number of elements in the from_column
-            len_to_column (int): number of elements in the to_column
-            maxlen_from_column (int): number of characters in the longest str
-                of the from_column
-            maxlen_to_column (int): number of characters in the longest str
-                of the to_column
-
-        Returns:
-            np.ndarray: 3-dimensional array that includes the 2-dimensionl
-            levenshtein array for alle from-to-string-combinations
+            to_column (list, pandas.Series, np.ndarray): list of entries to
+                remove from the to_column
 
         """
+        removed_values = set(self.clean_values(to_column, "to_column").tolist())
 
-        levenshtein_array = np.zeros(
-            [len_from_column * len_to_column, maxlen_from_column, maxlen_to_column],
-            "int16",
-        )
+        removed = np.array([value in removed_values for value in self.to_values], dtype=bool)
 
-        for from_column_index in range(maxlen_from_column):
-            for to_column_index in range(maxlen_to_column):
+        if not removed.any():
+            return
 
-                if from_column_index == 0:
+        kept = ~removed
 
-                    insertion = np.array([np.iinfo("int16").max] * len_from_column * len_to_column)
+        # new id of every to str, -1 if it is removed
+        new_to_ids = np.cumsum(kept) - 1
+        new_to_ids[removed] = -1
 
-                else:
+        if self.storage == "dense":
 
-                    insertion = levenshtein_array[:, from_column_index - 1, to_column_index] + (
-                        ~pd.isnull(from_column.str[from_column_index])
-                    ).astype("int16")
+            self.distance_array = self.distance_array[kept]
+            self.similarity_array = self.similarity_array[kept]
 
-                if to_column_index == 0:
+        elif self.storage == "top_k":
 
-                    deletion = np.array([np.iinfo("int16").max] * len_from_column * len_to_column)
+            stored = self.top_k_to_ids != -1
+            affected = (stored & removed[self.top_k_to_ids]).any(axis=1)
 
-                else:
+            self.top_k_to_ids = np.where(stored, new_to_ids[self.top_k_to_ids], -1)
 
-                    deletion = levenshtein_array[:, from_column_index, to_column_index - 1] + (
-                        ~pd.isnull(to_column.str[to_column_index])
-                    ).astype("int16")
+        else:
 
-                if from_column_index == 0 or to_column_index == 0:
+            combinations = kept[self.sparse_to_ids]
 
-                    replacement = np.array([np.iinfo("int16").max] * len_from_column * len_to_column)
+            self.sparse_from_ids = self.sparse_from_ids[combinations]
+            self.sparse_to_ids = new_to_ids[self.sparse_to_ids[combinations]]
+            self.sparse_similarities = self.sparse_similarities[combinations]
 
-                    if from_column_index == 0 and to_column_index == 0:
+        self.to_values = self.to_values[kept]
+        self.to_index = None
 
-                        comparison = from_column.str[from_column_index] != to_column.str[to_column_index]
-                        replacement = comparison.astype("int16")
+        if self.storage == "top_k" and affected.any():
 
-                else:
+            mapper = AutoStringMapper(self.from_values[affected], self.get_to_index(), **self.parameters)
 
-                    comparison = from_column.str[from_column_index] != to_column.str[to_column_index]
-                    replacement = levenshtein_array[:, from_column_index - 1, to_column_index - 1] + comparison.astype("int16")
+            self.top_k_to_ids[affected] = mapper.top_k_to_ids
+            self.top_k_similarities[affected] = mapper.top_k_similarities
 
-                levenshtein_array[:, from_column_index, to_column_index] = np.array([insertion, deletion, replacement]).min(axis=0)
+    def add_from_values(self, from_column: any) -> None:
+        """
+        Adds strings to the from_column of the mapper. Only the similarities of
+        the added strings to the to strings are computed, the similarity matrix
+        and the stored most similar to strings are updated in place. Strings
+        that are already part of the from_column are ignored.
 
-        return levenshtein_array
+        Args:
+            from_column (list, pandas.Series, np.ndarray): list of entries to
+                add to the from_column
 
-    @staticmethod
-    def create_maxlen_matrix(from_column: pd.Series, to_column: pd.Series) -> pd.DataFrame:
         """
-        Creates a matrix which contains the maximum of the string lengths of all
-        from-to-combination pairs.
+        from_column = self.clean_values(from_column, "from_column")
+
+        # the strings that are already part of the from_column are only counted
+        value_ids, values = self.factorize_values(from_column)
+        counts = np.bincount(value_ids, minlength=values.shape[0])
+        positions = {value: position for position, value in enumerate(self.from_values.tolist())}
+        existing_ids = np.array([positions.get(value, -1) for value in values], dtype="int64")
+
+        self.from_counts = self.from_counts.copy()
+        np.add.at(self.from_counts, existing_ids[existing_ids != -1], counts[existing_ids != -1])
+
+        from_column = self.select_new_values(from_column, self.from_values)
+
+        if from_column.shape[0] == 0:
+            return
+
+        # the added strings get the ids after the existing ones
+        mapper = AutoStringMapper(from_column, self.get_to_index(), **self.parameters)
+        offset = self.from_values.shape[0]
+
+        if self.storage == "dense":
+
+            self.distance_array = np.concatenate([self.distance_array, mapper.distance_array], axis=1)
+            self.similarity_array = np.concatenate([self.similarity_array, mapper.similarity_array], axis=1)
+
+        elif self.storage == "top_k":
+
+            self.top_k_to_ids = np.concatenate([self.top_k_to_ids, mapper.top_k_to_ids])
+            self.top_k_similarities = np.concatenate([self.top_k_similarities, mapper.top_k_similarities])
+
+        else:
+
+            # the combinations stay sorted by their from ids
+            self.sparse_from_ids = np.concatenate([self.sparse_from_ids, mapper.sparse_from_ids + offset])
+            self.sparse_to_ids = np.concatenate([self.sparse_to_ids, mapper.sparse_to_ids])
+            self.sparse_similarities = np.concatenate([self.sparse_similarities, mapper.sparse_similarities])
+
+        self.from_values = np.concatenate([self.from_values, mapper.from_values])
+        self.from_counts = np.concatenate([self.from_counts, mapper.from_counts])
+
+    def get_key_frequencies(self, data_type: str = "series") -> any:
+        """
+        Function to retrieve how often every normalized key (every str without
+        a normalization) occurs in the from_column, duplicates included.
 
         Args:
-            from_column (pandas.Series): from_column strings
-            to_column (pandas.Series): to_column strings
+            data_type (str): determines whether the returned data type is a
+                series or a dict
 
         Returns:
-            pandas.DataFrame: matrix which contains the maximum length of the
-                pairs
+            pandas.Series: number of occurrences by key, the most frequent
+                first
+
+        Raises:
+            ValueError: if data_type is not "series" or "dict"
 
         """
+        key_ids, keys = self.factorize_values(self.normalize_column(self.from_values, self.parameters.get("normalization")))
+
+        counts = np.bincount(key_ids, weights=self.from_counts, minlength=keys.shape[0]).astype("int64")
+        order = np.argsort(-counts, kind="stable")
 
-        from_column_len = from_column.shape[0]
-        to_column_len = to_column.shape[0]
+        if data_type == "series":
 
-        divisor_frame_from = pd.concat([from_column.str.len()] * to_column_len, axis=1).T
+            return pd.Series(counts[order], index=keys[order])
 
-        # get rid of row and column index
-        divisor_frame_from = divisor_frame_from.T.reset_index(drop=True).T
-        divisor_frame_from.reset_index(drop=True, inplace=True)
+        elif data_type == "dict":
 
-        divisor_frame_to = pd.concat([to_column.str.len()] * from_column_len, axis=1)
+            return dict(zip(keys[order].tolist(), counts[order].tolist()))
+
+        else:
+            raise ValueError("Parameter data_type must be " "series" " or " "dict" "")
+
+    def get_to_index(self) -> "ToColumnIndex":
+        """
+        Function to retrieve the ToColumnIndex of the current to strings, it is
+        created again after they changed.
+
+        Returns:
+            ToColumnIndex: index of the to strings
+
+        """
+        if self.to_index is None:
+            self.to_index = ToColumnIndex(self.to_values, self.parameters["ignore_case"], self.parameters.get("normalization"))
 
-        # get rid of row and column index
-        divisor_frame_to = divisor_frame_to.T.reset_index(drop=True).T
-        divisor_frame_to.reset_index(drop=True, inplace=True)
+        return self.to_index
+
+    @staticmethod
+    def select_new_values(column: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """
+        Selects the distinct entries of a column that are not part of values.
+
+        Args:
+            column (np.ndarray): cleaned column
+            values (np.ndarray): existing values
+
+        Returns:
+            np.ndarray: new entries in the order of their first occurrence
+
+        """
+        _, column = AutoStringMapper.factorize_values(column)
+        existing_values = set(values.tolist())
+
+        return column[np.array([value not in existing_values for value in column], dtype=bool)]
+
+    def save(self, path: str) -> None:
+        """
+        Saves the computed similarities into a directory, the arrays as .npy
+        files that load can map into memory and the parameters as json.
+
+        Args:
+            path (str): directory, created if necessary
+
+        """
+        os.makedirs(path, exist_ok=True)
+
+        parameters = {name: value for name, value in self.parameters.items() if name not in ["cache", "stats"]}
+
+        with open(os.path.join(path, "mapper.json"), "w") as file:
+            json.dump(parameters, file)
+
+        if self.storage == "dense":
+            arrays = {"distances": self.distance_array, "similarities": self.similarity_array}
+        elif self.storage == "top_k":
+            arrays = {"top_k_to_ids": self.top_k_to_ids, "top_k_similarities": self.top_k_similarities}
+        else:
+            arrays = {
+                "sparse_from_ids": self.sparse_from_ids,
+                "sparse_to_ids": self.sparse_to_ids,
+                "sparse_similarities": self.sparse_similarities,
+            }
+
+        # the strings are saved as one code point buffer plus offsets, which unlike objects need no pickle and
+        # unlike fixed width unicode arrays neither grow with the longest str nor strip trailing "\0" characters
+        arrays["from_value_codes"], arrays["from_value_offsets"] = self.pack_strings(self.from_values)
+        arrays["to_value_codes"], arrays["to_value_offsets"] = self.pack_strings(self.to_values)
+        arrays["from_counts"] = self.from_counts
+
+        for name, array in arrays.items():
+            np.save(os.path.join(path, f"{name}.npy"), array)
+
+    @staticmethod
+    def load(path: str, mmap: bool = True) -> "AutoStringMapper":
+        """
+        Loads a mapper saved with save. get_mapping, get_top_k and the
+        incremental updates can be used as before, without computing any
+        similarity again.
+
+        Args:
+            path (str): directory the mapper was saved into
+            mmap (bool): whether the similarities are mapped into memory
+                instead of being read, changes of the mapper are never written
+                back
+
+        Returns:
+            AutoStringMapper: the saved mapper
+
+        """
+        mmap_mode = "c" if mmap else None
+
+        with open(os.path.join(path, "mapper.json")) as file:
+            parameters = json.load(file)
+
+        mapper = AutoStringMapper.__new__(AutoStringMapper)
+
+        mapper.storage = parameters["storage"]
+        mapper.similarity_threshold = parameters["similarity_threshold"]
+        mapper.blocking = parameters["blocking"]
+        mapper.stats = StageStats()
+        mapper.parameters = dict(parameters, cache=None, stats=mapper.stats)
+
+        for name in ["from_values", "to_values"]:
+
+            prefix = name[: -len("s")]
+
+            # mappers saved before the strings were packed hold them as unicode arrays
+            if os.path.exists(os.path.join(path, f"{prefix}_codes.npy")):
+                codes, offsets = np.load(os.path.join(path, f"{prefix}_codes.npy")), np.load(os.path.join(path, f"{prefix}_offsets.npy"))
+                setattr(mapper, name, AutoStringMapper.unpack_strings(codes, offsets))
+            else:
+                setattr(mapper, name, np.load(os.path.join(path, f"{name}.npy")).astype(object))
+
+        mapper.from_counts = np.load(os.path.join(path, "from_counts.npy"))
+        mapper.to_index = None
+
+        if mapper.storage == "dense":
+
+            mapper.distance_array = np.load(os.path.join(path, "distances.npy"), mmap_mode=mmap_mode)
+            mapper.similarity_array = np.load(os.path.join(path, "similarities.npy"), mmap_mode=mmap_mode)
+
+        else:
+
+            mapper.distance_array = None
+            mapper.similarity_array = None
+
+            if mapper.storage == "top_k":
+                names = ["top_k_to_ids", "top_k_similarities"]
+            else:
+                names = ["sparse_from_ids", "sparse_to_ids", "sparse_similarities"]
+
+            for name in names:
+                setattr(mapper, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode))
+
+        return mapper
+
+    @staticmethod
+    def compute_tile(
+        arrays: dict,
+        from_tile_ids: np.ndarray,
+        to_tile_ids: np.ndarray,
+        engine: str = "dp",
+        similarity_threshold: float = None,
+        blocking: str = None,
+        min_shared_qgrams: int = 1,
+        max_candidates: int = None,
+        metric: dict = None,
+    ) -> tuple:
+        """
+        Computes the levenshtein distances and similarities of the
+        from-to-combinations of a tile.
+
+        Args:
+            arrays (dict): np.ndarrays by name, the encoded strings
+                ("from_codes", "to_codes", "from_lengths", "to_lengths"), the
+                original str lengths ("from_string_lengths",
+                "to_string_lengths") and optionally the histograms
+                ("from_histograms", "to_histograms") and the q-gram index
+                ("from_qgram_string_ids", "from_qgram_ids", "qgram_indptr",
+                "qgram_postings") and the distances of a DistanceCache
+                ("from_cache_ids", "to_cache_ids", "cached_keys",
+                "cached_distances")
+            from_tile_ids (np.ndarray): from_column ids of the tile
+            to_tile_ids (np.ndarray): to_column ids of the tile
+            engine (str): "dp" or "bitparallel"
+            similarity_threshold (float): minimum similarity, combinations that
+                can not reach it are not computed
+            blocking (str): None or "qgram"
+            min_shared_qgrams (int): minimum number of shared q-grams
+            max_candidates (int): maximum number of to strings per from str
+            metric (dict): weights of the similarity metrics by name, by
+                default only "levenshtein"
+
+        Returns:
+            tuple: tuple of the from_ids, the to_ids, the distances (-1 if not
+                computed) and the similarities (np.nan if not computed) of the
+                combinations
+
+        """
+        if metric is None:
+            metric = {"levenshtein": 1.0}
+
+        if list(metric) == ["damerau"]:
+            create_levenshtein_array = AutoStringMapper.create_damerau_levenshtein_array
+        elif engine == "bitparallel":
+            create_levenshtein_array = AutoStringMapper.create_bitparallel_levenshtein_array
+        else:
+            create_levenshtein_array = AutoStringMapper.create_levenshtein_array
+
+        from_codes = arrays["from_codes"]
+        to_codes = arrays["to_codes"]
+        from_lengths = arrays["from_lengths"]
+        to_lengths = arrays["to_lengths"]
+
+        if blocking == "qgram":
+            from_ids, to_ids = AutoStringMapper.create_qgram_candidates(
+                arrays["from_qgram_string_ids"],
+                arrays["from_qgram_ids"],
+                arrays["qgram_indptr"],
+                arrays["qgram_postings"],
+                from_tile_ids,
+                to_codes.shape[0],
+                min_shared_qgrams,
+                max_candidates,
+            )
+        else:
+            from_ids, to_ids = AutoStringMapper.create_combinations(from_tile_ids, to_tile_ids)
+
+        if list(metric) not in [["levenshtein"], ["damerau"]]:
+
+            # without a distance every combination is computed, the similarity is the weighted mean of the metrics
+            similarities = sum(weight * similarity_metrics[name](arrays, from_ids, to_ids) for name, weight in metric.items())
+
+            return from_ids, to_ids, np.full(from_ids.shape[0], -1, "int16"), similarities / sum(metric.values())
+
+        # -1 marks the combinations that are not computed
+        distance_dtype = AutoStringMapper.choose_distance_dtype(max(from_codes.shape[1], to_codes.shape[1]), signed=True)
+
+        maxlen = np.maximum(arrays["from_string_lengths"][from_ids], arrays["to_string_lengths"][to_ids]).astype("float64")
+
+        if similarity_threshold is None:
+            computed = np.ones(from_ids.shape[0], "bool")
+        else:
+            computed = AutoStringMapper.prune_combinations(
+                from_ids,
+                to_ids,
+                from_lengths,
+                to_lengths,
+                maxlen,
+                similarity_threshold,
+                arrays.get("from_histograms"),
+                arrays.get("to_histograms"),
+            )
+
+        # unlike the levenshtein distance, the damerau levenshtein distance of
+        # two empty strings is zero, so they reach every threshold
+        if list(metric) == ["damerau"]:
+            computed |= maxlen == 0
+
+        distances = np.full(from_ids.shape[0], -1, distance_dtype)
+        similarities = np.full(from_ids.shape[0], np.nan, "float64")
+
+        # the distances found in a DistanceCache are not computed again
+        if "cached_keys" in arrays:
+            cached, positions = AutoStringMapper.find_cached_combinations(arrays, from_ids, to_ids)
+            cached &= computed
+            distances[cached] = arrays["cached_distances"][positions[cached]]
+            pending = computed & ~cached
+        else:
+            pending = computed
+
+        if similarity_threshold is not None and computed.any():
+
+            # one more than the largest distance reaching the threshold, so
+            # that rounding never cuts off a combination
+            max_distances = np.floor((1 - similarity_threshold) * maxlen).astype("int64") + 1
+
+            if pending.any():
+                distances[pending] = create_levenshtein_array(
+                    from_codes, to_codes, from_lengths, to_lengths, from_ids[pending], to_ids[pending], max_distances[pending]
+                )
+
+            # combinations beyond their max_distance were abandoned early
+            computed &= distances <= max_distances
+            distances[~computed] = -1
+
+        elif pending.any():
+
+            distances[pending] = create_levenshtein_array(
+                from_codes, to_codes, from_lengths, to_lengths, from_ids[pending], to_ids[pending]
+            )
+
+        # two empty strings have a maxlen of zero, like pandas the similarity becomes -inf
+        with np.errstate(divide="ignore", invalid="ignore"):
+            similarities[computed] = 1 - (distances[computed] / maxlen[computed])
+
+        if list(metric) == ["damerau"]:
+            similarities[computed & (maxlen == 0)] = 1.0
+
+        return from_ids, to_ids, distances, similarities
+
+    @staticmethod
+    def register_metric(name: str, function: callable) -> None:
+        """
+        Registers a similarity metric under a name, so that it can be used as
+        metric of an AutoStringMapper, also within a weighted combination.
+
+        Args:
+            name (str): name of the metric
+            function (callable): computes the similarities of many
+                from-to-combinations at the same time, called with the arrays
+                of compute_tile, the from_ids and the to_ids of the
+                combinations and returning a np.ndarray of similarities
+
+        """
+        similarity_metrics[name] = function
+
+    @staticmethod
+    def compute_levenshtein_similarities(arrays: dict, from_ids: np.ndarray, to_ids: np.ndarray) -> np.ndarray:
+        """
+        Computes the levenshtein similarities (one minus the distance divided by
+        the length of the longer str) of from-to-combinations.
+
+        Args:
+            arrays (dict): np.ndarrays by name as expected by compute_tile
+            from_ids (np.ndarray): from_column ids of the combinations
+            to_ids (np.ndarray): to_column ids of the combinations
+
+        Returns:
+            np.ndarray: similarity of every combination
+
+        """
+        distances = AutoStringMapper.create_levenshtein_array(
+            arrays["from_codes"], arrays["to_codes"], arrays["from_lengths"], arrays["to_lengths"], from_ids, to_ids
+        )
+        maxlen = np.maximum(arrays["from_string_lengths"][from_ids], arrays["to_string_lengths"][to_ids])
+
+        # two empty strings have a maxlen of zero, like pandas the similarity becomes -inf
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return 1 - (distances / maxlen)
+
+    @staticmethod
+    def compute_damerau_similarities(arrays: dict, from_ids: np.ndarray, to_ids: np.ndarray) -> np.ndarray:
+        """
+        Computes the damerau levenshtein similarities (one minus the distance
+        divided by the length of the longer str) of from-to-combinations, two
+        empty strings have a similarity of one.
+
+        Args:
+            arrays (dict): np.ndarrays by name as expected by compute_tile
+            from_ids (np.ndarray): from_column ids of the combinations
+            to_ids (np.ndarray): to_column ids of the combinations
+
+        Returns:
+            np.ndarray: similarity of every combination
+
+        """
+        distances = AutoStringMapper.create_damerau_levenshtein_array(
+            arrays["from_codes"], arrays["to_codes"], arrays["from_lengths"], arrays["to_lengths"], from_ids, to_ids
+        )
+        maxlen = np.maximum(arrays["from_string_lengths"][from_ids], arrays["to_string_lengths"][to_ids])
+
+        return 1 - distances / np.maximum(maxlen, 1)
+
+    @staticmethod
+    def compute_jaro_winkler_similarities(arrays: dict, from_ids: np.ndarray, to_ids: np.ndarray) -> np.ndarray:
+        """
+        Computes the jaro winkler similarities of from-to-combinations. The
+        jaro similarity counts the characters that match within a window of
+        half the longer str and how many of them are transposed, similarities
+        above 0.7 are raised for a common prefix of up to four characters. Two
+        empty strings have a similarity of one.
+
+        Args:
+            arrays (dict): np.ndarrays by name as expected by compute_tile
+            from_ids (np.ndarray): from_column ids of the combinations
+            to_ids (np.ndarray): to_column ids of the combinations
+
+        Returns:
+            np.ndarray: similarity of every combination
+
+        """
+        from_lengths = arrays["from_lengths"][from_ids]
+        to_lengths = arrays["to_lengths"][to_ids]
+
+        # the padding of the strings is replaced by values that never match
+        from_codes = np.where(np.arange(arrays["from_codes"].shape[1]) < from_lengths[:, None], arrays["from_codes"][from_ids], -1)
+        to_codes = np.where(np.arange(arrays["to_codes"].shape[1]) < to_lengths[:, None], arrays["to_codes"][to_ids], -2)
+
+        windows = np.maximum(np.maximum(from_lengths, to_lengths) // 2 - 1, 0)
+        max_window = int(windows.max(initial=0))
+
+        from_matched = np.zeros(from_codes.shape, "bool")
+        to_matched = np.zeros(to_codes.shape, "bool")
+
+        # every from character matches the first unmatched equal to character within its window
+        for from_position in range(int(from_lengths.max(initial=0))):
+
+            start = max(from_position - max_window, 0)
+            stop = min(from_position + max_window + 1, to_codes.shape[1])
+
+            # the window lies behind the end of every to str
+            if start >= stop:
+                continue
+
+            candidates = (to_codes[:, start:stop] == from_codes[:, from_position, None]) & ~to_matched[:, start:stop]
+            candidates &= np.abs(np.arange(start, stop) - from_position) <= windows[:, None]
+
+            rows = np.flatnonzero(candidates.any(axis=1))
+            to_matched[rows, start + candidates[rows].argmax(axis=1)] = True
+            from_matched[rows, from_position] = True
+
+        matches = from_matched.sum(axis=1)
+        length = min(from_codes.shape[1], to_codes.shape[1])
+
+        # the matched characters of both strings in their order, half of the differing ones are transposed
+        from_sequences = np.full([from_codes.shape[0], length], -1)
+        rows, columns = np.nonzero(from_matched)
+        from_sequences[rows, np.cumsum(from_matched, axis=1)[rows, columns] - 1] = from_codes[rows, columns]
+
+        to_sequences = np.full([to_codes.shape[0], length], -1)
+        rows, columns = np.nonzero(to_matched)
+        to_sequences[rows, np.cumsum(to_matched, axis=1)[rows, columns] - 1] = to_codes[rows, columns]
+
+        transpositions = (from_sequences != to_sequences).sum(axis=1) // 2
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            jaro = np.where(matches > 0, (matches / from_lengths + matches / to_lengths + (matches - transpositions) / matches) / 3, 0.0)
+
+        jaro[(from_lengths == 0) & (to_lengths == 0)] = 1.0
+
+        length = min(4, length)
+        prefixes = np.cumprod(from_codes[:, :length] == to_codes[:, :length], axis=1).sum(axis=1)
+
+        return np.where(jaro > 0.7, jaro + 0.1 * prefixes * (1 - jaro), jaro)
+
+    @staticmethod
+    def compute_token_set_similarities(arrays: dict, from_ids: np.ndarray, to_ids: np.ndarray) -> np.ndarray:
+        """
+        Computes the token set similarities (the number of shared words divided
+        by the number of distinct words of both strings) of from-to-combinations,
+        two strings without words have a similarity of one.
+
+        Args:
+            arrays (dict): np.ndarrays by name as expected by compute_tile
+                including the "token" profiles of create_profiles
+            from_ids (np.ndarray): from_column ids of the combinations
+            to_ids (np.ndarray): to_column ids of the combinations
+
+        Returns:
+            np.ndarray: similarity of every combination
+
+        """
+        shared = AutoStringMapper.compute_profile_products(arrays, "token", from_ids, to_ids)
+
+        # every word is counted once, so the squared norms are the numbers of words
+        union = np.round(arrays["from_token_norms"][from_ids] ** 2 + arrays["to_token_norms"][to_ids] ** 2) - shared
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(union > 0, shared / union, 1.0)
+
+    @staticmethod
+    def compute_qgram_cosine_similarities(arrays: dict, from_ids: np.ndarray, to_ids: np.ndarray) -> np.ndarray:
+        """
+        Computes the cosine similarities of the q-gram counts of
+        from-to-combinations, two strings without q-grams have a similarity of
+        one.
+
+        Args:
+            arrays (dict): np.ndarrays by name as expected by compute_tile
+                including the "qgram_profile" profiles of create_profiles
+            from_ids (np.ndarray): from_column ids of the combinations
+            to_ids (np.ndarray): to_column ids of the combinations
+
+        Returns:
+            np.ndarray: similarity of every combination
+
+        """
+        products = AutoStringMapper.compute_profile_products(arrays, "qgram_profile", from_ids, to_ids)
+        from_norms = arrays["from_qgram_profile_norms"][from_ids]
+        to_norms = arrays["to_qgram_profile_norms"][to_ids]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(from_norms * to_norms > 0, products / (from_norms * to_norms), (from_norms == 0) & (to_norms == 0))
+
+    @staticmethod
+    def create_tokens(codes: np.ndarray, lengths: np.ndarray) -> tuple:
+        """
+        Splits every str of a column into its words (runs of letters, digits
+        and underscores).
+
+        Args:
+            codes (np.ndarray): code point matrix of the unique strings as
+                created by encode_column
+            lengths (np.ndarray): number of characters of the strings
+
+        Returns:
+            tuple: tuple of the str ids and their words (np.ndarrays)
+
+        """
+        strings = np.where(np.arange(codes.shape[1]) < lengths[:, None], codes, 0).astype("<u4").view(f"<U{codes.shape[1]}").ravel()
+
+        tokens = [re.findall(r"\w+", string) for string in strings.tolist()]
+
+        string_ids = np.repeat(np.arange(len(tokens)), [len(string_tokens) for string_tokens in tokens])
+
+        return string_ids, np.array([token for string_tokens in tokens for token in string_tokens], dtype=str)
+
+    @staticmethod
+    def create_profiles(
+        from_string_ids: np.ndarray,
+        from_features: np.ndarray,
+        to_string_ids: np.ndarray,
+        to_features: np.ndarray,
+        len_from_column: int,
+        len_to_column: int,
+        name: str,
+        distinct: bool = False,
+    ) -> dict:
+        """
+        Counts how often every feature (e.g. word or q-gram) occurs in every
+        from and to str, so that compute_profile_products can compare them.
+
+        Args:
+            from_string_ids (np.ndarray): from str id of every feature
+            from_features (np.ndarray): features of the from strings
+            to_string_ids (np.ndarray): to str id of every feature
+            to_features (np.ndarray): features of the to strings
+            len_from_column (int): number of elements in the from_column
+            len_to_column (int): number of elements in the to_column
+            name (str): prefix of the names of the arrays
+            distinct (bool): whether every feature is counted once per str
+
+        Returns:
+            dict: np.ndarrays by name, the offsets, feature ids and counts of
+                the from strings, the keys (to id times the vocabulary size
+                plus the feature id) and counts of the to strings, the norms of
+                the counts of both and the vocabulary size
+
+        """
+        vocabulary, feature_ids = np.unique(np.concatenate([from_features, to_features]), return_inverse=True)
+        vocabulary_size = max(vocabulary.shape[0], 1)
+
+        from_keys, from_counts = np.unique(from_string_ids * vocabulary_size + feature_ids[: from_features.shape[0]], return_counts=True)
+        to_keys, to_counts = np.unique(to_string_ids * vocabulary_size + feature_ids[from_features.shape[0] :], return_counts=True)
+
+        if distinct:
+            from_counts = np.ones_like(from_counts)
+            to_counts = np.ones_like(to_counts)
+
+        from_indptr = np.zeros(len_from_column + 1, "int64")
+        np.cumsum(np.bincount(from_keys // vocabulary_size, minlength=len_from_column), out=from_indptr[1:])
+
+        return {
+            f"from_{name}_indptr": from_indptr,
+            f"from_{name}_feature_ids": from_keys % vocabulary_size,
+            f"from_{name}_counts": from_counts.astype("float64"),
+            f"from_{name}_norms": np.sqrt(np.bincount(from_keys // vocabulary_size, from_counts ** 2.0, minlength=len_from_column)),
+            f"to_{name}_keys": to_keys,
+            f"to_{name}_counts": to_counts.astype("float64"),
+            f"to_{name}_norms": np.sqrt(np.bincount(to_keys // vocabulary_size, to_counts ** 2.0, minlength=len_to_column)),
+            f"{name}_vocabulary_size": np.array([vocabulary_size]),
+        }
+
+    @staticmethod
+    def compute_profile_products(arrays: dict, name: str, from_ids: np.ndarray, to_ids: np.ndarray) -> np.ndarray:
+        """
+        Computes the dot products of the feature counts of from-to-combinations.
+
+        Args:
+            arrays (dict): np.ndarrays by name including the profiles of
+                create_profiles
+            name (str): prefix of the names of the profile arrays
+            from_ids (np.ndarray): from_column ids of the combinations
+            to_ids (np.ndarray): to_column ids of the combinations
+
+        Returns:
+            np.ndarray: dot product of every combination
+
+        """
+        from_indptr = arrays[f"from_{name}_indptr"]
+        to_keys = arrays[f"to_{name}_keys"]
+
+        if to_keys.shape[0] == 0:
+            return np.zeros(from_ids.shape[0], "float64")
+
+        # every feature of the from str of every combination is looked up in its to str
+        starts = from_indptr[from_ids]
+        counts = from_indptr[from_ids + 1] - starts
+        combinations = np.repeat(np.arange(from_ids.shape[0]), counts)
+        positions = np.arange(combinations.shape[0]) - np.repeat(np.cumsum(counts) - counts - starts, counts)
+
+        keys = to_ids[combinations] * arrays[f"{name}_vocabulary_size"][0] + arrays[f"from_{name}_feature_ids"][positions]
+        to_positions = np.minimum(np.searchsorted(to_keys, keys), to_keys.shape[0] - 1)
+        shared = to_keys[to_positions] == keys
+
+        return np.bincount(
+            combinations[shared],
+            arrays[f"from_{name}_counts"][positions[shared]] * arrays[f"to_{name}_counts"][to_positions[shared]],
+            minlength=from_ids.shape[0],
+        )
+
+    @staticmethod
+    def find_cached_combinations(arrays: dict, from_ids: np.ndarray, to_ids: np.ndarray) -> tuple:
+        """
+        Finds the from-to-combinations whose distance was looked up in a
+        DistanceCache.
+
+        Args:
+            arrays (dict): np.ndarrays by name, the cache ids of the from and
+                to strings ("from_cache_ids", "to_cache_ids") and the sorted
+                keys and distances of the cached combinations ("cached_keys",
+                "cached_distances")
+            from_ids (np.ndarray): from_column ids of the combinations
+            to_ids (np.ndarray): to_column ids of the combinations
+
+        Returns:
+            tuple: tuple of whether every combination is cached and its
+                position in the cached_distances
+
+        """
+        cached_keys = arrays["cached_keys"]
+
+        if cached_keys.shape[0] == 0:
+            return np.zeros(from_ids.shape[0], "bool"), np.zeros(from_ids.shape[0], "int64")
+
+        # strings with the same cache id (e.g. differing only in case) share their distances
+        keys = arrays["from_cache_ids"][from_ids] * (arrays["to_cache_ids"].max() + 1) + arrays["to_cache_ids"][to_ids]
+
+        positions = np.minimum(np.searchsorted(cached_keys, keys), cached_keys.shape[0] - 1)
+
+        return cached_keys[positions] == keys, positions
+
+    @staticmethod
+    def compute_tiles(arrays: dict, tiles: list, tile_parameters: dict, n_jobs: int = 1):
+        """
+        Computes the tiles one after another or, if n_jobs is larger than one,
+        in a pool of processes. The arrays are then copied into shared memory
+        once instead of being sent along with every tile.
+
+        Args:
+            arrays (dict): np.ndarrays by name as expected by compute_tile
+            tiles (list): tuples of the from_column ids and the to_column ids
+                of the tiles
+            tile_parameters (dict): further keyword arguments of compute_tile
+            n_jobs (int): number of processes
+
+        Yields:
+            tuple: result of compute_tile for every tile in the order of the
+                tiles
+
+        """
+        if n_jobs == 1 or len(tiles) < 2:
+
+            for from_tile_ids, to_tile_ids in tiles:
+                yield AutoStringMapper.compute_tile(arrays, from_tile_ids, to_tile_ids, **tile_parameters)
+
+            return
+
+        # only imported here, it takes longer to import than small mappings take
+        from concurrent.futures import ProcessPoolExecutor
+
+        shared_memories = []
+        try:
+
+            descriptions = {}
+            for name, array in arrays.items():
+                shared_memory = SharedMemory(create=True, size=max(array.nbytes, 1))
+                shared_memories.append(shared_memory)
+                np.ndarray(array.shape, array.dtype, buffer=shared_memory.buf)[...] = array
+                descriptions[name] = (shared_memory.name, array.shape, array.dtype.str)
+
+            with ProcessPoolExecutor(
+                max_workers=min(n_jobs, len(tiles)), initializer=AutoStringMapper.attach_shared_arrays, initargs=(descriptions,)
+            ) as executor:
+
+                yield from executor.map(
+                    AutoStringMapper.compute_shared_tile,
+                    [from_tile_ids for from_tile_ids, _ in tiles],
+                    [to_tile_ids for _, to_tile_ids in tiles],
+                    [tile_parameters] * len(tiles),
+                )
+
+        finally:
+
+            for shared_memory in shared_memories:
+                shared_memory.close()
+                shared_memory.unlink()
+
+    @staticmethod
+    def attach_shared_arrays(descriptions: dict) -> None:
+        """
+        Makes the arrays that compute_tiles copied into shared memory available
+        to compute_shared_tile in a process of the pool.
+
+        Args:
+            descriptions (dict): tuples of the shared memory name, the shape and
+                the dtype of the arrays by name
+
+        """
+        for name, (shared_memory_name, shape, dtype) in descriptions.items():
+            shared_memory = SharedMemory(name=shared_memory_name)
+            # keeps the shared memory open as long as the process lives
+            shared_arrays[f"{name}_shared_memory"] = shared_memory
+            shared_arrays[name] = np.ndarray(shape, dtype, buffer=shared_memory.buf)
+
+    @staticmethod
+    def compute_shared_tile(from_tile_ids: np.ndarray, to_tile_ids: np.ndarray, tile_parameters: dict) -> tuple:
+        """
+        Calls compute_tile with the shared arrays in a process of the pool.
+
+        Args:
+            from_tile_ids (np.ndarray): from_column ids of the tile
+            to_tile_ids (np.ndarray): to_column ids of the tile
+            tile_parameters (dict): further keyword arguments of compute_tile
+
+        Returns:
+            tuple: result of compute_tile
+
+        """
+        return AutoStringMapper.compute_tile(shared_arrays, from_tile_ids, to_tile_ids, **tile_parameters)
+
+    @staticmethod
+    def merge_top_k(
+        to_ids: np.ndarray,
+        similarities: np.ndarray,
+        candidate_to_ids: np.ndarray,
+        candidate_similarities: np.ndarray,
+    ) -> tuple:
+        """
+        Merges new candidates into the most similar to strings of some from
+        strings. Candidates are ranked by their similarity and, like idxmax, by
+        the lower to id if the similarity is the same.
+
+        Args:
+            to_ids (np.ndarray): current most similar to ids per from str
+                (rows), -1 for empty places
+            similarities (np.ndarray): similarities of the current to_ids,
+                np.nan for empty places
+            candidate_to_ids (np.ndarray): to ids of the new candidates per from
+                str (rows)
+            candidate_similarities (np.ndarray): similarities of the new
+                candidates
+
+        Returns:
+            tuple: tuple of the merged to ids and similarities with the same
+                shape as to_ids
+
+        """
+        merged_to_ids = np.concatenate([to_ids, candidate_to_ids], axis=1)
+        merged_similarities = np.concatenate([similarities, candidate_similarities], axis=1)
+
+        # np.nan (empty places) are sorted behind every similarity
+        order = np.lexsort((merged_to_ids, -merged_similarities), axis=1)[:, : to_ids.shape[1]]
+
+        return np.take_along_axis(merged_to_ids, order, axis=1), np.take_along_axis(merged_similarities, order, axis=1)
+
+    @staticmethod
+    def group_candidates(rows: np.ndarray, to_ids: np.ndarray, similarities: np.ndarray, number_of_rows: int) -> tuple:
+        """
+        Groups from-to-combinations by their from str into one row per from
+        str as expected by merge_top_k, rows with fewer candidates are padded
+        with -1 and np.nan.
+
+        Args:
+            rows (np.ndarray): row of every combination (position of its from
+                str in the tile)
+            to_ids (np.ndarray): to ids of the combinations
+            similarities (np.ndarray): similarities of the combinations
+            number_of_rows (int): number of from strings in the tile
+
+        Returns:
+            tuple: tuple of the to ids and the similarities with one row per
+                from str
+
+        """
+        order = np.argsort(rows, kind="stable")
+        rows = rows[order]
+
+        counts = np.bincount(rows, minlength=number_of_rows)
+        columns = np.arange(rows.shape[0]) - np.repeat(np.cumsum(counts) - counts, counts)
+
+        candidate_to_ids = np.full([number_of_rows, counts.max(initial=0)], -1, "int64")
+        candidate_similarities = np.full([number_of_rows, counts.max(initial=0)], np.nan, "float64")
+
+        candidate_to_ids[rows, columns] = to_ids[order]
+        candidate_similarities[rows, columns] = similarities[order]
+
+        return candidate_to_ids, candidate_similarities
+
+    def get_top_k(self, k: int = None, similarity_threshold: float = 0.0, data_type: str = "dict") -> any:
+        """
+        Function to retrieve the k most similar to strings of every from str
+        ranked by their similarity, e.g. to review alternatives of a mapping.
+
+        Args:
+            k (int): number of candidates per from str, by default top_k for
+                storage "top_k" and 1 otherwise
+            similarity_threshold (float): minimum similarity of a candidate
+            data_type (str): determines whether the returned data type is a
+                dict of lists of (to str, similarity) tuples or a data frame
+                with the columns "from", "to", "similarity" and "rank"
+
+        Returns:
+            dict: dictionary with the ranked candidates of every from str
+
+        Raises:
+            ValueError: if k is not positive or larger than top_k for storage
+                "top_k" or if data_type is not "dict" or "frame"
+
+        """
+        if self.storage == "top_k":
+
+            if k is None:
+                k = self.top_k_to_ids.shape[1]
+
+            if k < 1 or k > self.top_k_to_ids.shape[1]:
+
+                raise ValueError("Parameter k must be between 1 and top_k")
+
+            to_ids = self.top_k_to_ids[:, :k]
+            similarities = self.top_k_similarities[:, :k]
+
+        else:
+
+            if k is None:
+                k = 1
+
+            if k < 1:
+
+                raise ValueError("Parameter k must be positive")
+
+        if self.storage == "dense":
+
+            similarity_array = self.similarity_array
+            to_id_array = np.broadcast_to(np.arange(similarity_array.shape[0])[:, None], similarity_array.shape)
+
+            order = np.lexsort((to_id_array, -similarity_array), axis=0)[:k].T
+
+            to_ids = order
+            similarities = np.take_along_axis(similarity_array, order.T, axis=0).T
+
+        elif self.storage == "sparse":
+
+            order = np.lexsort((self.sparse_to_ids, -self.sparse_similarities, self.sparse_from_ids))
+            sorted_from_ids = self.sparse_from_ids[order]
+            order = order[np.arange(order.shape[0]) - np.searchsorted(sorted_from_ids, sorted_from_ids) < k]
+
+            to_ids, similarities = self.group_candidates(
+                self.sparse_from_ids[order], self.sparse_to_ids[order], self.sparse_similarities[order], self.from_values.shape[0]
+            )
+
+        from_ids, ranks = np.nonzero(similarities >= similarities.dtype.type(similarity_threshold))
+
+        if data_type == "dict":
+
+            top_k = {from_value: [] for from_value in self.from_values}
+            for from_id, rank in zip(from_ids, ranks):
+                top_k[self.from_values[from_id]].append((self.to_values[to_ids[from_id, rank]], float(similarities[from_id, rank])))
+            return top_k
+
+        elif data_type == "frame":
+
+            return pd.DataFrame(
+                {
+                    "from": self.from_values[from_ids],
+                    "to": self.to_values[to_ids[from_ids, ranks]],
+                    "similarity": similarities[from_ids, ranks],
+                    "rank": ranks + 1,
+                }
+            )
+
+        else:
+            raise ValueError('Parameter data_type must be "dict" or "frame"')
+
+    @staticmethod
+    def determine_unused_row_name(index: pd.Index) -> str:
+        """
+        Searches and index for a suitable row name for the max column and
+        creates one that is not in the index by appending.
+
+        Args:
+            index (pd.Index): index to be checked for the row name
+
+        Returns:
+            str: a row name that is not in the index
+
+        """
+        row_name = "max"
+        while row_name in index:
+            row_name += "max"
+        return row_name
+
+    @staticmethod
+    def create_mapping(similarity_matrix: pd.DataFrame, max_row_name: str, similarity_threshold: float) -> tuple:
+        """
+        creats a mapping for a similarity matrix using a threshold and an unused row name
+
+        Args:
+            similarity_matrix (pd.DataFrame): similarity matrix to build the
+                                              mapping on
+            max_row_name (str): row name not used as a column
+            similarity_threshold (float): minimum similarity in order to map
+
+        Returns:
+            tuple: tuple of the updated similarity_matrix (pd.DataFrame) and the
+                   created mapping (pd.Series)
+
+        """
+        similarity_matrix.loc[max_row_name] = similarity_matrix.max(axis=0)
+
+        similarity_matrix.sort_values(by=max_row_name, ascending=False, axis=1, inplace=True)
+
+        similarity_matrix.drop([max_row_name], inplace=True)
+
+        mapping = similarity_matrix.idxmax(axis=0)
+
+        duplication_mask = mapping.duplicated(keep="first")
+
+        similarity_threshold_mask = similarity_matrix.max(axis=0) < similarity_threshold
+
+        net_mask = duplication_mask | similarity_threshold_mask
+
+        mapping.mask(net_mask, np.nan, inplace=True)
+
+        return mapping, similarity_matrix
+
+    def clean_matrix(self, sub_similarity_matrix, sub_mapping, similarity_threshold=0):
+        """
+        Function clean the similarity matrix of columns and indices that are
+        already in the mapping or that will never be in there as there best
+        similarity is below the threshold
+
+        Args:
+            sub_similarity_matrix (pd.DataFrame): similarity matrix that needs
+                to be cleaned
+            sub_mapping (pd.Series): current version of the mapping with the
+                values that are to be cleaned
+            similarity_threshold (float): threshold which decides how
+                similar two strings need to be in order to be included
+                into the mapping and not as np.nan
+
+
+        Returns:
+            pd.DataFrame: updated similarity_matrix
+
+        """
+        for index, column in sub_mapping.iteritems():
+            if not pd.isnull(column):
+
+                sub_similarity_matrix.drop(columns=index, inplace=True)
+                sub_similarity_matrix.drop(index=column, inplace=True)
+
+        for column in sub_similarity_matrix.index[sub_similarity_matrix.max(axis=0) < similarity_threshold]:
+            sub_similarity_matrix.drop(index=column, inplace=True)
+
+        return sub_similarity_matrix
+
+    def get_mapping(
+        self,
+        similarity_threshold: float = 0.0,
+        relationship_type: str = "1:n",
+        data_type: str = "dict",
+    ) -> dict:
+        """
+        Function to retrieve a mapping using the similarity matrix
+
+        Args:
+            similarity_threshold (float): threshold which decides how
+                similar two strings need to be in order to be included
+                into the mapping and not as np.nan
+            relationship_type (str): determines whether the mapping is a "1:n"
+                / "one_to_many" or a "1:1" / "one_to_one" relationship
+            data_type (str): determines whether the returned data type is a
+                dict, a series, a data frame or "sparse", a dict with the
+                "from_ids", "to_ids" and float32 "similarities" of the mapped
+                strings as well as the "from_values" and "to_values" the ids
+                point into
+
+
+        Returns:
+            dict: dictionary with the mapping from the "from" to the "to" column
+
+        Raises:
+            ValueError: if similarity_threshold is not between 0 and 1 or if
+                relationship_type is not "1:1" or "1:n" or if data_type is not
+                "dict", "series", "frame" or "sparse" or if relationship_type is
+                "1:1" but the storage is "top_k" or if similarity_threshold is
+                below the one the mapper was created with
+
+        """
+        if similarity_threshold < 0.0 or similarity_threshold > 1.0:
+
+            raise ValueError("Parameter similarity_threshold must be between 0 and 1")
+
+        if self.similarity_threshold is not None and similarity_threshold < self.similarity_threshold:
+
+            raise ValueError("Parameter similarity_threshold must not be below the one the mapper was created with")
+
+        len_from_column = self.from_values.shape[0]
+
+        with self.stats.stage("get_mapping") as counts:
+            if relationship_type == "1:1" or relationship_type == "one_to_one":
+
+                if self.storage == "top_k":
+
+                    raise ValueError('Parameter relationship_type "1:1" needs the storage "dense" or "sparse"')
+
+                from_ids, to_ids, similarities = self.get_combinations(similarity_threshold)
+
+                with self.stats.stage("create_one_to_one_assignment") as assignment_counts:
+                    mapped_to_ids = self.create_one_to_one_assignment(
+                        from_ids, to_ids, similarities, len_from_column, self.to_values.shape[0]
+                    )
+                    assignment_counts["pairs"] = from_ids.shape[0]
+
+                # the similarity of the assigned combination of every from str
+                mapped_similarities = np.full(len_from_column, np.nan, "float64")
+                assigned = mapped_to_ids[from_ids] == to_ids
+                mapped_similarities[from_ids[assigned]] = similarities[assigned]
+
+                pairs = from_ids.shape[0]
+
+            elif (relationship_type == "1:n" or relationship_type == "one_to_many") and self.storage == "dense":
+
+                # pruned and blocked combinations (np.nan) are below the threshold anyway
+                similarity_array = np.nan_to_num(self.similarity_array, nan=-np.inf)
+
+                if similarity_array.shape[0] == 0:
+                    similarity_array = np.full([1, len_from_column], -np.inf)
+
+                # like idxmax the lower to id is used if the similarity is the same
+                mapped_to_ids = similarity_array.argmax(axis=0)
+                mapped_similarities = similarity_array[mapped_to_ids, np.arange(len_from_column)]
+
+                mapped_to_ids[~(mapped_similarities >= similarity_array.dtype.type(similarity_threshold))] = -1
+
+                pairs = similarity_array.size
+
+            elif relationship_type == "1:n" or relationship_type == "one_to_many":
+
+                from_ids, to_ids, similarities = self.get_combinations(similarity_threshold)
+
+                order = np.lexsort((to_ids, -similarities, from_ids))
+                best = order[np.diff(from_ids[order], prepend=-1) != 0]
+
+                mapped_to_ids = np.full(len_from_column, -1, "int64")
+                mapped_similarities = np.full(len_from_column, np.nan, "float64")
+                mapped_to_ids[from_ids[best]] = to_ids[best]
+                mapped_similarities[from_ids[best]] = similarities[best]
+
+                pairs = from_ids.shape[0]
+
+            else:
+
+                raise ValueError("Parameter relationship_type must be " "1:1" " or " "1:n" "")
+
+            # the combinations the mapping was chosen from
+            counts["pairs"] = pairs
+
+        mapped = mapped_to_ids != -1
+
+        if data_type == "sparse":
+
+            return {
+                "from_ids": np.flatnonzero(mapped),
+                "to_ids": mapped_to_ids[mapped],
+                "similarities": mapped_similarities[mapped].astype("float32"),
+                "from_values": self.from_values,
+                "to_values": self.to_values,
+            }
+
+        mapped_values = np.full(len_from_column, np.nan, "object")
+        mapped_values[mapped] = self.to_values[mapped_to_ids[mapped]]
+
+        # pandas is only needed (and imported) for the series and the frame
+        if data_type == "dict":
+
+            return dict(zip(self.from_values.tolist(), mapped_values.tolist()))
+
+        elif data_type == "series":
+
+            return pd.Series(mapped_values, index=self.from_values)
+
+        elif data_type == "frame":
+
+            return pd.DataFrame({"from": self.from_values, "to": mapped_values})
+
+        else:
+            raise ValueError("Parameter data_type must be " "dict" " or " "series" " or " "frame" " or " "sparse" "")
+
+    def get_combinations(self, similarity_threshold: float = 0.0) -> tuple:
+        """
+        Function to retrieve the stored from-to-combinations that reach a
+        similarity threshold.
+
+        Args:
+            similarity_threshold (float): minimum similarity of a combination
+
+        Returns:
+            tuple: tuple of the from_ids, the to_ids and the similarities of
+                the combinations (np.ndarrays)
+
+        """
+        if self.storage == "dense":
+
+            similarity_array = self.similarity_array
+
+            # pruned and blocked combinations (np.nan) are below the threshold anyway
+            to_ids, from_ids = np.nonzero(similarity_array >= similarity_array.dtype.type(similarity_threshold))
+
+            return from_ids, to_ids, similarity_array[to_ids, from_ids]
+
+        elif self.storage == "top_k":
+
+            from_ids, ranks = np.nonzero(self.top_k_similarities >= self.top_k_similarities.dtype.type(similarity_threshold))
+
+            return from_ids, self.top_k_to_ids[from_ids, ranks], self.top_k_similarities[from_ids, ranks]
+
+        reached = self.sparse_similarities >= self.sparse_similarities.dtype.type(similarity_threshold)
+
+        return self.sparse_from_ids[reached], self.sparse_to_ids[reached], self.sparse_similarities[reached]
+
+    @staticmethod
+    def create_one_to_one_assignment(
+        from_ids: np.ndarray, to_ids: np.ndarray, similarities: np.ndarray, len_from_column: int, len_to_column: int
+    ) -> np.ndarray:
+        """
+        Assigns at most one to str to every from str and at most one from str
+        to every to str in rounds. In every round each unassigned from str
+        proposes its most similar unassigned to str (the lower to id if the
+        similarity is the same) and each to str accepts the most similar of
+        the from strings proposing it. The rejected from strings propose again
+        in the next round. If the similarity is the same, the from str that
+        ranked higher in the previous round wins (the lower from id in the
+        first round), as if the from strings were sorted stably by their
+        proposals every round.
+
+        Args:
+            from_ids (np.ndarray): from_column ids of the combinations that may
+                be assigned, e.g. the ones reaching the similarity threshold
+            to_ids (np.ndarray): to_column ids of these combinations
+            similarities (np.ndarray): similarities of these combinations
+            len_from_column (int): number of elements in the from_column
+            len_to_column (int): number of elements in the to_column
+
+        Returns:
+            np.ndarray: assigned to id of every from str, -1 if it got none
+
+        """
+        # every from str walks through its to strings from the most similar one
+        order = np.lexsort((to_ids, -similarities, from_ids))
+        from_ids = from_ids[order]
+        to_ids = to_ids[order]
+        similarities = similarities[order]
+
+        starts = np.searchsorted(from_ids, np.arange(len_from_column + 1))
+        pointers = starts[:-1].copy()
+        ends = starts[1:]
+
+        assigned_to_ids = np.full(len_from_column, -1, "int64")
+        to_assigned = np.zeros(len_to_column, "bool")
+
+        active = np.flatnonzero(pointers < ends)
+        ranks = np.arange(len_from_column)
+
+        while active.shape[0] != 0:
+
+            # skips the to strings assigned in the previous rounds
+            blocked = active[to_assigned[to_ids[pointers[active]]]]
+            while blocked.shape[0] != 0:
+                pointers[blocked] += 1
+                blocked = blocked[pointers[blocked] < ends[blocked]]
+                blocked = blocked[to_assigned[to_ids[pointers[blocked]]]]
+
+            active = active[pointers[active] < ends[active]]
+
+            proposals = pointers[active]
+            proposed_to_ids = to_ids[proposals]
+
+            order = np.lexsort((ranks[active], -similarities[proposals]))
+            ranks[active[order]] = np.arange(active.shape[0])
+
+            order = np.lexsort((ranks[active], proposed_to_ids))
+            accepted = order[np.diff(proposed_to_ids[order], prepend=-1) != 0]
+
+            assigned_to_ids[active[accepted]] = proposed_to_ids[accepted]
+            to_assigned[proposed_to_ids[accepted]] = True
+
+            active = np.delete(active, accepted)
+
+        return assigned_to_ids
+
+    @staticmethod
+    def clean_column(column: any, column_name: str) -> pd.Series:
+        """
+        Cleans either of the from / to columns to be a pandas Series of type str.
+
+        Args:
+            column (list, pandas.Series, np.ndarray): column to be cleaned
+            column_name (str): specifying whether this is the from or the to column
+
+        Returns:
+            pandas.Series: converted to type str
+
+        Raises:
+            ValueError: if not of any of the expected types
+
+        """
+        if type(column) == np.ndarray:
+            column = pd.Series(column)
+        elif type(column) == list:
+            column = pd.Series(column)
+        elif type(column) == pd.Series:
+            pass
+        else:
+            raise ValueError(f"{column_name} not of type numpy.ndarray, pandas.Series or list")
+        return column.astype(str)
+
+    @staticmethod
+    def is_integer(value: any) -> bool:
+        """
+        Checks whether a value is a numpy integer or an int (no bool) that
+        fits into an int64.
+
+        Args:
+            value (any): value to check
+
+        Returns:
+            bool: whether the value is such an integer
+
+        """
+        return isinstance(value, np.integer) or (isinstance(value, int) and not isinstance(value, bool) and -(2 ** 63) <= value < 2 ** 63)
+
+    @staticmethod
+    def clean_values(column: any, column_name: str) -> np.ndarray:
+        """
+        Cleans either of the from / to columns like clean_column, but into an
+        np.ndarray of str objects, so that pandas is only imported if the
+        column is a pandas Series.
+
+        Args:
+            column (list, pandas.Series, np.ndarray): column to be cleaned
+            column_name (str): specifying whether this is the from or the to column
+
+        Returns:
+            np.ndarray: converted to str objects
+
+        Raises:
+            ValueError: if not of any of the expected types
+
+        """
+        if isinstance(column, list):
+            numbers = [value for value in column if value is not None]
+
+            # like a pandas Series, numbers become floats if any of them is a float or None ("1.0", "nan")
+            if (
+                numbers
+                and all(isinstance(value, (float, np.floating)) or AutoStringMapper.is_integer(value) for value in numbers)
+                and (len(numbers) < len(column) or any(isinstance(value, (float, np.floating)) for value in numbers))
+            ):
+                column = np.array([np.nan if value is None else value for value in column], dtype="float64")
+
+        if isinstance(column, (np.ndarray, list)):
+            return np.array([value if isinstance(value, str) else str(value) for value in column], dtype=object)
+
+        # without pandas being imported there can not be any pandas Series
+        if "pandas" in sys.modules and isinstance(column, pd.Series):
+            return AutoStringMapper.clean_column(column, column_name).to_numpy(dtype=object)
+
+        raise ValueError(f"{column_name} not of type numpy.ndarray, pandas.Series or list")
+
+    @staticmethod
+    def factorize_values(values: np.ndarray) -> tuple:
+        """
+        Finds the distinct values in the order of their first occurrence, like
+        pandas.factorize.
+
+        Args:
+            values (np.ndarray): hashable values
+
+        Returns:
+            tuple: tuple of the id of every value (np.ndarray) and the distinct
+                values (np.ndarray of objects)
+
+        """
+        ids = {}
+        value_ids = np.fromiter((ids.setdefault(value, len(ids)) for value in values), "int64", len(values))
+
+        return value_ids, np.array(list(ids), dtype=object)
+
+    @staticmethod
+    def get_string_lengths(values: np.ndarray) -> np.ndarray:
+        """
+        Counts the characters of every str.
+
+        Args:
+            values (np.ndarray): strings
+
+        Returns:
+            np.ndarray: number of characters of every str
+
+        """
+        return np.fromiter(map(len, values), "int64", len(values))
+
+    @staticmethod
+    def normalize_column(column: np.ndarray, normalization: list = None) -> np.ndarray:
+        """
+        Applies the steps of a normalization to every str of a column, the
+        result is the key the str is compared and deduplicated by.
+
+        Args:
+            column (np.ndarray): cleaned column
+            normalization (list): steps applied in this order, "nfkc",
+                "accents", "casefold", "whitespace" or "punctuation", by
+                default the column is returned unchanged
+
+        Returns:
+            np.ndarray: normalized column
+
+        """
+        if not normalization:
+            return column
+
+        values = list(column)
+        for step in normalization:
+
+            if step == "nfkc":
+                values = [unicodedata.normalize("NFKC", value) for value in values]
+            elif step == "accents":
+                # decomposes the characters and drops the combining marks
+                values = [unicodedata.normalize("NFC", combining_marks.sub("", unicodedata.normalize("NFKD", value))) for value in values]
+            elif step == "casefold":
+                values = [value.casefold() for value in values]
+            elif step == "whitespace":
+                values = [whitespace.sub(" ", value.strip()) for value in values]
+            elif step == "punctuation":
+                values = [punctuation.sub("", value) for value in values]
+
+        return np.array(values, dtype=object)
+
+    @staticmethod
+    def create_combinations(from_ids: np.ndarray, to_ids: np.ndarray) -> tuple:
+        """
+        Creates all combinations of the ids of the from column with all ids of
+        the to column returning it as two np.ndarrays to be interpreted
+        together. The ids point into the unique from / to strings, so the
+        strings themselves are never copied.
+
+        Args:
+            from_ids (np.ndarray): ids of the strings that are mapped from
+            to_ids (np.ndarray): ids of the strings that are mapped to
+
+        Returns:
+            tuple: tuple including all the combinations with the from_ids as
+                the first entry and the to_ids as the second
+        """
+
+        from_combination_ids = np.tile(from_ids, to_ids.shape[0])
+        to_combination_ids = np.repeat(to_ids, from_ids.shape[0])
+
+        return from_combination_ids, to_combination_ids
+
+    @staticmethod
+    def expand_key_ids(key_ids: np.ndarray, value_key_ids: np.ndarray) -> tuple:
+        """
+        Replaces every key id by the ids of all values with that key.
+
+        Args:
+            key_ids (np.ndarray): ids of keys, may repeat
+            value_key_ids (np.ndarray): key id of every value
+
+        Returns:
+            tuple: tuple of the value ids and of the position in key_ids every
+                value id was expanded from (np.ndarrays)
+
+        """
+        # the value ids grouped by their key
+        values = np.argsort(value_key_ids, kind="stable")
+        starts = np.searchsorted(value_key_ids[values], np.arange(value_key_ids.max(initial=-1) + 2))
+
+        counts = np.diff(starts)[key_ids]
+        positions = np.repeat(np.arange(key_ids.shape[0]), counts)
+
+        # the offset of every value id within its key
+        offsets = np.arange(positions.shape[0]) - np.repeat(np.cumsum(counts) - counts, counts)
+
+        return values[starts[key_ids][positions] + offsets], positions
+
+    @staticmethod
+    def create_tiles(len_from_column: int, len_to_column: int, chunk_size: int, max_from_tile_size: int = None):
+        """
+        Splits the from and the to column into blocks of ids, so that every
+        block combination contains at most chunk_size from-to-combinations.
+
+        Args:
+            len_from_column (int): number of elements in the from_column
+            len_to_column (int): number of elements in the to_column
+            chunk_size (int): maximum number of combinations per tile
+            max_from_tile_size (int): maximum number of from ids per tile, by
+                default unlimited
+
+        Yields:
+            tuple: tuple of the from_column ids and the to_column ids of a tile
+
+        """
+        from_tile_size = max(min(len_from_column, chunk_size, max_from_tile_size or chunk_size), 1)
+        to_tile_size = max(chunk_size // from_tile_size, 1)
+
+        for to_start in range(0, len_to_column, to_tile_size):
+            for from_start in range(0, len_from_column, from_tile_size):
+
+                from_tile_ids = np.arange(from_start, min(from_start + from_tile_size, len_from_column))
+                to_tile_ids = np.arange(to_start, min(to_start + to_tile_size, len_to_column))
+
+                yield from_tile_ids, to_tile_ids
+
+    @staticmethod
+    def create_qgrams(codes: np.ndarray, lengths: np.ndarray, q: int) -> tuple:
+        """
+        Splits every str of a column into its q-grams. The strings are padded
+        with q - 1 start and end markers, so that short strings have q-grams as
+        well and the first and last characters count as much as the others.
+
+        Args:
+            codes (np.ndarray): code point matrix of the unique strings as
+                created by encode_column
+            lengths (np.ndarray): number of characters of the strings
+            q (int): number of characters per q-gram
+
+        Returns:
+            tuple: tuple of the str ids (sorted) and their q-grams, every q-gram
+                is a single np.void value so that it can be sorted and
+                searched
+
+        """
+        padded = np.full([codes.shape[0], codes.shape[1] + 2 * (q - 1)], -2, "int64")
+        padded[:, : q - 1] = -1
+        padded[:, q - 1 : q - 1 + codes.shape[1]] = np.where(np.arange(codes.shape[1]) < lengths[:, None], codes, -2)
+
+        # the q characters starting at every position, by index arithmetic to support numpy < 1.20
+        string_ids, positions = np.nonzero(np.arange(padded.shape[1] - q + 1) < lengths[:, None] + q - 1)
+        windows = padded[string_ids[:, None], positions[:, None] + np.arange(q)]
+
+        qgrams = np.ascontiguousarray(windows).view(np.dtype((np.void, 8 * q))).ravel()
+
+        return string_ids, qgrams
+
+    @staticmethod
+    def create_qgram_index(string_ids: np.ndarray, qgrams: np.ndarray) -> tuple:
+        """
+        Creates an inverted index that lists the strings containing a q-gram.
+
+        Args:
+            string_ids (np.ndarray): str ids as created by create_qgrams
+            qgrams (np.ndarray): q-grams as created by create_qgrams
+
+        Returns:
+            tuple: tuple of the distinct q-grams (the vocabulary, sorted), the
+                offsets of every q-gram in the postings (np.ndarray of length
+                len(vocabulary) + 1) and the postings (the str ids sorted by
+                q-gram, every str at most once per q-gram)
+
+        """
+        vocabulary, qgram_ids = np.unique(qgrams, return_inverse=True)
+
+        keys = np.unique(string_ids * max(vocabulary.shape[0], 1) + qgram_ids.ravel())
+        string_ids, qgram_ids = keys // max(vocabulary.shape[0], 1), keys % max(vocabulary.shape[0], 1)
+
+        order = np.argsort(qgram_ids, kind="stable")
+
+        qgram_indptr = np.zeros(vocabulary.shape[0] + 1, "int64")
+        np.cumsum(np.bincount(qgram_ids, minlength=vocabulary.shape[0]), out=qgram_indptr[1:])
+
+        return vocabulary, qgram_indptr, string_ids[order]
+
+    @staticmethod
+    def lookup_qgrams(string_ids: np.ndarray, qgrams: np.ndarray, vocabulary: np.ndarray) -> tuple:
+        """
+        Looks up the q-grams of some strings in the vocabulary of an inverted
+        index. Q-grams that are not in the vocabulary can not be shared with
+        any indexed str and are left out.
+
+        Args:
+            string_ids (np.ndarray): str ids as created by create_qgrams
+            qgrams (np.ndarray): q-grams as created by create_qgrams
+            vocabulary (np.ndarray): vocabulary as created by
+                create_qgram_index
+
+        Returns:
+            tuple: tuple of the str ids and the q-gram ids (np.ndarrays sorted
+                by str id), every distinct q-gram of a str once
+
+        """
+        qgram_ids = np.minimum(np.searchsorted(vocabulary, qgrams), max(vocabulary.shape[0] - 1, 0))
+
+        if vocabulary.shape[0] == 0:
+            known = np.zeros(qgrams.shape[0], "bool")
+        else:
+            known = vocabulary[qgram_ids] == qgrams
+
+        keys = np.unique(string_ids[known] * max(vocabulary.shape[0], 1) + qgram_ids[known])
+
+        return keys // max(vocabulary.shape[0], 1), keys % max(vocabulary.shape[0], 1)
+
+    @staticmethod
+    def create_qgram_tiles(
+        from_string_ids: np.ndarray,
+        from_qgram_ids: np.ndarray,
+        qgram_indptr: np.ndarray,
+        len_from_column: int,
+        len_to_column: int,
+        chunk_size: int,
+        max_from_tile_size: int = None,
+    ):
+        """
+        Splits the from column into blocks of consecutive ids, so that looking
+        up the q-grams of a block in the inverted index yields at most
+        chunk_size postings.
+
+        Args:
+            from_string_ids (np.ndarray): from str ids as created by
+                create_qgrams
+            from_qgram_ids (np.ndarray): from q-gram ids as created by
+                create_qgrams
+            qgram_indptr (np.ndarray): q-gram offsets as created by
+                create_qgram_index
+            len_from_column (int): number of elements in the from_column
+            len_to_column (int): number of elements in the to_column
+            chunk_size (int): maximum number of postings per tile
+            max_from_tile_size (int): maximum number of from ids per tile, by
+                default unlimited
+
+        Yields:
+            tuple: tuple of the from_column ids and the to_column ids of a tile
+
+        """
+        posting_lengths = np.diff(qgram_indptr)
+        lookups = np.bincount(from_string_ids, weights=posting_lengths[from_qgram_ids], minlength=len_from_column)
+        cumulative_lookups = np.cumsum(lookups)
+
+        to_tile_ids = np.arange(len_to_column)
+
+        start = 0
+        while start < len_from_column:
+
+            offset = cumulative_lookups[start - 1] if start > 0 else 0
+            stop = max(int(np.searchsorted(cumulative_lookups, offset + chunk_size, side="right")), start + 1)
+
+            if max_from_tile_size is not None:
+                stop = min(stop, start + max_from_tile_size)
+
+            yield np.arange(start, stop), to_tile_ids
+
+            start = stop
+
+    @staticmethod
+    def create_qgram_candidates(
+        from_string_ids: np.ndarray,
+        from_qgram_ids: np.ndarray,
+        qgram_indptr: np.ndarray,
+        qgram_postings: np.ndarray,
+        from_tile_ids: np.ndarray,
+        len_to_column: int,
+        min_shared_qgrams: int = 1,
+        max_candidates: int = None,
+    ) -> tuple:
+        """
+        Finds the to strings that share at least min_shared_qgrams distinct
+        q-grams with the from strings of a tile.
+
+        Args:
+            from_string_ids (np.ndarray): from str ids as created by
+                create_qgrams
+            from_qgram_ids (np.ndarray): from q-gram ids as created by
+                create_qgrams
+            qgram_indptr (np.ndarray): q-gram offsets of the to strings as
+                created by create_qgram_index
+            qgram_postings (np.ndarray): to str ids as created by
+                create_qgram_index
+            from_tile_ids (np.ndarray): consecutive from_column ids of the tile
+            len_to_column (int): number of elements in the to_column
+            min_shared_qgrams (int): minimum number of shared q-grams
+            max_candidates (int): if given, the maximum number of to strings
+                per from str, the ones sharing the most q-grams are kept
+
+        Returns:
+            tuple: tuple including the candidate combinations with the from_ids
+                as the first entry and the to_ids as the second
+
+        """
+        first, last = np.searchsorted(from_string_ids, [from_tile_ids[0], from_tile_ids[-1] + 1])
+
+        string_ids = from_string_ids[first:last]
+        qgram_ids = from_qgram_ids[first:last]
+
+        starts = qgram_indptr[qgram_ids]
+        counts = qgram_indptr[qgram_ids + 1] - starts
+        positions = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+
+        keys, shared_qgrams = np.unique(np.repeat(string_ids, counts) * len_to_column + qgram_postings[positions], return_counts=True)
+
+        keep = shared_qgrams >= min_shared_qgrams
+        from_ids, to_ids = np.divmod(keys[keep], len_to_column)
+        shared_qgrams = shared_qgrams[keep]
+
+        if max_candidates is not None:
+
+            order = np.lexsort((to_ids, -shared_qgrams, from_ids))
+            from_ids = from_ids[order]
+            to_ids = to_ids[order]
+
+            ranks = np.arange(from_ids.shape[0]) - np.searchsorted(from_ids, from_ids)
+            from_ids = from_ids[ranks < max_candidates]
+            to_ids = to_ids[ranks < max_candidates]
+
+        return from_ids, to_ids
+
+    @staticmethod
+    def create_histograms(from_codes: np.ndarray, to_codes: np.ndarray, from_lengths: np.ndarray, to_lengths: np.ndarray) -> tuple:
+        """
+        Counts how often every character occurs in every from and to str.
+
+        Args:
+            from_codes (np.ndarray): code point matrix of the unique from_column
+                strings as created by encode_column
+            to_codes (np.ndarray): code point matrix of the unique to_column
+                strings as created by encode_column
+            from_lengths (np.ndarray): number of characters of the from_column
+                strings
+            to_lengths (np.ndarray): number of characters of the to_column
+                strings
+
+        Returns:
+            tuple: tuple of the character counts of the from strings and the to
+                strings (np.ndarrays with one column per character)
+
+        """
+        from_valid = np.arange(from_codes.shape[1]) < from_lengths[:, None]
+        to_valid = np.arange(to_codes.shape[1]) < to_lengths[:, None]
+
+        alphabet = np.unique(np.concatenate([from_codes[from_valid], to_codes[to_valid]]))
+
+        histograms = []
+        for codes, valid in [(from_codes, from_valid), (to_codes, to_valid)]:
+            rows = np.nonzero(valid)[0]
+            characters = np.searchsorted(alphabet, codes[valid])
+            histogram = np.bincount(rows * alphabet.shape[0] + characters, minlength=codes.shape[0] * alphabet.shape[0])
+            histograms.append(histogram.reshape([codes.shape[0], alphabet.shape[0]]).astype("int32"))
+
+        return tuple(histograms)
+
+    @staticmethod
+    def prune_combinations(
+        from_ids: np.ndarray,
+        to_ids: np.ndarray,
+        from_lengths: np.ndarray,
+        to_lengths: np.ndarray,
+        maxlen: np.ndarray,
+        similarity_threshold: float,
+        from_histograms: np.ndarray = None,
+        to_histograms: np.ndarray = None,
+    ) -> np.ndarray:
+        """
+        Determines which from-to-combinations can reach the similarity
+        threshold. The levenshtein distance is at least the difference of the
+        string lengths and, if the histograms are given, at least the number of
+        characters of one str that can not be matched in the other str.
+
+        Args:
+            from_ids (np.ndarray): from_column ids of the combinations
+            to_ids (np.ndarray): to_column ids of the combinations
+            from_lengths (np.ndarray): number of characters of the from_column
+                strings
+            to_lengths (np.ndarray): number of characters of the to_column
+                strings
+            maxlen (np.ndarray): maximum length of every combination that the
+                distance is normalized with
+            similarity_threshold (float): minimum similarity
+            from_histograms (np.ndarray): character counts of the from_column
+                strings as created by create_histograms
+            to_histograms (np.ndarray): character counts of the to_column
+                strings as created by create_histograms
+
+        Returns:
+            np.ndarray: boolean array which is True for the combinations whose
+                distance needs to be computed
+
+        """
+        lower_bound = np.abs(from_lengths[from_ids] - to_lengths[to_ids])
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            candidates = 1 - (lower_bound / maxlen) >= similarity_threshold
+
+        if from_histograms is not None:
+
+            candidate_ids = np.flatnonzero(candidates)
+
+            difference = np.abs(from_histograms[from_ids[candidate_ids]] - to_histograms[to_ids[candidate_ids]]).sum(axis=1)
+
+            # the larger one of the surplus characters of either str
+            histogram_bound = (lower_bound[candidate_ids] + difference) // 2
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                candidates[candidate_ids] = 1 - (histogram_bound / maxlen[candidate_ids]) >= similarity_threshold
+
+        return candidates
+
+    @staticmethod
+    def estimate_combination_bytes(engine: str, maxlen_from_column: int, maxlen_to_column: int, metric: dict = None) -> int:
+        """
+        Estimates the number of bytes one from-to-combination needs while its
+        levenshtein distance and similarity is computed.
+
+        Args:
+            engine (str): "dp" or "bitparallel"
+            maxlen_from_column (int): number of characters in the longest str
+                of the from_column
+            maxlen_to_column (int): number of characters in the longest str
+                of the to_column
+            metric (dict): weights of the similarity metrics by name, by
+                default only "levenshtein"
+
+        Returns:
+            int: estimated number of bytes per combination
+
+        """
+        itemsize = AutoStringMapper.choose_distance_dtype(max(maxlen_from_column, maxlen_to_column)).itemsize
+
+        if metric is not None and list(metric) != ["levenshtein"]:
+
+            # the metrics are computed one after another, the largest one counts
+            return max(
+                {
+                    # three rows plus the temporaries of one cell
+                    "damerau": 3 * itemsize * maxlen_to_column + 100,
+                    # code points, match flags and sorted matches of both strings
+                    "jaro_winkler": 24 * (maxlen_from_column + maxlen_to_column) + 100,
+                    # looked up words or q-grams of the from str
+                    "token_set": 40 * maxlen_from_column + 100,
+                    "qgram_cosine": 40 * maxlen_from_column + 100,
+                }.get(name, 2 * itemsize * maxlen_to_column + 100)
+                for name in metric
+            )
+
+        if engine == "bitparallel":
+            # vertical bit vectors per 64 character block plus the uint64 temporaries
+            return 16 * max(-(-maxlen_from_column // 64), 1) + 200
+
+        # previous and current row plus the temporaries of one cell
+        return 2 * itemsize * maxlen_to_column + 100
+
+    @staticmethod
+    def estimate_from_str_bytes(maxlen_from_column: int, alphabet_size: int) -> int:
+        """
+        Estimates the number of bytes the bit-parallel engine needs per from
+        str of a tile, the bit vectors of every character of the alphabet (plus
+        one for the characters of no from str) and 64 character block.
+
+        Args:
+            maxlen_from_column (int): number of characters in the longest str
+                of the from_column
+            alphabet_size (int): number of distinct characters of the from
+                strings
+
+        Returns:
+            int: estimated number of bytes per from str
+
+        """
+        return 8 * (alphabet_size + 1) * max(-(-maxlen_from_column // 64), 1)
+
+    @staticmethod
+    def create_levenshtein_array(
+        from_codes: np.ndarray,
+        to_codes: np.ndarray,
+        from_lengths: np.ndarray,
+        to_lengths: np.ndarray,
+        from_ids: np.ndarray,
+        to_ids: np.ndarray,
+        max_distances: np.ndarray = None,
+    ) -> np.ndarray:
+        """
+        Creates the levenshtein distances for all from-to-string-combinations at
+        the same time in a vectorized fashion. Only the previous and the current
+        row of the levenshtein matrices are kept in memory, so the memory needed
+        grows with the number of combinations times the longest to_column str.
+
+        If max_distances are given, only the cells within that distance of the
+        diagonal are computed (Ukkonen's cutoff) and combinations are abandoned
+        as soon as a whole row exceeds their max_distance. Their distance is
+        then returned as max_distance + 1.
+
+        Args:
+            from_codes (np.ndarray): code point matrix of the unique from_column
+                strings as created by encode_column
+            to_codes (np.ndarray): code point matrix of the unique to_column
+                strings as created by encode_column
+            from_lengths (np.ndarray): number of characters of the from_column
+                strings
+            to_lengths (np.ndarray): number of characters of the to_column
+                strings
+            from_ids (np.ndarray): from_column ids of the combinations (needs
+                to be read together with the to_ids)
+            to_ids (np.ndarray): to_column ids of the combinations (needs to be
+                read together with the from_ids)
+            max_distances (np.ndarray): largest distance of every combination
+                that is still of interest
+
+        Returns:
+            np.ndarray: 1-dimensional array that includes the levenshtein
+            distance for all from-to-string-combinations
+
+        """
+
+        number_of_combinations = from_ids.shape[0]
+        maxlen_from_column = from_codes.shape[1]
+        maxlen_to_column = to_codes.shape[1]
+
+        unique_from_ids, from_ids = np.unique(from_ids, return_inverse=True)
+        unique_to_ids, to_ids = np.unique(to_ids, return_inverse=True)
+
+        from_codes = from_codes[unique_from_ids].T
+        to_codes = to_codes[unique_to_ids].T
+
+        combination_from_lengths = from_lengths[unique_from_ids][from_ids]
+        combination_to_lengths = to_lengths[unique_to_ids][to_ids]
+
+        # every cell is capped at max_distance + 1, which stays one below the
+        # dtype maximum so that adding a cost of one can not overflow
+        dtype = AutoStringMapper.choose_distance_dtype(max(maxlen_from_column, maxlen_to_column))
+        sentinel = np.iinfo(dtype).max - 1
+
+        if max_distances is None:
+            caps = np.full(number_of_combinations, sentinel, dtype)
+            band = max(maxlen_from_column, maxlen_to_column)
+        else:
+            caps = np.minimum(max_distances + 1, sentinel).astype(dtype)
+            band = int(caps.max(initial=0))
+
+        levenshtein_array = np.empty(number_of_combinations, dtype)
+
+        # the first characters are always aligned, a missing first character
+        # of an empty str is a mismatch with anything
+        empty = (combination_from_lengths == 0) | (combination_to_lengths == 0)
+        levenshtein_array[empty] = np.minimum(
+            np.maximum(np.maximum(combination_from_lengths, combination_to_lengths), 1)[empty], caps[empty]
+        )
+
+        positions = np.flatnonzero(~empty)
+        from_ids = from_ids[positions]
+        to_ids = to_ids[positions]
+        combination_from_lengths = combination_from_lengths[positions]
+        combination_to_lengths = combination_to_lengths[positions]
+        caps = caps[positions]
+
+        previous_row = np.broadcast_to(caps, [maxlen_to_column, positions.shape[0]]).copy()
+        current_row = previous_row.copy()
+
+        for from_column_index in range(maxlen_from_column):
+
+            if positions.shape[0] == 0:
+                break
+
+            from_characters = from_codes[from_column_index][from_ids]
+
+            # only the cells within the band around the diagonal are computed
+            start = max(from_column_index - band, 0)
+            stop = min(from_column_index + band, int(combination_to_lengths.max()) - 1)
+
+            if 0 < start <= maxlen_to_column:
+                current_row[start - 1] = caps
+            if 0 <= stop + 1 < maxlen_to_column:
+                current_row[stop + 1] = caps
+
+            for to_column_index in range(start, stop + 1):
+
+                if from_column_index == 0:
+
+                    insertion = caps
+
+                else:
+
+                    insertion = previous_row[to_column_index] + 1
+
+                if to_column_index == 0:
+
+                    deletion = caps
+
+                else:
+
+                    deletion = current_row[to_column_index - 1] + 1
+
+                comparison = (to_codes[to_column_index][to_ids] != from_characters).astype(dtype)
+
+                if from_column_index == 0 or to_column_index == 0:
+
+                    replacement = caps
+
+                    if from_column_index == 0 and to_column_index == 0:
+
+                        replacement = comparison
+
+                else:
+
+                    replacement = previous_row[to_column_index - 1] + comparison
+
+                np.minimum(np.minimum(insertion, deletion), np.minimum(replacement, caps), out=current_row[to_column_index])
+
+            # the distance is found in the row of the last from character
+            finished = np.flatnonzero(combination_from_lengths - 1 == from_column_index)
+            last_to_index = combination_to_lengths[finished] - 1
+            in_band = (last_to_index >= start) & (last_to_index <= stop)
+            levenshtein_array[positions[finished]] = np.where(in_band, current_row[last_to_index, finished], caps[finished])
+
+            done = combination_from_lengths - 1 <= from_column_index
+
+            if max_distances is not None:
+
+                # a path to the last cell passes this row and never gets cheaper,
+                # combinations that already have their distance are kept as is
+                abandoned = (current_row[start : stop + 1].min(axis=0, initial=sentinel) >= caps) & ~done
+                levenshtein_array[positions[abandoned]] = caps[abandoned]
+                done |= abandoned
+
+            if done.sum() * 8 >= positions.shape[0]:
+
+                keep = ~done
+                positions = positions[keep]
+                from_ids = from_ids[keep]
+                to_ids = to_ids[keep]
+                combination_from_lengths = combination_from_lengths[keep]
+                combination_to_lengths = combination_to_lengths[keep]
+                caps = caps[keep]
+                previous_row = previous_row[:, keep]
+                current_row = current_row[:, keep]
+
+                if max_distances is not None:
+                    band = int(caps.max(initial=0))
+
+            previous_row, current_row = current_row, previous_row
+
+        return levenshtein_array
+
+    @staticmethod
+    def create_damerau_levenshtein_array(
+        from_codes: np.ndarray,
+        to_codes: np.ndarray,
+        from_lengths: np.ndarray,
+        to_lengths: np.ndarray,
+        from_ids: np.ndarray,
+        to_ids: np.ndarray,
+        max_distances: np.ndarray = None,
+    ) -> np.ndarray:
+        """
+        Creates the damerau levenshtein distances (optimal string alignment, a
+        transposition of two adjacent characters costs one) for all
+        from-to-string-combinations at the same time in a vectorized fashion.
+        Only the last three rows of the matrices are kept in memory.
+
+        Args:
+            from_codes (np.ndarray): code point matrix of the unique from_column
+                strings as created by encode_column
+            to_codes (np.ndarray): code point matrix of the unique to_column
+                strings as created by encode_column
+            from_lengths (np.ndarray): number of characters of the from_column
+                strings
+            to_lengths (np.ndarray): number of characters of the to_column
+                strings
+            from_ids (np.ndarray): from_column ids of the combinations
+            to_ids (np.ndarray): to_column ids of the combinations
+            max_distances (np.ndarray): largest distance of every combination
+                that is still of interest, larger distances are returned as
+                max_distance + 1
+
+        Returns:
+            np.ndarray: 1-dimensional array that includes the damerau
+            levenshtein distance for all from-to-string-combinations
+
+        """
+        unique_from_ids, from_ids = np.unique(from_ids, return_inverse=True)
+        unique_to_ids, to_ids = np.unique(to_ids, return_inverse=True)
+
+        from_codes = from_codes[unique_from_ids].T
+        to_codes = to_codes[unique_to_ids].T
+
+        combination_from_lengths = from_lengths[unique_from_ids][from_ids]
+        combination_to_lengths = to_lengths[unique_to_ids][to_ids]
+
+        # every cell is capped like in create_levenshtein_array
+        dtype = AutoStringMapper.choose_distance_dtype(max(from_codes.shape[0], to_codes.shape[0]))
+        sentinel = np.iinfo(dtype).max - 1
+
+        if max_distances is None:
+            caps = np.full(from_ids.shape[0], sentinel, dtype)
+        else:
+            caps = np.minimum(max_distances + 1, sentinel).astype(dtype)
+
+        maxlen_to_column = int(combination_to_lengths.max(initial=0))
+
+        # row i holds the distances of the first i from characters to the first j to characters
+        previous_row = np.minimum(np.arange(maxlen_to_column + 1)[:, None], caps).astype(dtype)
+        before_previous_row = previous_row.copy()
+        current_row = previous_row.copy()
+
+        damerau_levenshtein_array = np.minimum(combination_to_lengths, caps).astype(dtype)
+
+        for from_column_index in range(1, int(combination_from_lengths.max(initial=0)) + 1):
+
+            from_characters = from_codes[from_column_index - 1][from_ids]
+            current_row[0] = np.minimum(from_column_index, caps)
+
+            for to_column_index in range(1, maxlen_to_column + 1):
+
+                to_characters = to_codes[to_column_index - 1][to_ids]
+                comparison = (from_characters != to_characters).astype(dtype)
+
+                cell = np.minimum(
+                    np.minimum(previous_row[to_column_index], current_row[to_column_index - 1]) + 1,
+                    previous_row[to_column_index - 1] + comparison,
+                )
+
+                if from_column_index > 1 and to_column_index > 1:
+
+                    transposed = (from_characters == to_codes[to_column_index - 2][to_ids]) & (
+                        from_codes[from_column_index - 2][from_ids] == to_characters
+                    )
+                    cell = np.where(transposed, np.minimum(cell, before_previous_row[to_column_index - 2] + 1), cell)
+
+                np.minimum(cell, caps, out=current_row[to_column_index])
+
+            finished = np.flatnonzero(combination_from_lengths == from_column_index)
+            damerau_levenshtein_array[finished] = current_row[combination_to_lengths[finished], finished]
+
+            before_previous_row, previous_row, current_row = previous_row, current_row, before_previous_row
+
+        return damerau_levenshtein_array
+
+    @staticmethod
+    def choose_distance_dtype(maxlen: int, signed: bool = False) -> np.dtype:
+        """
+        Chooses the smallest integer dtype for the levenshtein distances of
+        strings with up to maxlen characters. Its maximum minus one, the
+        sentinel of the kernels, is larger than every distance, so that no
+        distance is cut off and adding a cost of one to the sentinel can not
+        overflow.
+
+        Args:
+            maxlen (int): number of characters of the longest str
+            signed (bool): whether -1 needs to be stored as well (for the
+                combinations that are not computed), then at least int16 is
+                chosen
+
+        Returns:
+            np.dtype: "uint8", "uint16", "int16", "int32" or "int64"
+
+        """
+        dtypes = ["int16", "int32", "int64"] if signed else ["uint8", "uint16", "int32", "int64"]
+
+        return next(np.dtype(dtype) for dtype in dtypes if maxlen < np.iinfo(dtype).max - 1)
+
+    @staticmethod
+    def pack_strings(values: np.ndarray) -> tuple:
+        """
+        Packs strings into a single buffer of their unicode code points and the
+        offsets of every str in it, e.g. to save them without pickle.
+
+        Args:
+            values (np.ndarray): strings to be packed
+
+        Returns:
+            tuple: tuple of the code points (np.ndarray of uint32) and the
+                len(values) + 1 offsets into them (np.ndarray of int64)
+
+        """
+        # lone surrogates can not be encoded otherwise
+        codes = np.frombuffer("".join(values).encode("utf-32-le", "surrogatepass"), dtype="<u4")
+        offsets = np.concatenate([np.zeros(1, "int64"), np.cumsum(AutoStringMapper.get_string_lengths(values), dtype="int64")])
+
+        return codes, offsets
+
+    @staticmethod
+    def unpack_strings(codes: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+        """
+        Unpacks strings packed with pack_strings.
+
+        Args:
+            codes (np.ndarray): code points of all strings
+            offsets (np.ndarray): offsets of every str in the code points
+
+        Returns:
+            np.ndarray: strings as objects
+
+        """
+        text = np.asarray(codes, dtype="<u4").tobytes().decode("utf-32-le", "surrogatepass")
+
+        return np.array([text[start:stop] for start, stop in zip(offsets[:-1].tolist(), offsets[1:].tolist())], dtype=object)
+
+    @staticmethod
+    def encode_column(column: any, maxlen: int) -> tuple:
+        """
+        Encodes a column of strings into a matrix of unicode code points which
+        is padded with zeros up to maxlen characters.
+
+        Args:
+            column (list, pandas.Series, np.ndarray): strings to be encoded
+            maxlen (int): number of characters to encode per str, longer
+                strings are cut off
+
+        Returns:
+            tuple: tuple of the code point matrix (np.ndarray of shape
+                [len(column), maxlen]) and the number of characters of every
+                str (np.ndarray)
+
+        """
+        maxlen = max(int(maxlen), 1)
+
+        codes = np.asarray(column, dtype=f"<U{maxlen}").view(np.uint32).reshape([len(column), maxlen])
+
+        lengths = np.minimum(AutoStringMapper.get_string_lengths(column), maxlen)
+
+        return codes.astype("int32"), lengths.astype("int64")
+
+    @staticmethod
+    def create_bitparallel_levenshtein_array(
+        from_codes: np.ndarray,
+        to_codes: np.ndarray,
+        from_lengths: np.ndarray,
+        to_lengths: np.ndarray,
+        from_ids: np.ndarray,
+        to_ids: np.ndarray,
+        max_distances: np.ndarray = None,
+    ) -> np.ndarray:
+        """
+        Creates the same levenshtein distances as create_levenshtein_array but
+        uses Myers' bit-vector algorithm, which handles 64 characters of the
+        from_column str with a single uint64 operation for all
+        from-to-string-combinations at the same time.
+
+        As create_levenshtein_array always aligns the first characters of both
+        strings, the distance is the mismatch of the first characters plus the
+        levenshtein distance of the remaining characters, which is what is
+        computed bit-parallel here. The distances are always computed
+        completely and only capped at max_distance + 1 if max_distances are
+        given.
+
+        Args:
+            from_codes (np.ndarray): code point matrix of the unique from_column
+                strings as created by encode_column
+            to_codes (np.ndarray): code point matrix of the unique to_column
+                strings as created by encode_column
+            from_lengths (np.ndarray): number of characters of the from_column
+                strings
+            to_lengths (np.ndarray): number of characters of the to_column
+                strings
+            from_ids (np.ndarray): from_column ids of the combinations (needs
+                to be read together with the to_ids)
+            to_ids (np.ndarray): to_column ids of the combinations (needs to be
+                read together with the from_ids)
+            max_distances (np.ndarray): largest distance of every combination
+                that is still of interest
+
+        Returns:
+            np.ndarray: 1-dimensional array that includes the levenshtein
+            distance for all from-to-string-combinations
+
+        """
+
+        unique_from_ids, from_ids = np.unique(from_ids, return_inverse=True)
+        unique_to_ids, to_ids = np.unique(to_ids, return_inverse=True)
+
+        from_codes = from_codes[unique_from_ids]
+        to_codes = to_codes[unique_to_ids]
+        from_lengths = from_lengths[unique_from_ids]
+        to_lengths = to_lengths[unique_to_ids]
+
+        len_from_column = from_codes.shape[0]
+
+        first_mismatch = (
+            (from_lengths[from_ids] == 0) | (to_lengths[to_ids] == 0) | (from_codes[from_ids, 0] != to_codes[to_ids, 0])
+        ).astype("int64")
+
+        # the pattern is the from_column str and the text the to_column str,
+        # both without their first character
+        pattern_lengths = np.maximum(from_lengths - 1, 0)
+        text_lengths = np.maximum(to_lengths - 1, 0)
+
+        pattern_codes = from_codes[:, 1:]
+        text_codes = to_codes[:, 1:]
+
+        # compact alphabet of the pattern characters, text characters that do
+        # not occur in any pattern are mapped to an additional empty entry
+        alphabet, pattern_alphabet_index = np.unique(pattern_codes, return_inverse=True)
+        pattern_alphabet_index = pattern_alphabet_index.reshape(pattern_codes.shape)
+
+        if alphabet.shape[0] == 0:
+            alphabet = np.zeros(1, "int64")
+
+        text_alphabet_index = np.minimum(np.searchsorted(alphabet, text_codes), alphabet.shape[0] - 1)
+        text_alphabet_index = np.where(alphabet[text_alphabet_index] == text_codes, text_alphabet_index, alphabet.shape[0])
+
+        word_size = 64
+        number_of_blocks = max(-(-pattern_codes.shape[1] // word_size), 1)
+
+        # bit i of peq[from, character, block] is set if the pattern has the
+        # character at position block * 64 + i
+        peq = np.zeros([len_from_column, alphabet.shape[0] + 1, number_of_blocks], "uint64")
+        for pattern_index in range(pattern_codes.shape[1]):
+            valid = np.flatnonzero(pattern_index < pattern_lengths)
+            peq[valid, pattern_alphabet_index[valid, pattern_index], pattern_index // word_size] |= np.uint64(1) << np.uint64(
+                pattern_index % word_size
+            )
+
+        number_of_combinations = from_ids.shape[0]
+
+        positive_vertical = np.full([number_of_combinations, number_of_blocks], np.iinfo("uint64").max, "uint64")
+        negative_vertical = np.zeros([number_of_combinations, number_of_blocks], "uint64")
+
+        combination_pattern_lengths = pattern_lengths[from_ids]
+        combination_text_lengths = text_lengths[to_ids]
+
+        score = combination_pattern_lengths.copy()
+        last_block = np.maximum(combination_pattern_lengths - 1, 0) // word_size
+        last_bit = np.uint64(1) << (np.maximum(combination_pattern_lengths - 1, 0) % word_size).astype("uint64")
+
+        one = np.uint64(1)
+        high_bit = np.uint64(word_size - 1)
+
+        for text_index in range(text_codes.shape[1]):
+
+            active = text_index < combination_text_lengths
+            characters = text_alphabet_index[to_ids, text_index]
+
+            # the first row of the levenshtein matrix increases by one per column
+            horizontal_in = np.ones(number_of_combinations, "int64")
+
+            for block in range(number_of_blocks):
+
+                equal = peq[from_ids, characters, block]
+                positive = positive_vertical[:, block]
+                negative = negative_vertical[:, block]
+
+                horizontal_in_negative = (horizontal_in < 0).astype("uint64")
+
+                vertical_x = equal | negative
+                equal = equal | horizontal_in_negative
+                horizontal_x = (((equal & positive) + positive) ^ positive) | equal
+
+                positive_horizontal = negative | ~(horizontal_x | positive)
+                negative_horizontal = positive & horizontal_x
+
+                score_change = ((positive_horizontal & last_bit) != 0).astype("int64")
+                score_change -= ((negative_horizontal & last_bit) != 0).astype("int64")
+                score += np.where(active & (last_block == block), score_change, 0)
+
+                horizontal_out = (positive_horizontal >> high_bit).astype("int64") - (negative_horizontal >> high_bit).astype("int64")
+
+                positive_horizontal = (positive_horizontal << one) | (horizontal_in > 0).astype("uint64")
+                negative_horizontal = (negative_horizontal << one) | horizontal_in_negative
+
+                positive_vertical[:, block] = negative_horizontal | ~(vertical_x | positive_horizontal)
+                negative_vertical[:, block] = positive_horizontal & vertical_x
+
+                horizontal_in = horizontal_out
+
+        # an empty pattern needs one insertion per character of the text
+        score = np.where(combination_pattern_lengths == 0, combination_text_lengths, score)
+
+        levenshtein_array = first_mismatch + score
+
+        if max_distances is not None:
+            levenshtein_array = np.minimum(levenshtein_array, max_distances + 1)
+
+        return levenshtein_array
+
+    @staticmethod
+    def create_maxlen_matrix(from_column: pd.Series, to_column: pd.Series) -> pd.DataFrame:
+        """
+        Creates a matrix which contains the maximum of the string lengths of all
+        from-to-combination pairs. The mapper itself never creates this matrix,
+        compute_tile divides the distances of a tile by the maxima of the
+        string length vectors instead.
+
+        Args:
+            from_column (pandas.Series): from_column strings
+            to_column (pandas.Series): to_column strings
+
+        Returns:
+            pandas.DataFrame: matrix which contains the maximum length of the
+                pairs
+
+        """
+        maxlen_array = np.maximum.outer(to_column.str.len().to_numpy(dtype="int64"), from_column.str.len().to_numpy(dtype="int64"))
+
+        return pd.DataFrame(maxlen_array.astype("float64"))
+
+
+class ToColumnIndex:
+    def __init__(self, to_column: any, ignore_case: bool = True, normalization: list = None) -> None:
+        """
+        Prepares a to_column once, so that many from columns can be mapped to
+        it without deduplicating, lower casing and encoding it again. Pass it
+        as the to_column of an AutoStringMapper or use query / map.
+
+        Args:
+            to_column (list, pandas.Series, np.ndarray): list of entries to map
+                to
+            ignore_case (bool): whether the strings are compared in lower case
+            normalization (list): steps of AutoStringMapper.normalize_column,
+                strings with the same normalized key are merged into the first
+                one
+
+        """
+        to_column = AutoStringMapper.clean_values(to_column, "to_column")
+        key_ids, key_column = AutoStringMapper.factorize_values(AutoStringMapper.normalize_column(to_column, normalization))
+
+        # the first str of every key, the ids are numbered in the order of the first occurrences
+        _, first = np.unique(key_ids, return_index=True)
+
+        self.ignore_case = ignore_case
+        self.normalization = list(normalization or [])
+        self.to_values = to_column[first]
+        self.string_lengths = AutoStringMapper.get_string_lengths(key_column)
+
+        if ignore_case:
+            self.codes, self.lengths = AutoStringMapper.encode_column(
+                [value.lower() for value in key_column], self.string_lengths.max(initial=0)
+            )
+        else:
+            self.codes, self.lengths = AutoStringMapper.encode_column(key_column, self.string_lengths.max(initial=0))
+
+        self.qgram_indexes = {}
+        self.bk_tree = None
+
+    def get_qgram_index(self, q: int) -> tuple:
+        """
+        Function to retrieve the inverted q-gram index of the to strings, it is
+        created on the first call per q.
+
+        Args:
+            q (int): number of characters per q-gram
+
+        Returns:
+            tuple: vocabulary, offsets and postings as created by
+                AutoStringMapper.create_qgram_index
+
+        """
+        if q not in self.qgram_indexes:
+            self.qgram_indexes[q] = AutoStringMapper.create_qgram_index(*AutoStringMapper.create_qgrams(self.codes, self.lengths, q))
+
+        return self.qgram_indexes[q]
+
+    def compute_distances(self, codes: np.ndarray, lengths: np.ndarray, to_ids: np.ndarray) -> np.ndarray:
+        """
+        Function to compute the levenshtein distances of one encoded str to
+        some of the indexed to strings.
+
+        Args:
+            codes (np.ndarray): code point matrix with a single row as created
+                by AutoStringMapper.encode_column
+            lengths (np.ndarray): number of characters of the str
+            to_ids (np.ndarray): ids of the to strings
+
+        Returns:
+            np.ndarray: distance to every to str
+
+        """
+        return AutoStringMapper.create_levenshtein_array(
+            codes, self.codes, lengths, self.lengths, np.zeros(to_ids.shape[0], "int64"), to_ids
+        ).astype("int64")
+
+    def get_bk_tree(self) -> tuple:
+        """
+        Function to retrieve the BK-tree of the to strings, it is created on
+        the first call. Every to str is a node and its children are stored by
+        their distance to it, so a search only has to visit the children whose
+        distance lies within the search radius of the distance of the query to
+        the node (triangle inequality).
+
+        The tree is built level by level as if the strings were inserted one
+        after another: all strings which are not placed yet are compared to
+        their current node at once, and the first str of every distance becomes
+        a child which the remaining ones descend into.
+
+        Returns:
+            tuple: offsets, child ids and child distances of every node in the
+                order of the node ids, the root is the first to str
+
+        """
+        if self.bk_tree is None:
+
+            number_of_nodes = self.to_values.shape[0]
+            parents = np.full(number_of_nodes, -1, "int64")
+            edges = np.zeros(number_of_nodes, "int64")
+
+            to_ids = np.arange(1, number_of_nodes)
+            nodes = np.zeros(to_ids.shape[0], "int64")
+
+            while to_ids.shape[0] > 0:
+
+                distances = AutoStringMapper.create_levenshtein_array(
+                    self.codes, self.codes, self.lengths, self.lengths, to_ids, nodes
+                ).astype("int64")
+
+                order = np.lexsort((to_ids, distances, nodes))
+                to_ids, nodes, distances = to_ids[order], nodes[order], distances[order]
+
+                # the first str per node and distance becomes a child, the others descend into it
+                first = np.ones(to_ids.shape[0], bool)
+                first[1:] = (nodes[1:] != nodes[:-1]) | (distances[1:] != distances[:-1])
+                parents[to_ids[first]] = nodes[first]
+                edges[to_ids[first]] = distances[first]
+
+                children = to_ids[first][np.cumsum(first) - 1]
+                to_ids, nodes = to_ids[~first], children[~first]
+
+            order = np.lexsort((edges[1:], parents[1:])) + 1
+            offsets = np.searchsorted(parents[order], np.arange(number_of_nodes + 1))
+            self.bk_tree = offsets, order, edges[order]
+
+        return self.bk_tree
+
+    def search(self, query: str, max_distance: int) -> tuple:
+        """
+        Function to find all to strings within a levenshtein distance of a
+        query in the BK-tree, visiting the nodes of a level at once.
+
+        Args:
+            query (str): str to search for
+            max_distance (int): largest distance of a result
+
+        Returns:
+            tuple: to ids and distances of the results ordered by the to ids
+                and the number of characters of the normalized query
+
+        """
+        key = AutoStringMapper.normalize_column(AutoStringMapper.clean_values([query], "query"), self.normalization)[0]
+        codes, lengths = AutoStringMapper.encode_column([key.lower() if self.ignore_case else key], len(key))
+        offsets, child_ids, child_distances = self.get_bk_tree()
+
+        result_ids, result_distances = [], []
+        nodes = np.zeros(min(self.to_values.shape[0], 1), "int64")
+
+        while nodes.shape[0] > 0:
+
+            distances = self.compute_distances(codes, lengths, nodes)
+            result_ids.append(nodes[distances <= max_distance])
+            result_distances.append(distances[distances <= max_distance])
+
+            # the positions of all children of the visited nodes
+            counts = offsets[nodes + 1] - offsets[nodes]
+            positions = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts - offsets[nodes], counts)
+
+            visited = np.abs(child_distances[positions] - np.repeat(distances, counts)) <= max_distance
+            nodes = child_ids[positions[visited]]
+
+        to_ids = np.concatenate(result_ids + [np.zeros(0, "int64")])
+        distances = np.concatenate(result_distances + [np.zeros(0, "int64")])
+        order = np.argsort(to_ids)
+
+        return to_ids[order], distances[order], len(key)
+
+    def nearest(self, query: str, k: int = 1, max_distance: int = None) -> list:
+        """
+        Function to retrieve the k most similar to strings of a single query
+        without computing its similarity to every to str. The similarities are
+        the ones of AutoStringMapper.similarity_matrix (one minus the levenshtein
+        distance divided by the length of the longer str) and ties are ranked
+        like in AutoStringMapper.get_top_k, so both give the same answers. Like
+        get_top_k with its default similarity_threshold, an empty query and an
+        empty to str (similarity -inf) are no candidates of each other.
+
+        Without a max_distance the search radius is doubled until no to str
+        outside of it can be more similar than the k-th result.
+
+        Args:
+            query (str): str to map
+            k (int): number of candidates
+            max_distance (int): largest levenshtein distance of a candidate, by
+                default unlimited
+
+        Returns:
+            list: (to str, similarity) tuples ranked by their similarity
+
+        Raises:
+            ValueError: if k is not positive or max_distance is negative
+
+        """
+        if k < 1:
+
+            raise ValueError("Parameter k must be positive")
+
+        if max_distance is not None and max_distance < 0:
+
+            raise ValueError("Parameter max_distance must not be negative")
+
+        radius = 1 if max_distance is None else max_distance
+
+        while True:
+
+            to_ids, distances, string_length = self.search(query, radius)
+
+            # two empty strings have a maxlen of zero, like pandas the similarity becomes -inf
+            with np.errstate(divide="ignore", invalid="ignore"):
+                similarities = 1 - distances / np.maximum(self.string_lengths[to_ids], string_length)
+
+            to_ids, similarities = to_ids[similarities > -np.inf], similarities[similarities > -np.inf]
+            order = np.lexsort((to_ids, -similarities))[:k]
+
+            # a to str outside of the radius is at least as far away as it is longer than the query
+            bound = 1 - (radius + 1) / (string_length + radius + 1)
+
+            if (
+                max_distance is not None
+                or radius >= max(string_length, self.string_lengths.max(initial=0), 1)
+                or (order.shape[0] == k and similarities[order[-1]] > bound)
+            ):
+                break
+
+            radius *= 2
+
+        return [(self.to_values[to_id], float(similarity)) for to_id, similarity in zip(to_ids[order], similarities[order])]
+
+    def query(self, from_column: any, **parameters) -> AutoStringMapper:
+        """
+        Function to compute the similarities of a from column to the indexed
+        to strings.
+
+        Args:
+            from_column (list, pandas.Series, np.ndarray): list of entries to
+                map from
+            **parameters: further parameters of AutoStringMapper
+
+        Returns:
+            AutoStringMapper: mapper of the from column to the indexed strings
+
+        """
+        return AutoStringMapper(from_column, self, ignore_case=self.ignore_case, normalization=self.normalization, **parameters)
+
+    def map(
+        self,
+        from_column: any,
+        similarity_threshold: float = 0.0,
+        relationship_type: str = "1:n",
+        data_type: str = "dict",
+        **parameters,
+    ) -> dict:
+        """
+        Function to retrieve a mapping of a from column to the indexed to
+        strings.
+
+        Args:
+            from_column (list, pandas.Series, np.ndarray): list of entries to
+                map from
+            similarity_threshold (float): see AutoStringMapper.get_mapping
+            relationship_type (str): see AutoStringMapper.get_mapping
+            data_type (str): see AutoStringMapper.get_mapping
+            **parameters: further parameters of AutoStringMapper
+
+        Returns:
+            dict: dictionary with the mapping from the "from" to the "to" column
+
+        """
+        return self.query(from_column, **parameters).get_mapping(similarity_threshold, relationship_type, data_type)
+
+
+class DistanceCache:
+    def __init__(self, path: str, max_entries: int = 1000000) -> None:
+        """
+        Keeps the levenshtein distances of from-to-combinations in a SQLite
+        database, so that the same combinations are not computed again in the
+        next run. Pass it as the cache of an AutoStringMapper. A combination is
+        identified by a hash of both strings as they are compared (e.g. in lower
+        case) and the settings. If there are more than max_entries distances,
+        the least recently used ones are removed.
+
+        Args:
+            path (str): path of the database file, created if necessary
+            max_entries (int): maximum number of kept distances
+
+        Raises:
+            ValueError: if max_entries is not positive
+
+        """
+        if max_entries < 1:
+
+            raise ValueError("Parameter max_entries must be positive")
+
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS distances ("
+            "from_key INTEGER NOT NULL, to_key INTEGER NOT NULL, distance INTEGER NOT NULL, used INTEGER NOT NULL, "
+            "PRIMARY KEY (from_key, to_key)) WITHOUT ROWID"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS distances_used ON distances (used)")
+        self.connection.execute("CREATE TEMP TABLE lookup_from_keys (key INTEGER PRIMARY KEY)")
+        self.connection.execute("CREATE TEMP TABLE lookup_to_keys (key INTEGER PRIMARY KEY)")
+        self.connection.commit()
+
+        self.size, self.clock = self.connection.execute("SELECT COUNT(*), COALESCE(MAX(used), 0) FROM distances").fetchone()
+
+    @staticmethod
+    def create_keys(codes: np.ndarray, lengths: np.ndarray, ignore_case: bool, metric: str = "levenshtein") -> np.ndarray:
+        """
+        Hashes encoded strings together with the settings the distances depend
+        on.
+
+        Args:
+            codes (np.ndarray): code point matrix as created by
+                AutoStringMapper.encode_column
+            lengths (np.ndarray): number of characters of every str
+            ignore_case (bool): whether the strings are compared in lower case
+            metric (str): "levenshtein" or "damerau"
+
+        Returns:
+            np.ndarray: 64 bit key of every str
+
+        """
+        settings = f"{metric}\0{ignore_case}\0".encode()
+
+        keys = [
+            int.from_bytes(hashlib.blake2b(settings + row[:length].astype("<u4").tobytes(), digest_size=8).digest(), "little", signed=True)
+            for row, length in zip(codes, lengths)
+        ]
+
+        return np.array(keys, dtype="int64")
+
+    def lookup(self, from_keys: np.ndarray, to_keys: np.ndarray) -> tuple:
+        """
+        Looks up the distances of all combinations of some from and to strings
+        at once, the found ones count as used.
+
+        Args:
+            from_keys (np.ndarray): distinct keys of the from strings
+            to_keys (np.ndarray): distinct keys of the to strings
+
+        Returns:
+            tuple: tuple of the from keys, the to keys and the distances of the
+                found combinations (np.ndarrays)
+
+        """
+        self.clock += 1
+
+        self.connection.execute("DELETE FROM lookup_from_keys")
+        self.connection.execute("DELETE FROM lookup_to_keys")
+        self.connection.executemany("INSERT INTO lookup_from_keys VALUES (?)", [(key,) for key in from_keys.tolist()])
+        self.connection.executemany("INSERT INTO lookup_to_keys VALUES (?)", [(key,) for key in to_keys.tolist()])
+
+        rows = self.connection.execute(
+            "SELECT distances.from_key, distances.to_key, distances.distance "
+            "FROM lookup_from_keys JOIN distances ON distances.from_key = lookup_from_keys.key "
+            "WHERE distances.to_key IN (SELECT key FROM lookup_to_keys)"
+        ).fetchall()
+
+        self.connection.execute(
+            "UPDATE distances SET used = ? "
+            "WHERE from_key IN (SELECT key FROM lookup_from_keys) AND to_key IN (SELECT key FROM lookup_to_keys)",
+            (self.clock,),
+        )
+        self.connection.commit()
+
+        rows = np.array(rows, dtype="int64").reshape([-1, 3])
+
+        return rows[:, 0], rows[:, 1], rows[:, 2].astype("int32")
+
+    def store(self, from_keys: np.ndarray, to_keys: np.ndarray, distances: np.ndarray) -> None:
+        """
+        Adds the distances of from-to-combinations and removes the least
+        recently used ones beyond max_entries.
+
+        Args:
+            from_keys (np.ndarray): keys of the from strings
+            to_keys (np.ndarray): keys of the to strings
+            distances (np.ndarray): distances of the combinations
+
+        """
+        cursor = self.connection.executemany(
+            "INSERT OR IGNORE INTO distances VALUES (?, ?, ?, ?)",
+            zip(from_keys.tolist(), to_keys.tolist(), distances.tolist(), [self.clock] * distances.shape[0]),
+        )
+        self.size += max(cursor.rowcount, 0)
+
+        if self.size > self.max_entries:
+
+            cursor = self.connection.execute(
+                "DELETE FROM distances WHERE (from_key, to_key) IN " "(SELECT from_key, to_key FROM distances ORDER BY used LIMIT ?)",
+                (self.size - self.max_entries,),
+            )
+            self.size -= cursor.rowcount
+
+        self.connection.commit()
+
+    def close(self) -> None:
+        """
+        Closes the database connection.
+        """
+        self.connection.close()
+
+
+class StageStats:
+    def __init__(self, sink: any = None, trace_memory: bool = False) -> None:
+        """
+        Records the wall time, the peak of the allocated memory and the number
+        of computed and of pruned from-to-combinations of every stage of an
+        AutoStringMapper (e.g. "clean_column", "compute_tiles" or
+        "create_one_to_one_assignment"). Every mapper has one as its stats
+        attribute, pass one as the stats of several mappers to add up their
+        stages. By default only the time and the numbers of combinations are
+        recorded, which costs next to nothing.
+
+        Args:
+            sink (str, callable): if "log", every finished stage is logged to
+                the logger "asm" on level INFO, if a callable, it is called with
+                a dict of the "stage", "seconds", "peak_bytes", "pairs" and
+                "pruned_pairs" of every finished stage
+            trace_memory (bool): whether the peak of the memory allocated by a
+                stage is traced with tracemalloc, which slows the stages down
+                and does not see the memory of the processes of n_jobs,
+                peak_bytes is 0 otherwise
+
+        Raises:
+            ValueError: if sink is neither None, "log" nor callable
+
+        """
+        if sink is not None and sink != "log" and not callable(sink):
+
+            raise ValueError('Parameter sink must be None, "log" or callable')
+
+        self.sink = sink
+        self.trace_memory = trace_memory
+        self.stages = {}
+
+        # the peaks of the enclosing stages, tracemalloc only keeps one
+        self.open_peaks = []
+        self.started_tracing = False
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """
+        Records the code run inside the with statement as one call of a stage.
+
+        Args:
+            name (str): name of the stage
+
+        Yields:
+            dict: counts of the "pairs" and the "pruned_pairs" of the call, to
+                be set inside the with statement
+
+        """
+        counts = {"pairs": 0, "pruned_pairs": 0}
+
+        if self.trace_memory:
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracing = True
+
+            start_bytes, peak_bytes = tracemalloc.get_traced_memory()
+
+            if self.open_peaks:
+                self.open_peaks[-1] = max(self.open_peaks[-1], peak_bytes)
+
+            tracemalloc.reset_peak()
+            self.open_peaks.append(start_bytes)
+
+        completed = False
+        start = time.perf_counter()
+        try:
+            yield counts
+            completed = True
+        finally:
+            seconds = time.perf_counter() - start
+
+            peak_bytes = 0
+            if self.trace_memory:
+
+                peak_bytes = max(self.open_peaks.pop(), tracemalloc.get_traced_memory()[1])
+
+                if self.open_peaks:
+                    self.open_peaks[-1] = max(self.open_peaks[-1], peak_bytes)
+
+                peak_bytes -= start_bytes
+
+                if not self.open_peaks and self.started_tracing:
+                    tracemalloc.stop()
+                    self.started_tracing = False
+
+            # calls that raise an exception are not recorded
+            if completed:
+                self.record(name, seconds, peak_bytes, counts["pairs"], counts["pruned_pairs"])
+
+    def record(self, name: str, seconds: float, peak_bytes: int = 0, pairs: int = 0, pruned_pairs: int = 0) -> None:
+        """
+        Adds one call of a stage and passes it on to the sink.
+
+        Args:
+            name (str): name of the stage
+            seconds (float): wall time of the call
+            peak_bytes (int): peak of the memory allocated during the call
+            pairs (int): number of computed from-to-combinations
+            pruned_pairs (int): number of from-to-combinations that were not
+                computed, e.g. because they can not reach the similarity
+                threshold or share too few q-grams
+
+        """
+        stage = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0, "peak_bytes": 0, "pairs": 0, "pruned_pairs": 0})
+        stage["calls"] += 1
+        stage["seconds"] += seconds
+        stage["peak_bytes"] = max(stage["peak_bytes"], peak_bytes)
+        stage["pairs"] += pairs
+        stage["pruned_pairs"] += pruned_pairs
+
+        if self.sink == "log":
+            logger.info("%s took %.6f s, peak %d bytes, %d pairs, %d pruned pairs", name, seconds, peak_bytes, pairs, pruned_pairs)
+        elif self.sink is not None:
+            self.sink({"stage": name, "seconds": seconds, "peak_bytes": peak_bytes, "pairs": pairs, "pruned_pairs": pruned_pairs})
+
+    def get_stats(self, data_type: str = "dict") -> any:
+        """
+        Function to retrieve the recorded stages in the order of their first
+        call.
+
+        Args:
+            data_type (str): determines whether the returned data type is a
+                dict of dicts of the "calls", the "seconds", the "peak_bytes"
+                (largest of the calls), the "pairs" and the "pruned_pairs" by
+                stage or a data frame with one row per stage
+
+        Returns:
+            dict: dictionary with the recorded stages
+
+        Raises:
+            ValueError: if data_type is not "dict" or "frame"
+
+        """
+        if data_type == "dict":
+
+            return {name: dict(stage) for name, stage in self.stages.items()}
+
+        elif data_type == "frame":
+
+            return pd.DataFrame.from_dict(
+                self.stages, orient="index", columns=["calls", "seconds", "peak_bytes", "pairs", "pruned_pairs"]
+            ).rename_axis("stage")
+
+        else:
+            raise ValueError("Parameter data_type must be " "dict" " or " "frame" "")
+
+    def reset(self) -> None:
+        """
+        Forgets all recorded stages.
+        """
+        self.stages = {}
+
+
+# steps of AutoStringMapper.normalize_column
+normalization_steps = ["nfkc", "accents", "casefold", "whitespace", "punctuation"]
+
+# patterns of AutoStringMapper.normalize_column, the combining diacritical
+# marks are the ones left behind by the NFKD decomposition
+combining_marks = re.compile("[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]")
+whitespace = re.compile(r"\s+")
+punctuation = re.compile(r"[^\w\s]|_")
+
+# similarity metrics by name, see AutoStringMapper.register_metric
+similarity_metrics = {
+    "levenshtein": AutoStringMapper.compute_levenshtein_similarities,
+    "damerau": AutoStringMapper.compute_damerau_similarities,
+    "jaro_winkler": AutoStringMapper.compute_jaro_winkler_similarities,
+    "token_set": AutoStringMapper.compute_token_set_similarities,
+    "qgram_cosine": AutoStringMapper.compute_qgram_cosine_similarities,
+}
+
+
+def read_column_chunks(path: str, column: str = None, chunk_size: int = 10000):
+    """
+    Reads a column of a CSV or (if the path ends with ".parquet") Parquet
+    file in chunks, so that the file never needs to fit into memory. Empty
+    values are kept like any other str (blank lines of a CSV file with a single
+    column as well), only missing (null) values of Parquet files are left out.
+    CSV values are read as str, so they are never missing.
+
+    Args:
+        path (str): path of the file
+        column (str): name of the column, by default the first one
+        chunk_size (int): number of rows per chunk
+
+    Yields:
+        pandas.Series: values of the column in the next chunk_size rows
+
+    """
+    if path.endswith(".parquet"):
+
+        # pyarrow is only needed for Parquet files
+        import pyarrow.parquet
+
+        parquet_file = pyarrow.parquet.ParquetFile(path)
+        columns = [column] if column is not None else parquet_file.schema_arrow.names[:1]
+
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.column(0).to_pandas().dropna()
+
+    else:
+
+        chunks = pd.read_csv(
+            path,
+            usecols=[column] if column is not None else [0],
+            dtype=str,
+            keep_default_na=False,
+            skip_blank_lines=False,
+            chunksize=chunk_size,
+        )
 
-        maxlen_matrix = pd.concat([divisor_frame_from, divisor_frame_to]).groupby(level=0).max().astype("float64")
+        # depending on the pandas version a blank line is read as np.nan
+        for chunk in chunks:
+            yield chunk.iloc[:, 0].fillna("")
+
+
+def write_frame_chunks(path: str, frames) -> None:
+    """
+    Writes data frames one after another into a CSV or (if the path ends
+    with ".parquet") Parquet file, so that only one of them is in memory at a
+    time.
+
+    Args:
+        path (str): path of the file, it is overwritten
+        frames (iterable): data frames with the columns "from" and "to"
+
+    """
+    parquet_writer = None
 
-        return maxlen_matrix
+    # the file is written even without any frame
+    frames = itertools.chain(frames, [pd.DataFrame({"from": [], "to": []}, dtype=object)])
+
+    try:
+
+        for index, frame in enumerate(frames):
+
+            if index != 0 and frame.shape[0] == 0:
+                continue
+
+            if path.endswith(".parquet"):
+
+                import pyarrow
+                import pyarrow.parquet
+
+                # unmapped strings are missing values, even if a whole chunk is unmapped
+                schema = pyarrow.schema([("from", pyarrow.string()), ("to", pyarrow.string())])
+
+                if parquet_writer is None:
+                    parquet_writer = pyarrow.parquet.ParquetWriter(path, schema)
+
+                parquet_writer.write_table(pyarrow.Table.from_pandas(frame, schema=schema, preserve_index=False))
+
+            else:
+
+                frame.to_csv(path, mode="w" if index == 0 else "a", header=index == 0, index=False)
+
+    finally:
+
+        if parquet_writer is not None:
+            parquet_writer.close()
+
+
+def main(arguments: list = None) -> None:
+    """
+    Command line entry point (asm-map) that maps a column of a possibly huge
+    from file to a column of a to file. The to column is prepared once, the
+    from file is read, mapped and written in chunks. The values are only
+    deduplicated within a chunk, so a value repeated in several chunks is
+    mapped and written once per chunk.
+
+    Args:
+        arguments (list): command line arguments, by default sys.argv
+
+    """
+    parser = argparse.ArgumentParser(
+        prog="asm-map",
+        description="Maps every value of a column of FROM_FILE to the most similar value of a column of TO_FILE and writes the "
+        "mapping (columns from and to) into OUTPUT_FILE. Files ending with .parquet are read and written as Parquet (needs "
+        "pyarrow), all others as CSV. Values are deduplicated per chunk only, a value repeated in several chunks is written once per "
+        "chunk. Empty values are mapped like any other value, missing (null) Parquet values are left out.",
+    )
+    parser.add_argument("from_file", help="file with the values to map, read in chunks")
+    parser.add_argument("to_file", help="file with the values to map to")
+    parser.add_argument("output_file", help="file the mapping is written into")
+    parser.add_argument("--from-column", help="column of FROM_FILE, by default the first one")
+    parser.add_argument("--to-column", help="column of TO_FILE, by default the first one")
+    parser.add_argument("--similarity-threshold", type=float, default=0.0, help="minimum similarity of a mapping (default: 0.0)")
+    parser.add_argument(
+        "--relationship-type",
+        choices=["1:n", "1:1"],
+        default="1:n",
+        help='"1:1" maps every value of TO_FILE at most once per chunk (default: 1:n)',
+    )
+    parser.add_argument("--chunk-size", type=int, default=10000, help="number of rows of FROM_FILE mapped at a time (default: 10000)")
+    parser.add_argument("--n-jobs", type=int, default=1, help="number of processes, -1 for one per cpu (default: 1)")
+    parser.add_argument(
+        "--max-memory-bytes",
+        type=int,
+        default=2 ** 30,
+        help="approximate number of bytes the computation of a chunk may use (default: 1 GiB)",
+    )
+    parser.add_argument("--metric", default="levenshtein", help="similarity metric (default: levenshtein)")
+    parser.add_argument("--blocking", choices=["qgram"], help="only compare values sharing q-grams")
+    parser.add_argument("--case-sensitive", action="store_true", help="compare the values without lower casing them")
+    parser.add_argument(
+        "--normalization",
+        nargs="+",
+        choices=normalization_steps,
+        help="steps applied to the values before they are deduplicated and compared",
+    )
+    parser.add_argument("--stats", action="store_true", help="print the time and the combinations of every stage to stderr")
+
+    arguments = parser.parse_args(arguments)
+
+    if arguments.chunk_size < 1:
+
+        parser.error("argument --chunk-size must be positive")
+
+    to_column = pd.concat(
+        list(read_column_chunks(arguments.to_file, arguments.to_column, arguments.chunk_size)) + [pd.Series([], dtype=str)]
+    )
+    stats = StageStats()
+
+    with stats.stage("to_column_index"):
+        to_index = ToColumnIndex(to_column, ignore_case=not arguments.case_sensitive, normalization=arguments.normalization)
+
+    # a 1:n mapping only needs the most similar to str of every from str
+    storage = "top_k" if arguments.relationship_type == "1:n" else "sparse"
+
+    mappings = (
+        to_index.query(
+            from_column,
+            storage=storage,
+            similarity_threshold=arguments.similarity_threshold,
+            max_memory_bytes=arguments.max_memory_bytes,
+            n_jobs=arguments.n_jobs,
+            metric=arguments.metric,
+            blocking=arguments.blocking,
+            stats=stats,
+        ).get_mapping(arguments.similarity_threshold, arguments.relationship_type, "frame")
+        for from_column in read_column_chunks(arguments.from_file, arguments.from_column, arguments.chunk_size)
+        if from_column.shape[0] != 0
+    )
+
+    write_frame_chunks(arguments.output_file, mappings)
+
+    if arguments.stats:
+        print(stats.get_stats("frame").to_string(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
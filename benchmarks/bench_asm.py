@@ -0,0 +1,311 @@
+"""
+Benchmark suite of the AutoStringMapper.
+
+Sweeps the number of from / to strings, the string length and the ratio of
+duplicated strings and measures the time, the peak RSS and the throughput in
+from-to-combinations per second of
+
+ - create_combinations
+ - create_levenshtein_array
+ - create_maxlen_matrix
+ - __init__ end-to-end
+ - get_mapping with a "1:n" and a "1:1" relationship
+ - the cold start of a new interpreter importing asm and mapping lists into
+   a dict, which also reports whether pandas got imported
+
+Every measurement runs in a fresh process, so the peak RSS of one case does
+not leak into the next. Results can be written to a JSON file and later runs
+can be compared against such a recorded baseline:
+
+    python benchmarks/bench_asm.py --output baseline.json
+    python benchmarks/bench_asm.py --baseline baseline.json
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from asm import AutoStringMapper  # noqa: E402
+
+CASES = [
+    "create_combinations",
+    "create_levenshtein_array",
+    "create_maxlen_matrix",
+    "init",
+    "get_mapping_1:n",
+    "get_mapping_1:1",
+    "cold_start",
+]
+
+# imports asm and maps lists in a new interpreter, as a short-lived worker would
+COLD_START = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import asm
+from_column, to_column = json.load(sys.stdin)
+asm.AutoStringMapper(from_column, to_column, storage="top_k").get_mapping()
+print(json.dumps([time.perf_counter() - start, "pandas" in sys.modules]))
+"""
+
+SWEEPS = {
+    "quick": {"sizes": [(100, 100), (300, 300)], "string_lengths": [10, 30], "duplicate_ratios": [0.0, 0.5]},
+    "full": {
+        "sizes": [(100, 100), (300, 300), (1000, 300), (300, 1000), (1000, 1000)],
+        "string_lengths": [5, 20, 60],
+        "duplicate_ratios": [0.0, 0.5, 0.9],
+    },
+}
+
+
+def create_column(size: int, string_length: int, duplicate_ratio: float, seed: int) -> list:
+    """
+    Creates a column of random lower case strings where duplicate_ratio of the
+    entries are repetitions of other entries.
+
+    Args:
+        size (int): number of strings
+        string_length (int): average number of characters, the lengths are
+            drawn uniformly between half and one and a half of it
+        duplicate_ratio (float): share of the strings which are duplicates
+        seed (int): seed of the random generator
+
+    Returns:
+        list: strings of the column
+
+    """
+    rng = np.random.default_rng(seed)
+
+    number_of_unique = max(int(round(size * (1 - duplicate_ratio))), 1)
+    lengths = rng.integers(max(string_length // 2, 1), string_length + string_length // 2 + 1, number_of_unique)
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    unique = ["".join(rng.choice(letters, length)) for length in lengths]
+
+    column = unique + list(rng.choice(unique, size - number_of_unique))
+    rng.shuffle(column)
+
+    return column
+
+
+def prepare_case(case: str, from_column: list, to_column: list) -> tuple:
+    """
+    Prepares everything a case needs outside of the timed function and returns
+    the function to be timed together with its number of combinations.
+
+    Args:
+        case (str): one of CASES
+        from_column (list): strings to map from
+        to_column (list): strings to map to
+
+    Returns:
+        tuple: function without arguments and the number of from-to-combinations
+            it computes
+
+    """
+    from_series = AutoStringMapper.clean_column(from_column, "from_column").str.lower()
+    to_series = AutoStringMapper.clean_column(to_column, "to_column").str.lower()
+    unique_from = from_series.drop_duplicates().reset_index(drop=True)
+    unique_to = to_series.drop_duplicates().reset_index(drop=True)
+    from_ids = np.arange(unique_from.shape[0])
+    to_ids = np.arange(unique_to.shape[0])
+    pairs = from_ids.shape[0] * to_ids.shape[0]
+
+    if case == "create_combinations":
+        return (lambda: AutoStringMapper.create_combinations(from_ids, to_ids)), pairs
+    if case == "create_levenshtein_array":
+        from_codes, from_lengths = AutoStringMapper.encode_column(unique_from, unique_from.str.len().max())
+        to_codes, to_lengths = AutoStringMapper.encode_column(unique_to, unique_to.str.len().max())
+        from_combination_ids, to_combination_ids = AutoStringMapper.create_combinations(from_ids, to_ids)
+        return (
+            lambda: AutoStringMapper.create_levenshtein_array(
+                from_codes, to_codes, from_lengths, to_lengths, from_combination_ids, to_combination_ids
+            )
+        ), pairs
+    if case == "create_maxlen_matrix":
+        return (lambda: AutoStringMapper.create_maxlen_matrix(unique_from, unique_to)), pairs
+    if case == "init":
+        return (lambda: AutoStringMapper(from_column, to_column)), pairs
+
+    mapper = AutoStringMapper(from_column, to_column)
+    relationship_type = case.split("_")[-1]
+
+    return (lambda: mapper.get_mapping(relationship_type=relationship_type)), pairs
+
+
+def run_case(case: str, size: tuple, string_length: int, duplicate_ratio: float, repeat: int) -> dict:
+    """
+    Measures a single case, meant to be run in a fresh process.
+
+    Args:
+        case (str): one of CASES
+        size (tuple): number of from and of to strings
+        string_length (int): average number of characters
+        duplicate_ratio (float): share of duplicated strings
+        repeat (int): number of timed runs, the fastest one is reported
+
+    Returns:
+        dict: parameters and measurements of the case
+
+    """
+    from_column = create_column(size[0], string_length, duplicate_ratio, seed=0)
+    to_column = create_column(size[1], string_length, duplicate_ratio, seed=1)
+
+    result = {
+        "case": case,
+        "from_size": size[0],
+        "to_size": size[1],
+        "string_length": string_length,
+        "duplicate_ratio": duplicate_ratio,
+    }
+
+    if case == "cold_start":
+        return dict(result, **run_cold_start(from_column, to_column, repeat))
+
+    function, pairs = prepare_case(case, from_column, to_column)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    seconds = min(timings)
+
+    return dict(
+        result,
+        seconds=seconds,
+        # ru_maxrss is reported in kilobytes on linux and in bytes on macOS
+        peak_rss_mb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2 ** 20 if sys.platform == "darwin" else 2 ** 10),
+        pairs=pairs,
+        pairs_per_second=pairs / seconds if seconds > 0 else float("inf"),
+    )
+
+
+def run_cold_start(from_column: list, to_column: list, repeat: int) -> dict:
+    """
+    Measures the time a new interpreter needs to import asm and map the
+    columns, without the start of the interpreter itself.
+
+    Args:
+        from_column (list): strings to map from
+        to_column (list): strings to map to
+        repeat (int): number of interpreters, the fastest one is reported
+
+    Returns:
+        dict: measurements of the case, the peak RSS is the one of the
+            largest interpreter
+
+    """
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", COLD_START, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")],
+            input=json.dumps([from_column, to_column]),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        seconds, pandas_imported = json.loads(output)
+        timings.append(seconds)
+
+    seconds = min(timings)
+    pairs = len(set(from_column)) * len(set(to_column))
+
+    return {
+        "seconds": seconds,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / (2 ** 20 if sys.platform == "darwin" else 2 ** 10),
+        "pairs": pairs,
+        "pairs_per_second": pairs / seconds if seconds > 0 else float("inf"),
+        "pandas_imported": pandas_imported,
+    }
+
+
+def get_key(result: dict) -> tuple:
+    """
+    Identifies the parameters of a result to compare it with a baseline.
+
+    Args:
+        result (dict): result as returned by run_case
+
+    Returns:
+        tuple: case, sizes, string length and duplicate ratio
+
+    """
+    return result["case"], result["from_size"], result["to_size"], result["string_length"], result["duplicate_ratio"]
+
+
+def main(arguments: list = None) -> int:
+    """
+    Runs the benchmark sweep, prints a table of the results and optionally
+    stores them or compares them with a baseline.
+
+    Args:
+        arguments (list): command line arguments, by default sys.argv
+
+    Returns:
+        int: 1 if a case got slower than the baseline allows, otherwise 0
+
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--sweep", choices=list(SWEEPS), default="quick", help="grid of sizes, lengths and duplicate ratios")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES, help="functions to benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case, the fastest one is reported")
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument("--baseline", help="JSON file with results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=1.2, help="allowed slowdown factor compared with the baseline")
+    arguments = parser.parse_args(arguments)
+
+    sweep = SWEEPS[arguments.sweep]
+    baseline = {}
+    if arguments.baseline:
+        with open(arguments.baseline) as baseline_file:
+            baseline = {get_key(result): result for result in json.load(baseline_file)}
+
+    header = f"{'case':<25} {'from':>6} {'to':>6} {'len':>4} {'dup':>4} {'seconds':>9} {'rss MB':>8} {'pairs/s':>11}"
+    print(header + ("  vs baseline" if baseline else ""))
+
+    results = []
+    regressions = 0
+    context = multiprocessing.get_context("spawn")
+    for case, size, string_length, duplicate_ratio in itertools.product(
+        arguments.cases, sweep["sizes"], sweep["string_lengths"], sweep["duplicate_ratios"]
+    ):
+        # a fresh process per case so ru_maxrss is the peak of this case only
+        with context.Pool(1) as pool:
+            result = pool.apply(run_case, (case, size, string_length, duplicate_ratio, arguments.repeat))
+        results.append(result)
+
+        line = (
+            f"{case:<25} {size[0]:>6} {size[1]:>6} {string_length:>4} {duplicate_ratio:>4} "
+            f"{result['seconds']:>9.4f} {result['peak_rss_mb']:>8.1f} {result['pairs_per_second']:>11.3g}"
+        )
+        if result.get("pandas_imported"):
+            line += "  pandas imported"
+        if get_key(result) in baseline:
+            ratio = result["seconds"] / baseline[get_key(result)]["seconds"]
+            regressed = ratio > arguments.tolerance
+            regressions += regressed
+            line += f"  {ratio:>6.2f}x{' SLOWER' if regressed else ''}"
+        print(line, flush=True)
+
+    if arguments.output:
+        with open(arguments.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if baseline:
+        print(f"{regressions} of {len(results)} cases slower than {arguments.tolerance}x the baseline")
+
+    return int(regressions > 0)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
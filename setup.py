@@ -9,7 +9,7 @@ import os
 import sys
 from shutil import rmtree
 
-from setuptools import find_packages, setup, Command
+from setuptools import setup, Command
 
 # Package meta-data.
 NAME = "asm"
@@ -27,7 +27,7 @@ REQUIRED = [
 ]
 
 # What packages are optional?
-EXTRAS = {"dev": ["pytest", "black", "flake8", "pre-commit"]}
+EXTRAS = {"dev": ["pytest", "black", "flake8", "pre-commit"], "parquet": ["pyarrow"]}
 
 # The rest you shouldn't have to touch too much :)
 # ------------------------------------------------
@@ -102,12 +102,10 @@ setup(
     author_email=EMAIL,
     python_requires=REQUIRES_PYTHON,
     url=URL,
-    packages=find_packages(exclude=["tests", "*.tests", "*.tests.*", "tests.*"]),
-    # If your package is a single module, use this instead of 'packages':
-    # py_modules=['mypackage'],
-    # entry_points={
-    #     'console_scripts': ['mycli=mymodule:cli'],
-    # },
+    py_modules=["asm"],
+    entry_points={
+        "console_scripts": ["asm-map=asm:main"],
+    },
     install_requires=REQUIRED,
     extras_require=EXTRAS,
     include_package_data=True,
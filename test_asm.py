@@ -1,10 +1,18 @@
 from asm import AutoStringMapper
+from asm import ToColumnIndex
+from asm import DistanceCache
+from asm import main
+from asm import StageStats
 from pandas.testing import assert_frame_equal
 from pandas.testing import assert_series_equal
 import pandas as pd
 import numpy as np
+import pytest
 import random
 import string
+import subprocess
+import sys
+import os
 
 
 def test_create_maxlen_matrix():
@@ -16,13 +24,13 @@ def test_create_maxlen_matrix():
 
 
 def test_create_combinations():
-    from_column = pd.Series(["c", "dddd"])
-    to_column = pd.Series(["aa", "bbb"])
-    actual_result_from, actual_result_to = AutoStringMapper.create_combinations(from_column=from_column, to_column=to_column)
-    supposed_result_from = pd.Series(["c", "dddd", "c", "dddd"])
-    supposed_result_to = pd.Series(["aa", "aa", "bbb", "bbb"])
-    assert_series_equal(supposed_result_from, actual_result_from)
-    assert_series_equal(supposed_result_to, actual_result_to)
+    from_ids = np.array([0, 1])
+    to_ids = np.array([0, 1])
+    actual_result_from, actual_result_to = AutoStringMapper.create_combinations(from_ids=from_ids, to_ids=to_ids)
+    supposed_result_from = np.array([0, 1, 0, 1])
+    supposed_result_to = np.array([0, 0, 1, 1])
+    assert (supposed_result_from == actual_result_from).all()
+    assert (supposed_result_to == actual_result_to).all()
 
 
 def test_determine_unused_row_name_default():
@@ -67,19 +75,718 @@ def test_clean_column_list():
     assert_series_equal(actual_result, supposed_result)
 
 
+def test_encode_column():
+    column = pd.Series(["ab", "", "abc"])
+    actual_codes, actual_lengths = AutoStringMapper.encode_column(column, 3)
+    supposed_codes = np.array([[97, 98, 0], [0, 0, 0], [97, 98, 99]])
+    supposed_lengths = np.array([2, 0, 3])
+    assert (actual_codes == supposed_codes).all()
+    assert (actual_lengths == supposed_lengths).all()
+
+
 def test_create_levenshtein_array():
-    from_column = pd.Series(["pun", "bun", "pun", "bun"])
-    to_column = pd.Series(["pant", "pant", "sun", "sun"])
-    actual_result = AutoStringMapper.create_levenshtein_array(from_column, to_column, 2, 2, 3, 4)
-    supposed_result = np.array(
+    from_codes, from_lengths = AutoStringMapper.encode_column(pd.Series(["pun", "bun"]), 3)
+    to_codes, to_lengths = AutoStringMapper.encode_column(pd.Series(["pant", "sun"]), 4)
+    from_ids, to_ids = AutoStringMapper.create_combinations(np.arange(2), np.arange(2))
+    actual_result = AutoStringMapper.create_levenshtein_array(from_codes, to_codes, from_lengths, to_lengths, from_ids, to_ids)
+    supposed_result = np.array([2, 3, 1, 1])
+    assert (actual_result == supposed_result).all()
+
+
+def test_create_levenshtein_array_max_distances():
+    from_codes, from_lengths = AutoStringMapper.encode_column(pd.Series(["pun", "bun"]), 3)
+    to_codes, to_lengths = AutoStringMapper.encode_column(pd.Series(["pant", "sun"]), 4)
+    from_ids, to_ids = AutoStringMapper.create_combinations(np.arange(2), np.arange(2))
+    max_distances = np.array([1, 1, 1, 1])
+    for levenshtein_array_function in [AutoStringMapper.create_levenshtein_array, AutoStringMapper.create_bitparallel_levenshtein_array]:
+        actual_result = levenshtein_array_function(from_codes, to_codes, from_lengths, to_lengths, from_ids, to_ids, max_distances)
+        supposed_result = np.array([2, 2, 1, 1])
+        assert (actual_result == supposed_result).all()
+
+    # the finished combination must not be abandoned in the rows of the longer from str
+    from_codes, from_lengths = AutoStringMapper.encode_column(pd.Series(["ab", "abcdefgh"]), 8)
+    to_codes, to_lengths = AutoStringMapper.encode_column(pd.Series(["ab"]), 2)
+    from_ids, to_ids = np.array([0] + [1] * 8), np.zeros(9, "int64")
+    max_distances = np.array([0] + [10] * 8)
+    actual_result = AutoStringMapper.create_levenshtein_array(
+        from_codes, to_codes, from_lengths, to_lengths, from_ids, to_ids, max_distances
+    )
+    assert (actual_result == np.array([0] + [6] * 8)).all()
+
+
+def test_create_bitparallel_levenshtein_array():
+    from_codes, from_lengths = AutoStringMapper.encode_column(pd.Series(["pun", "bun"]), 3)
+    to_codes, to_lengths = AutoStringMapper.encode_column(pd.Series(["pant", "sun"]), 4)
+    from_ids, to_ids = AutoStringMapper.create_combinations(np.arange(2), np.arange(2))
+    actual_result = AutoStringMapper.create_bitparallel_levenshtein_array(from_codes, to_codes, from_lengths, to_lengths, from_ids, to_ids)
+    supposed_result = np.array([2, 3, 1, 1])
+    assert (actual_result == supposed_result).all()
+
+
+def test_bitparallel_engine_equals_dp_engine():
+    from_column = get_random_string_array(20, 70) + get_random_string_array(20, 5) + [""]
+    to_column = get_random_string_array(10, 80) + get_random_string_array(10, 3)
+    actual_result = AutoStringMapper(from_column, to_column, engine="bitparallel").similarity_matrix
+    supposed_result = AutoStringMapper(from_column, to_column, engine="dp").similarity_matrix
+    assert_frame_equal(actual_result, supposed_result)
+
+
+def test_engine_invalid():
+    with pytest.raises(ValueError):
+        AutoStringMapper(["a"], ["b"], engine="fast")
+
+
+def test_create_tiles():
+    actual_result = [(from_ids.tolist(), to_ids.tolist()) for from_ids, to_ids in AutoStringMapper.create_tiles(3, 2, 2)]
+    supposed_result = [([0, 1], [0]), ([2], [0]), ([0, 1], [1]), ([2], [1])]
+    assert actual_result == supposed_result
+    actual_result = [(from_ids.tolist(), to_ids.tolist()) for from_ids, to_ids in AutoStringMapper.create_tiles(3, 2, 4, 1)]
+    assert actual_result == [([0], [0, 1]), ([1], [0, 1]), ([2], [0, 1])]
+
+
+def test_chunk_size():
+    from_column = get_random_string_array(13, 8)
+    to_column = get_random_string_array(7, 12)
+    supposed_result = AutoStringMapper(from_column, to_column).similarity_matrix
+    for engine in ["dp", "bitparallel"]:
+        assert_frame_equal(AutoStringMapper(from_column, to_column, engine=engine, chunk_size=5).similarity_matrix, supposed_result)
+        assert_frame_equal(AutoStringMapper(from_column, to_column, engine=engine, max_memory_bytes=1).similarity_matrix, supposed_result)
+
+
+def test_max_memory_bytes_large_alphabet():
+    # the bit vectors of the bit-parallel engine grow with the number of distinct characters
+    rng = np.random.default_rng(0)
+    characters = np.array([chr(0x4E00 + index) for index in range(3000)])
+    from_column = ["".join(rng.choice(characters, 10)) for _ in range(400)]
+    to_column = ["".join(rng.choice(characters, 10)) for _ in range(100)]
+    stats = StageStats(trace_memory=True)
+    mapper = AutoStringMapper(from_column, to_column, engine="bitparallel", max_memory_bytes=2 ** 20, stats=stats)
+    assert stats.get_stats()["compute_tiles"]["peak_bytes"] <= 2 ** 20
+    assert_frame_equal(mapper.distance_matrix, AutoStringMapper(from_column, to_column).distance_matrix)
+
+
+def test_chunk_size_invalid():
+    with pytest.raises(ValueError):
+        AutoStringMapper(["a"], ["b"], chunk_size=0)
+
+
+def test_n_jobs():
+    from_column = get_random_string_array(25, 6) + get_random_string_array(10, 3)
+    to_column = get_random_string_array(15, 5) + get_random_string_array(10, 3)
+    for parameters in [{}, {"similarity_threshold": 0.3}, {"blocking": "qgram"}]:
+        supposed_mapper = AutoStringMapper(from_column, to_column, **parameters)
+        actual_mapper = AutoStringMapper(from_column, to_column, n_jobs=2, **parameters)
+        assert_frame_equal(actual_mapper.similarity_matrix, supposed_mapper.similarity_matrix)
+        assert_frame_equal(actual_mapper.distance_matrix, supposed_mapper.distance_matrix)
+    supposed_mapper = AutoStringMapper(from_column, to_column, storage="top_k", top_k=2)
+    actual_mapper = AutoStringMapper(from_column, to_column, storage="top_k", top_k=2, n_jobs=3, chunk_size=20)
+    assert (actual_mapper.top_k_to_ids == supposed_mapper.top_k_to_ids).all()
+    assert (actual_mapper.top_k_similarities == supposed_mapper.top_k_similarities).all()
+
+
+def test_n_jobs_invalid():
+    with pytest.raises(ValueError):
+        AutoStringMapper(["a"], ["b"], n_jobs=0)
+
+
+def test_merge_top_k():
+    to_ids = np.array([[2, -1], [0, 1]])
+    similarities = np.array([[0.5, np.nan], [0.9, 0.1]])
+    candidate_to_ids = np.array([[3, 4], [3, 4]])
+    candidate_similarities = np.array([[0.5, 0.7], [0.2, 0.9]])
+    actual_to_ids, actual_similarities = AutoStringMapper.merge_top_k(to_ids, similarities, candidate_to_ids, candidate_similarities)
+    assert (actual_to_ids == np.array([[4, 2], [0, 4]])).all()
+    assert (actual_similarities == np.array([[0.7, 0.5], [0.9, 0.9]])).all()
+
+
+def test_storage_top_k():
+    from_column = get_random_string_array(30, 6) + ["Aladdin", "Mulan"]
+    to_column = get_random_string_array(20, 4) + ["Aladin (1992)", "Mulan (1998)"]
+    dense_mapper = AutoStringMapper(from_column, to_column)
+    top_k_mapper = AutoStringMapper(from_column, to_column, storage="top_k", top_k=3, chunk_size=50)
+    assert top_k_mapper.similarity_matrix is None
+    for similarity_threshold in [0.0, 0.3]:
+        actual_result = top_k_mapper.get_mapping(similarity_threshold=similarity_threshold, data_type="series")
+        supposed_result = dense_mapper.get_mapping(similarity_threshold=similarity_threshold, data_type="series")
+        assert_series_equal(actual_result, supposed_result)
+    assert top_k_mapper.get_top_k(k=3) == dense_mapper.get_top_k(k=3)
+
+
+def test_get_top_k():
+    from_column = pd.Series(["Matrix", "Mulan"])
+    to_column = pd.Series(["Matrix", "Matrix1", "Mulan (1998)"])
+    actual_result = AutoStringMapper(from_column, to_column, storage="top_k", top_k=2).get_top_k(similarity_threshold=0.5)
+    supposed_result = {"Matrix": [("Matrix", 1.0), ("Matrix1", 1 - 1 / 7)], "Mulan": []}
+    assert actual_result == supposed_result
+
+
+def test_storage_top_k_one_to_one():
+    with pytest.raises(ValueError):
+        AutoStringMapper(["a"], ["b"], storage="top_k").get_mapping(relationship_type="1:1")
+
+
+def test_storage_sparse():
+    from_column = get_random_string_array(30, 6) + ["Aladdin", "Mulan", "Aladin"]
+    to_column = get_random_string_array(20, 4) + ["Aladin (1992)", "Mulan (1998)"]
+    dense_mapper = AutoStringMapper(from_column, to_column, similarity_threshold=0.3)
+    sparse_mapper = AutoStringMapper(from_column, to_column, storage="sparse", similarity_threshold=0.3)
+    assert sparse_mapper.similarity_matrix is None
+    assert sparse_mapper.sparse_similarities.dtype == np.float64
+    assert (sparse_mapper.sparse_similarities >= 0.3).all()
+    for relationship_type in ["1:n", "1:1"]:
+        actual_result = sparse_mapper.get_mapping(similarity_threshold=0.3, relationship_type=relationship_type, data_type="series")
+        supposed_result = dense_mapper.get_mapping(similarity_threshold=0.3, relationship_type=relationship_type, data_type="series")
+        assert_series_equal(actual_result, supposed_result)
+    assert [to_value for to_value, _ in sparse_mapper.get_top_k(k=2, similarity_threshold=0.3)["Aladdin"]] == [
+        to_value for to_value, _ in dense_mapper.get_top_k(k=2, similarity_threshold=0.3)["Aladdin"]
+    ]
+
+
+def test_storage_threshold_boundary():
+    # 1 - 4 / 5 is just below 0.2 in float64 but 0.2 in float32
+    for similarity_dtype, supposed_result in [("float64", {"abc": np.nan}), ("float32", {"abc": "bcccb"})]:
+        for storage in ["dense", "top_k", "sparse"]:
+            for parameters in [{}, {"similarity_threshold": 0.2}]:
+                mapper = AutoStringMapper(["abc"], ["bcccb"], storage=storage, similarity_dtype=similarity_dtype, **parameters)
+                assert mapper.get_mapping(0.2, data_type="series").equals(pd.Series(supposed_result, dtype=object))
+
+
+def test_mapping_for_sparse():
+    from_column = pd.Series(["Matrix", "Mulan", "Aladdin"])
+    to_column = pd.Series(["Mulan (1998)", "Matrix (1999)"])
+    actual_result = AutoStringMapper(from_column, to_column, storage="sparse").get_mapping(
+        similarity_threshold=0.4, relationship_type="1:1", data_type="sparse"
+    )
+    assert actual_result["from_ids"].tolist() == [0, 1]
+    assert actual_result["to_ids"].tolist() == [1, 0]
+    assert actual_result["similarities"].dtype == np.float32
+    assert np.allclose(actual_result["similarities"], [1 - 7 / 13, 1 - 7 / 12])
+    assert actual_result["from_values"].tolist() == ["Matrix", "Mulan", "Aladdin"]
+    assert actual_result["to_values"].tolist() == ["Mulan (1998)", "Matrix (1999)"]
+
+
+def test_create_one_to_one_assignment():
+    from_ids = np.array([0, 0, 1, 1, 2])
+    to_ids = np.array([0, 1, 0, 1, 1])
+    similarities = np.array([0.9, 0.85, 0.95, 0.92, 0.8])
+    actual_result = AutoStringMapper.create_one_to_one_assignment(from_ids, to_ids, similarities, 3, 2)
+    assert actual_result.tolist() == [-1, 0, 1]
+    actual_result = AutoStringMapper.create_one_to_one_assignment(np.array([0, 1]), np.array([0, 0]), np.array([0.5, 0.5]), 2, 1)
+    assert actual_result.tolist() == [0, -1]
+
+
+def test_relationship_type_not_square():
+    from_column = pd.Series(["Matrix", "Mulan", "Aladdin"])
+    to_column = pd.Series(["Mulan (1998)", "Matrix (1999)"])
+    actual_result = AutoStringMapper(from_column, to_column).get_mapping(relationship_type="1:1")
+    assert actual_result["Matrix"] == "Matrix (1999)"
+    assert actual_result["Mulan"] == "Mulan (1998)"
+    assert pd.isnull(actual_result["Aladdin"])
+
+
+def test_prune_combinations():
+    from_codes, from_lengths = AutoStringMapper.encode_column(pd.Series(["abcd", "ab"]), 4)
+    to_codes, to_lengths = AutoStringMapper.encode_column(pd.Series(["wxyz", "a"]), 4)
+    from_histograms, to_histograms = AutoStringMapper.create_histograms(from_codes, to_codes, from_lengths, to_lengths)
+    from_ids, to_ids = AutoStringMapper.create_combinations(np.arange(2), np.arange(2))
+    maxlen = np.array([4, 4, 4, 2])
+    actual_result = AutoStringMapper.prune_combinations(from_ids, to_ids, from_lengths, to_lengths, maxlen, 0.5)
+    assert actual_result.tolist() == [True, True, False, True]
+    actual_result = AutoStringMapper.prune_combinations(
+        from_ids, to_ids, from_lengths, to_lengths, np.array([4, 4, 4, 2]), 0.5, from_histograms, to_histograms
+    )
+    assert actual_result.tolist() == [False, False, False, True]
+
+
+def test_similarity_threshold_pruning():
+    from_column = get_random_string_array(20, 4) + get_random_string_array(20, 12) + ["The Beauty and the Beast", "Mulan"]
+    to_column = get_random_string_array(15, 5) + get_random_string_array(15, 14) + ["The Beauty and the Beast (1991)", "Mulan (1998)"]
+    supposed_mapper = AutoStringMapper(from_column, to_column)
+    for histogram_pruning in [False, True]:
+        actual_mapper = AutoStringMapper(from_column, to_column, similarity_threshold=0.4, histogram_pruning=histogram_pruning)
+        similarity_matrix = actual_mapper.similarity_matrix
+        assert similarity_matrix.isnull().any().any()
+        assert ((supposed_mapper.similarity_matrix < 0.4) | similarity_matrix.notnull()).all().all()
+        for similarity_threshold in [0.4, 0.6]:
+            actual_result = actual_mapper.get_mapping(similarity_threshold=similarity_threshold, data_type="series")
+            supposed_result = supposed_mapper.get_mapping(similarity_threshold=similarity_threshold, data_type="series")
+            assert_series_equal(actual_result, supposed_result, check_dtype=False)
+
+
+def test_similarity_threshold_below_pruning():
+    with pytest.raises(ValueError):
+        AutoStringMapper(["a"], ["b"], similarity_threshold=0.5).get_mapping(similarity_threshold=0.3)
+
+
+def test_create_qgram_candidates():
+    from_codes, from_lengths = AutoStringMapper.encode_column(pd.Series(["ab", "xy"]), 2)
+    to_codes, to_lengths = AutoStringMapper.encode_column(pd.Series(["ba", "b", "abc"]), 3)
+    vocabulary, qgram_indptr, qgram_postings = AutoStringMapper.create_qgram_index(
+        *AutoStringMapper.create_qgrams(to_codes, to_lengths, 2)
+    )
+    # "ba" and "b" share their first q-gram
+    assert vocabulary.shape[0] == 8
+    assert qgram_postings.shape[0] == 9
+    from_string_ids, from_qgram_ids = AutoStringMapper.lookup_qgrams(
+        *AutoStringMapper.create_qgrams(from_codes, from_lengths, 2), vocabulary
+    )
+    # "xy" shares no q-gram with any to str
+    assert from_string_ids.tolist() == [0, 0, 0]
+    for min_shared_qgrams, max_candidates, supposed_result in [(1, None, ([0, 0], [1, 2])), (2, None, ([0], [2])), (1, 1, ([0], [2]))]:
+        from_ids, to_ids = AutoStringMapper.create_qgram_candidates(
+            from_string_ids, from_qgram_ids, qgram_indptr, qgram_postings, np.arange(2), 3, min_shared_qgrams, max_candidates
+        )
+        assert (from_ids.tolist(), to_ids.tolist()) == supposed_result
+
+
+def test_qgram_blocking():
+    # fixed fillers, random ones can be more similar to a title than its match and get dropped by the blocking
+    from_column = [f"{index:06d}" for index in range(20)] + ["The Beauty and the Beast", "Aladdin", "Mulan", "The Lion King"]
+    to_column = [f"{index:06d}" for index in range(100, 120)] + [
+        "Aladin (1992)",
+        "Lion King (1994)",
+        "The Beauty and the Beast (1991)",
+        "Mulan (1998)",
+    ]
+    supposed_mapper = AutoStringMapper(from_column, to_column)
+    for storage in ["dense", "top_k"]:
+        actual_mapper = AutoStringMapper(from_column, to_column, storage=storage, blocking="qgram", q=3, max_candidates=3, chunk_size=40)
+        for from_value in ["The Beauty and the Beast", "Aladdin", "Mulan", "The Lion King"]:
+            assert actual_mapper.get_mapping()[from_value] == supposed_mapper.get_mapping()[from_value]
+    similarity_matrix = AutoStringMapper(from_column, to_column, blocking="qgram", min_shared_qgrams=2).similarity_matrix
+    assert similarity_matrix.isnull().any().any()
+    assert (similarity_matrix.isnull() | (similarity_matrix == supposed_mapper.similarity_matrix)).all().all()
+
+
+def test_to_column_index():
+    to_column = get_random_string_array(20, 6) + ["Aladin (1992)", "Lion King (1994)", "Mulan (1998)", "Mulan (1998)"]
+    to_index = ToColumnIndex(to_column)
+    assert to_index.to_values.shape[0] == 23
+    for from_column in [get_random_string_array(10, 5) + ["Aladdin"], ["Mulan", "The Lion King", "Aladin"]]:
+        supposed_mapper = AutoStringMapper(from_column, to_column)
+        assert_frame_equal(to_index.query(from_column).similarity_matrix, supposed_mapper.similarity_matrix)
+        assert to_index.map(from_column, relationship_type="1:1") == supposed_mapper.get_mapping(relationship_type="1:1")
+        actual_result = to_index.map(from_column, blocking="qgram", q=3, data_type="series")
+        supposed_result = AutoStringMapper(from_column, to_column, blocking="qgram", q=3).get_mapping(data_type="series")
+        assert_series_equal(actual_result, supposed_result)
+    assert list(to_index.qgram_indexes.keys()) == [3]
+
+
+def test_to_column_index_ignore_case_invalid():
+    with pytest.raises(ValueError):
+        AutoStringMapper(["a"], ToColumnIndex(["b"], ignore_case=True), ignore_case=False)
+
+
+def test_to_column_index_nearest():
+    to_column = get_random_string_array(40, 6) + ["Aladin (1992)", "Lion King (1994)", "Mulan (1998)", "MULAN  (1998)", ""]
+    for ignore_case, normalization in [(True, None), (False, ["whitespace"])]:
+        to_index = ToColumnIndex(to_column, ignore_case=ignore_case, normalization=normalization)
+        from_column = get_random_string_array(10, 5) + ["Aladdin", "mulan (1998)", ""]
+        top_k = to_index.query(from_column).get_top_k(k=3)
+        for from_value in from_column:
+            assert to_index.nearest(from_value, k=3) == top_k[from_value]
+            to_ids, distances, _ = to_index.search(from_value, 3)
+            candidates = to_index.nearest(from_value, k=len(to_column), max_distance=3)
+            # two empty strings (similarity -inf) are no candidates
+            to_values = [to_value for to_value in to_index.to_values[to_ids] if from_value != "" or to_value != ""]
+            assert sorted(to_values) == sorted(to_value for to_value, _ in candidates)
+            assert (distances <= 3).all()
+    assert ToColumnIndex(["Mulan (1998)", "Mulan (1999)", "Aladin"]).nearest("Mulan", max_distance=1) == []
+    assert ToColumnIndex(["", "a"]).nearest("", k=2) == [("a", 0.0)]
+
+
+def test_to_column_index_nearest_invalid():
+    for parameters in [{"k": 0}, {"max_distance": -1}]:
+        with pytest.raises(ValueError):
+            ToColumnIndex(["a", "b"]).nearest("a", **parameters)
+
+
+def test_add_and_remove_to_values():
+    from_column = get_random_string_array(20, 6) + ["Aladdin", "Mulan"]
+    to_column = get_random_string_array(20, 5) + ["Aladin (1992)", "Mulan (1998)"]
+    mapper = AutoStringMapper(from_column, to_column[:10])
+    mapper.add_to_values(to_column[10:] + to_column[:2])
+    assert_frame_equal(mapper.similarity_matrix, AutoStringMapper(from_column, to_column).similarity_matrix)
+    mapper.remove_to_values(["Mulan (1998)"] + to_column[:5])
+    supposed_mapper = AutoStringMapper(from_column, to_column[5:-1])
+    assert_frame_equal(mapper.similarity_matrix, supposed_mapper.similarity_matrix)
+    assert_frame_equal(mapper.distance_matrix, supposed_mapper.distance_matrix)
+
+
+def test_add_and_remove_to_values_top_k():
+    from_column = get_random_string_array(20, 6) + ["Aladdin", "Mulan"]
+    to_column = get_random_string_array(20, 5) + ["Aladin (1992)", "Mulan (1998)"]
+    for storage in ["top_k", "sparse"]:
+        mapper = AutoStringMapper(from_column, to_column[:10], storage=storage, top_k=3)
+        mapper.add_to_values(to_column[10:])
+        mapper.remove_to_values(to_column[5:12])
+        supposed_mapper = AutoStringMapper(from_column, to_column[:5] + to_column[12:], storage=storage, top_k=3)
+        assert mapper.get_top_k(k=3) == supposed_mapper.get_top_k(k=3)
+
+
+def test_add_from_values():
+    from_column = get_random_string_array(20, 6) + ["Aladdin", "Mulan"]
+    to_column = get_random_string_array(20, 5) + ["Aladin (1992)", "Mulan (1998)"]
+    for storage in ["dense", "top_k", "sparse"]:
+        mapper = AutoStringMapper(from_column[:10], to_column, storage=storage, top_k=3)
+        mapper.add_from_values(from_column[5:])
+        supposed_mapper = AutoStringMapper(from_column, to_column, storage=storage, top_k=3)
+        assert_series_equal(mapper.get_mapping(data_type="series"), supposed_mapper.get_mapping(data_type="series"))
+        assert mapper.get_top_k(k=3) == supposed_mapper.get_top_k(k=3)
+
+
+def test_distance_cache(tmp_path):
+    from_column = get_random_string_array(20, 6) + ["Aladdin", "Mulan"]
+    to_column = get_random_string_array(20, 5) + ["Aladin (1992)", "Mulan (1998)"]
+    cache = DistanceCache(str(tmp_path / "distances.db"))
+    supposed_mapper = AutoStringMapper(from_column, to_column, similarity_threshold=0.2)
+    for _ in range(2):
+        actual_mapper = AutoStringMapper(from_column, to_column, similarity_threshold=0.2, cache=cache)
+        assert_frame_equal(actual_mapper.similarity_matrix, supposed_mapper.similarity_matrix)
+    computed = int((supposed_mapper.distance_matrix.to_numpy() != -1).sum())
+    assert cache.misses == computed
+    assert cache.hits == computed
+    cache.close()
+    cache = DistanceCache(str(tmp_path / "distances.db"), max_entries=10)
+    AutoStringMapper(from_column, ["Mulan (1998)"], cache=cache)
+    assert cache.hits == int((supposed_mapper.distance_matrix.iloc[-1] != -1).sum())
+    assert cache.size == 10
+    assert cache.connection.execute("SELECT COUNT(*) FROM distances").fetchone()[0] == 10
+
+
+def test_save_and_load(tmp_path):
+    from_column = get_random_string_array(20, 6) + ["Aladdin", "Mulan"]
+    to_column = get_random_string_array(20, 5) + ["Aladin (1992)", "Mulan (1998)"]
+    for storage in ["dense", "top_k", "sparse"]:
+        path = str(tmp_path / storage)
+        supposed_mapper = AutoStringMapper(from_column, to_column, storage=storage, top_k=3)
+        supposed_mapper.save(path)
+        for mmap in [True, False]:
+            actual_mapper = AutoStringMapper.load(path, mmap=mmap)
+            for relationship_type in ["1:n", "1:1"] if storage != "top_k" else ["1:n"]:
+                actual_result = actual_mapper.get_mapping(0.3, relationship_type=relationship_type, data_type="series")
+                supposed_result = supposed_mapper.get_mapping(0.3, relationship_type=relationship_type, data_type="series")
+                assert_series_equal(actual_result, supposed_result)
+            assert actual_mapper.get_top_k(k=3) == supposed_mapper.get_top_k(k=3)
+        actual_mapper.add_to_values(["Mulan II (2004)"])
+        supposed_mapper.add_to_values(["Mulan II (2004)"])
+        assert actual_mapper.get_top_k(k=3) == supposed_mapper.get_top_k(k=3)
+    assert isinstance(AutoStringMapper.load(str(tmp_path / "sparse")).sparse_similarities, np.memmap)
+
+
+def test_save_and_load_strings(tmp_path):
+    from_column = ["Mulan\0", "Mulan", "", "\0", "Aladdin \u00e9\U0001f600", "\ud800"]
+    mapper = AutoStringMapper(from_column, ["Mulan (1998)", "x" * 1000 + "\0"], storage="top_k")
+    mapper.save(str(tmp_path))
+    actual_mapper = AutoStringMapper.load(str(tmp_path))
+    assert actual_mapper.from_values.tolist() == from_column
+    assert actual_mapper.to_values.tolist() == ["Mulan (1998)", "x" * 1000 + "\0"]
+    assert actual_mapper.get_top_k() == mapper.get_top_k()
+    # the strings take their own length, not the one of the longest str
+    assert os.path.getsize(tmp_path / "to_value_codes.npy") < 4 * 1100 + 200
+    codes, offsets = AutoStringMapper.pack_strings(np.array([], dtype=object))
+    assert AutoStringMapper.unpack_strings(codes, offsets).tolist() == []
+
+
+def test_create_damerau_levenshtein_array():
+    from_codes, from_lengths = AutoStringMapper.encode_column(pd.Series(["ca", "abc", "", "a"]), 3)
+    to_codes, to_lengths = AutoStringMapper.encode_column(pd.Series(["abc", "acb", ""]), 3)
+    from_ids, to_ids = AutoStringMapper.create_combinations(np.arange(4), np.arange(3))
+    actual_result = AutoStringMapper.create_damerau_levenshtein_array(from_codes, to_codes, from_lengths, to_lengths, from_ids, to_ids)
+    supposed_result = np.array([3, 0, 3, 2, 2, 1, 3, 2, 2, 3, 0, 1])
+    assert (actual_result == supposed_result).all()
+
+
+def test_metrics():
+    from_column = pd.Series(["ACT", "Mulan", "lion king"])
+    to_column = pd.Series(["Action-Thriller", "Mulan (1998)", "The Lion King", "Muppets"])
+    actual_result = AutoStringMapper(from_column, to_column, metric="jaro_winkler").similarity_matrix
+    assert actual_result.loc["Action-Thriller", "ACT"] == pytest.approx(0.7333 + 0.3 * (1 - 0.7333), abs=1e-3)
+    assert actual_result["ACT"].idxmax() == "Action-Thriller"
+    actual_result = AutoStringMapper(from_column, to_column, metric="token_set").similarity_matrix
+    assert actual_result.loc["The Lion King", "lion king"] == pytest.approx(2 / 3)
+    assert actual_result.loc["Mulan (1998)", "Mulan"] == pytest.approx(1 / 2)
+    actual_result = AutoStringMapper(from_column, to_column, metric="qgram_cosine", q=2).similarity_matrix
+    assert actual_result.loc["Mulan (1998)", "Mulan"] == pytest.approx(5 / np.sqrt(6 * 13))
+    actual_result = AutoStringMapper(["ab"], ["ba", "abc"], metric="damerau").similarity_matrix
+    assert actual_result["ab"].tolist() == [0.5, 1 - 1 / 3]
+
+
+def test_metric_jaro_winkler_longer_from_strings():
+    actual_result = AutoStringMapper(["Action-Thriller"], ["ACT"], metric="jaro_winkler").similarity_matrix
+    assert actual_result.loc["ACT", "Action-Thriller"] == pytest.approx(0.7333 + 0.3 * (1 - 0.7333), abs=1e-3)
+    actual_result = AutoStringMapper(["abcdef", "Mulan (1998)"], ["ab", "mu"], metric="jaro_winkler").similarity_matrix
+    assert actual_result.loc["ab", "abcdef"] == pytest.approx(7 / 9 + 0.2 * 2 / 9)
+    assert_frame_equal(
+        actual_result.T, AutoStringMapper(["ab", "mu"], ["abcdef", "Mulan (1998)"], metric="jaro_winkler").similarity_matrix
+    )
+    actual_result = AutoStringMapper(
+        ["abcdef", "Mulan (1998)"], ["ab", "mu"], metric={"levenshtein": 1.0, "jaro_winkler": 1.0}
+    ).get_mapping()
+    assert actual_result == {"abcdef": "ab", "Mulan (1998)": "mu"}
+
+
+def test_metric_levenshtein_unchanged():
+    from_column = get_random_string_array(20, 6) + ["Aladdin", "Mulan"]
+    to_column = get_random_string_array(20, 5) + ["Aladin (1992)", "Mulan (1998)"]
+    supposed_result = AutoStringMapper(from_column, to_column).similarity_matrix
+    assert_frame_equal(AutoStringMapper(from_column, to_column, metric="levenshtein").similarity_matrix, supposed_result)
+    actual_result = AutoStringMapper(from_column, to_column, metric={"levenshtein": 2.0, "jaro_winkler": 1.0}).similarity_matrix
+    jaro_winkler = AutoStringMapper(from_column, to_column, metric="jaro_winkler").similarity_matrix
+    assert_frame_equal(actual_result, (2 * supposed_result + jaro_winkler) / 3)
+
+
+def test_register_metric():
+    AutoStringMapper.register_metric(
+        "same_length", lambda arrays, from_ids, to_ids: 1.0 * (arrays["from_lengths"][from_ids] == arrays["to_lengths"][to_ids])
+    )
+    actual_result = AutoStringMapper(["abc"], ["xyz", "xy"], metric="same_length").get_mapping()
+    assert actual_result == {"abc": "xyz"}
+
+
+def test_metric_invalid():
+    with pytest.raises(ValueError):
+        AutoStringMapper(["a"], ["b"], metric="unknown")
+    with pytest.raises(ValueError):
+        AutoStringMapper(["a"], ["b"], metric={"levenshtein": 0})
+
+
+def test_choose_distance_dtype():
+    assert AutoStringMapper.choose_distance_dtype(10) == np.uint8
+    assert AutoStringMapper.choose_distance_dtype(300) == np.uint16
+    assert AutoStringMapper.choose_distance_dtype(70000) == np.int32
+    assert AutoStringMapper.choose_distance_dtype(10, signed=True) == np.int16
+    assert AutoStringMapper.choose_distance_dtype(40000, signed=True) == np.int32
+
+
+def test_long_strings():
+    from_column = ["a", "a" * 260]
+    to_column = ["b" * 260, "a" * 258]
+    for engine in ["dp", "bitparallel"]:
+        actual_result = AutoStringMapper(from_column, to_column, engine=engine).distance_matrix.to_numpy()
+        assert actual_result.tolist() == [[260, 260], [257, 2]]
+
+
+def test_main(tmp_path):
+    from_column = get_random_string_array(50, 6) + ["Aladdin", "Mulan", "Aladdin", ""]
+    to_column = get_random_string_array(20, 5) + ["Aladin (1992)", "Mulan (1998)"]
+    pd.DataFrame({"id": range(len(from_column)), "title": from_column}).to_csv(tmp_path / "from.csv", index=False)
+    pd.DataFrame({"title": to_column}).to_csv(tmp_path / "to.csv", index=False)
+    main(
         [
-            [[0, 1, 2, 3], [1, 1, 2, 3], [2, 2, 1, 2]],
-            [[1, 2, 3, 4], [2, 2, 3, 4], [3, 3, 2, 3]],
-            [[1, 2, 3, 3], [2, 1, 2, 2], [3, 2, 1, 1]],
-            [[1, 2, 3, 3], [2, 1, 2, 2], [3, 2, 1, 1]],
+            str(tmp_path / "from.csv"),
+            str(tmp_path / "to.csv"),
+            str(tmp_path / "mapping.csv"),
+            "--from-column",
+            "title",
+            "--chunk-size",
+            "20",
         ]
     )
-    assert (actual_result == supposed_result).all()
+    actual_result = pd.read_csv(tmp_path / "mapping.csv", keep_default_na=False)
+    assert actual_result.shape[0] == 53
+    supposed_result = AutoStringMapper(from_column, to_column).get_mapping()
+    assert dict(zip(actual_result["from"], actual_result["to"])) == supposed_result
+
+
+def test_main_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    from_column = ["Aladdin", "Mulan", "Matrix", "The Lion King"]
+    pd.DataFrame({"title": from_column}).to_parquet(tmp_path / "from.parquet")
+    pd.DataFrame({"title": ["Aladin (1992)", "Mulan (1998)", "Lion King (1994)"]}).to_csv(tmp_path / "to.csv", index=False)
+    arguments = [str(tmp_path / "from.parquet"), str(tmp_path / "to.csv"), str(tmp_path / "mapping.parquet")]
+    main(arguments + ["--chunk-size", "2", "--similarity-threshold", "0.3", "--relationship-type", "1:1"])
+    actual_result = pd.read_parquet(tmp_path / "mapping.parquet")
+    assert actual_result["from"].tolist() == from_column
+    assert actual_result["to"].tolist() == ["Aladin (1992)", "Mulan (1998)", None, None]
+
+
+def test_main_empty_and_repeated_values(tmp_path):
+    pd.DataFrame({"title": ["", "Mulan", "Aladdin", "", "Mulan"]}).to_csv(tmp_path / "from.csv", index=False)
+    pd.DataFrame({"title": ["Aladin (1992)", "Mulan (1998)"]}).to_csv(tmp_path / "to.csv", index=False)
+    main([str(tmp_path / "from.csv"), str(tmp_path / "to.csv"), str(tmp_path / "mapping.csv"), "--chunk-size", "2"])
+    actual_result = pd.read_csv(tmp_path / "mapping.csv", keep_default_na=False)
+    # empty values are kept and every chunk is deduplicated on its own
+    assert actual_result["from"].tolist() == ["", "Mulan", "Aladdin", "", "Mulan"]
+    assert actual_result["to"].tolist()[1:] == ["Mulan (1998)", "Aladin (1992)", actual_result["to"][0], "Mulan (1998)"]
+
+
+def test_main_blank_lines(tmp_path):
+    (tmp_path / "from.csv").write_text("title\nMulan\n\nAladdin\n\nMulan\n")
+    pd.DataFrame({"title": ["Aladin (1992)", "Mulan (1998)"]}).to_csv(tmp_path / "to.csv", index=False)
+    main([str(tmp_path / "from.csv"), str(tmp_path / "to.csv"), str(tmp_path / "mapping.csv"), "--chunk-size", "2"])
+    # a blank line is the empty value of a single column file
+    assert pd.read_csv(tmp_path / "mapping.csv", keep_default_na=False)["from"].tolist() == ["Mulan", "", "Aladdin", "", "Mulan"]
+
+
+def test_main_parquet_missing_values(tmp_path):
+    pytest.importorskip("pyarrow")
+    pd.DataFrame({"title": ["", None, "Mulan"]}).to_parquet(tmp_path / "from.parquet")
+    pd.DataFrame({"title": ["Aladin (1992)", "Mulan (1998)"]}).to_csv(tmp_path / "to.csv", index=False)
+    main([str(tmp_path / "from.parquet"), str(tmp_path / "to.csv"), str(tmp_path / "mapping.csv")])
+    # only the missing value is left out
+    assert pd.read_csv(tmp_path / "mapping.csv", keep_default_na=False)["from"].tolist() == ["", "Mulan"]
+
+
+def test_stats():
+    records = []
+    stats = StageStats(sink=records.append, trace_memory=True)
+    mapper = AutoStringMapper(
+        ["Aladdin", "Mulan", "Matrix", "x"],
+        ["Aladin (1992)", "Mulan (1998)", "Lion King"],
+        similarity_threshold=0.3,
+        storage="sparse",
+        stats=stats,
+    )
+    mapper.get_mapping(0.3, "1:1")
+    actual_result = stats.get_stats()
+    assert mapper.stats is stats
+    assert list(actual_result) == [
+        "to_column_index",
+        "clean_column",
+        "drop_duplicates",
+        "encode_column",
+        "create_tiles",
+        "compute_tiles",
+        "store_results",
+        "create_one_to_one_assignment",
+        "get_mapping",
+    ]
+    assert actual_result["compute_tiles"]["pairs"] == 3
+    assert actual_result["compute_tiles"]["pruned_pairs"] == 9
+    assert actual_result["create_one_to_one_assignment"]["pairs"] == 2
+    assert actual_result["encode_column"]["peak_bytes"] > 0
+    assert [record["stage"] for record in records] == list(actual_result)
+    assert stats.get_stats("frame").loc["get_mapping", "calls"] == 1
+    mapper.add_to_values(["Matrix (1999)"])
+    assert stats.get_stats()["compute_tiles"]["calls"] == 2
+    with pytest.raises(ValueError):
+        mapper.get_mapping(0.3, "n:n")
+    assert stats.get_stats()["get_mapping"]["calls"] == 1
+
+
+def test_stats_invalid():
+    with pytest.raises(ValueError):
+        StageStats(sink="print")
+    with pytest.raises(ValueError):
+        StageStats().get_stats("series")
+
+
+def test_similarity_dtype():
+    from_column = get_random_string_array(40, 6) + get_random_string_array(20, 4)
+    to_column = get_random_string_array(30, 5) + get_random_string_array(10, 3)
+    mapper = AutoStringMapper(from_column, to_column)
+    float32_mapper = AutoStringMapper(from_column, to_column, similarity_dtype="float32")
+    top_k_mapper = AutoStringMapper(from_column, to_column, storage="top_k", top_k=3, similarity_dtype="float32")
+    assert float32_mapper.similarity_matrix.dtypes.eq(np.float32).all()
+    assert top_k_mapper.top_k_similarities.dtype == np.float32
+    assert np.allclose(float32_mapper.similarity_matrix.to_numpy(), mapper.similarity_matrix.to_numpy(), equal_nan=True)
+    for relationship_type in ["1:n", "1:1"]:
+        assert float32_mapper.get_mapping(0.21, relationship_type, "series").equals(mapper.get_mapping(0.21, relationship_type, "series"))
+    assert top_k_mapper.get_mapping(0.21, data_type="series").equals(mapper.get_mapping(0.21, data_type="series"))
+    with pytest.raises(ValueError):
+        AutoStringMapper(from_column, to_column, similarity_dtype="float16")
+
+
+def test_normalize_column():
+    column = np.array(["Ｄrama", "  Café   NOIR ", "Action-Thriller!", "Straße"], dtype=object)
+    actual_result = AutoStringMapper.normalize_column(column, ["nfkc", "accents", "casefold", "whitespace", "punctuation"])
+    supposed_result = ["drama", "cafe noir", "actionthriller", "strasse"]
+    assert actual_result.tolist() == supposed_result
+    assert AutoStringMapper.normalize_column(column) is column
+
+
+def test_expand_key_ids():
+    key_ids = np.array([2, 0, 2, 1])
+    value_key_ids = np.array([0, 2, 0, 2, 2])
+    actual_result_values, actual_result_positions = AutoStringMapper.expand_key_ids(key_ids, value_key_ids)
+    assert actual_result_values.tolist() == [1, 3, 4, 0, 2, 1, 3, 4]
+    assert actual_result_positions.tolist() == [0, 0, 0, 1, 1, 2, 2, 2]
+
+
+def test_normalization():
+    from_column = ["Drama", "drama", "DRAMA ", "Café  Noir", "cafe noir!", "Drama", "Horror"]
+    to_column = ["DRA", "Café Noir", "Cafe noir", "Drama!", "HOR"]
+    normalization = ["accents", "casefold", "whitespace", "punctuation"]
+    supposed_result = {
+        "Drama": "Drama!",
+        "drama": "Drama!",
+        "DRAMA ": "Drama!",
+        "Café  Noir": "Café Noir",
+        "cafe noir!": "Café Noir",
+        "Horror": "HOR",
+    }
+    for storage in ["dense", "top_k", "sparse"]:
+        mapper = AutoStringMapper(from_column, to_column, storage=storage, similarity_threshold=0.5, normalization=normalization)
+        assert mapper.get_mapping(0.5) == supposed_result
+        assert mapper.to_values.tolist() == ["DRA", "Café Noir", "Drama!", "HOR"]
+        assert mapper.stats.get_stats()["compute_tiles"]["pairs"] + mapper.stats.get_stats()["compute_tiles"]["pruned_pairs"] == 12
+    assert mapper.get_key_frequencies().to_dict() == {"drama": 4, "cafe noir": 2, "horror": 1}
+    mapper.add_from_values(["horror", "Comedy"])
+    mapper.add_to_values(["Hor", "COMEDY"])
+    assert mapper.get_key_frequencies().to_dict() == {"drama": 4, "cafe noir": 2, "horror": 2, "comedy": 1}
+    assert mapper.to_values.tolist() == ["DRA", "Café Noir", "Drama!", "HOR", "COMEDY"]
+    assert mapper.get_mapping(0.5)["horror"] == "HOR"
+    index = ToColumnIndex(to_column, normalization=normalization)
+    assert index.map(from_column, 0.5) == supposed_result
+    with pytest.raises(ValueError):
+        AutoStringMapper(from_column, index)
+    with pytest.raises(ValueError):
+        AutoStringMapper(from_column, to_column, normalization=["lower"])
+
+
+def test_clean_values():
+    actual_result = AutoStringMapper.clean_values(["a", "bb", 3.0], "test")
+    assert actual_result.dtype == object
+    assert actual_result.tolist() == ["a", "bb", "3.0"]
+    assert AutoStringMapper.clean_values(pd.Series(["a", 3.0]), "test").tolist() == ["a", "3.0"]
+    with pytest.raises(ValueError):
+        AutoStringMapper.clean_values("a", "test")
+
+
+def test_clean_values_like_clean_column():
+    for column in [
+        [1, 2.5],
+        [1, None],
+        [1, 2],
+        [None, None],
+        ["a", None, 1],
+        [True, 1],
+        [np.int64(1), np.float32(0.5)],
+        np.array([1, None], dtype=object),
+    ]:
+        assert AutoStringMapper.clean_values(column, "test").tolist() == AutoStringMapper.clean_column(column, "test").tolist()
+    assert AutoStringMapper.clean_values([1, 2.5], "test").tolist() == ["1.0", "2.5"]
+    assert AutoStringMapper.clean_values([1, None], "test").tolist() == ["1.0", "nan"]
+    assert list(AutoStringMapper([1, 2.5, None], ["1", "2"]).get_mapping()) == ["1.0", "2.5", "nan"]
+
+
+def test_factorize_values():
+    actual_result_ids, actual_result_values = AutoStringMapper.factorize_values(np.array(["b", "a", "b", "c", "a"], dtype=object))
+    assert actual_result_ids.tolist() == [0, 1, 0, 2, 1]
+    assert actual_result_values.tolist() == ["b", "a", "c"]
+
+
+def test_numpy_core_without_pandas():
+    code = (
+        "import sys, asm\n"
+        "mapper = asm.AutoStringMapper(['Aladdin', 'Mulan', 'Mulan'], ['Aladin (1992)', 'Mulan (1998)'])\n"
+        "assert mapper.get_mapping() == {'Aladdin': 'Aladin (1992)', 'Mulan': 'Mulan (1998)'}\n"
+        "assert mapper.get_mapping(relationship_type='1:1', data_type='sparse')['to_ids'].tolist() == [0, 1]\n"
+        "assert mapper.get_top_k()['Mulan'][0][0] == 'Mulan (1998)'\n"
+        "print('pandas' in sys.modules)"
+    )
+    actual_result = subprocess.run(
+        [sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True
+    )
+    assert actual_result.stdout.strip() == "False"
+
+
+def test_blocking_invalid():
+    with pytest.raises(ValueError):
+        AutoStringMapper(["a"], ["b"], blocking="sorted_neighborhood")
+    with pytest.raises(ValueError):
+        AutoStringMapper(["a"], ["b"], blocking="qgram", q=0)
 
 
 def test_mapping():